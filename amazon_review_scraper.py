@@ -2,70 +2,22 @@ import requests
 import random
 import time
 import json
-from selectorlib import Extractor # type: ignore
 from urllib.parse import quote_plus
 import re
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import textwrap
-
-# Download required NLTK data
-try:
-    nltk.data.find('vader_lexicon')
-except LookupError:
-    nltk.download('vader_lexicon')
-
-# Gemini API key
-GEMINI_API_KEY = "lol"
-
-# Extractor for Amazon product details
-e = Extractor.from_yaml_string("""
-product_name:
-    css: 'span#productTitle'
-    type: Text
-
-price:
-    css: 'span.a-price span.a-offscreen'
-    type: Text
-
-rating:
-    css: 'span.a-icon-alt'
-    type: Text
-
-num_reviews:
-    css: 'span#acrCustomerReviewText'
-    type: Text
-
-availability:
-    css: 'div#availability span'
-    type: Text
-
-image:
-    css: 'img#landingImage'
-    type: Attribute
-    attribute: src
-
-description:
-    css: 'div#feature-bullets .a-list-item'
-    multiple: true
-    type: Text
-
-technical_details:
-    css: '#productDetails_techSpec_section_1 tr, #productDetails_detailBullets_sections1 tr'
-    multiple: true
-    type: Text
-
-product_description:
-    css: '#productDescription p'
-    multiple: true
-    type: Text
-
-reviews:
-    css: 'div.review-text-content span'
-    multiple: true
-    type: Text
-""")
+from config import GEMINI_MAX_CONCURRENCY, REVIEW_SAMPLE_PER_LABEL, AMAZON_BASE_URL
+from sentiment_engine import score_review, score_reviews, score_stream
+from async_runtime import run
+from page_cache import PageCache, classify_url
+from fetch_scheduler import FetchScheduler
+from query_resolver import QueryResolverCache
+from summarizer import summarize_reviews, SummaryError
+from comparison_cache import comparison_cache, canonical_order
+from gemini_client import generate_content, extract_text
+from refresh import ReviewSample, group_reviews, reusable_enrichment, fingerprint
+from metrics import AMAZON_FETCH_SECONDS, AMAZON_RESPONSES, AMAZON_RETRIES, AMAZON_FETCHES_IN_FLIGHT, STAGE_SECONDS, ENRICHMENT_REUSED
 
 # User-Agent rotation to avoid detection
 USER_AGENTS = [
@@ -76,46 +28,109 @@ USER_AGENTS = [
 
 session = requests.Session()
 
-def fetch_url_with_retries(url, max_retries=5):
-    """Fetch a URL with retries, rotating headers to bypass 503 errors."""
-    delay = 2  # Initial delay
-    for attempt in range(max_retries):
-        headers = {
-            "User-Agent": random.choice(USER_AGENTS),
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,/;q=0.8",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Connection": "keep-alive",
-            "Referer": "https://www.google.com/",
-            "Upgrade-Insecure-Requests": "1",
-        }
-        
-        try:
-            response = session.get(url, headers=headers, timeout=10)
-            
-            if response.status_code == 503:
-                print(f"⚠ 503 Error Detected (Attempt {attempt+1}/{max_retries}). Retrying in {delay}s...")
-                time.sleep(delay)
-                delay *= 2  # Exponential backoff
-                continue  # Retry request
+# Compressed on-disk cache of fetched pages, shared by search and product fetches
+page_cache = PageCache()
 
-            if response.status_code == 200:
-                return response
+# Maps recently searched queries to the ASIN they resolved to
+query_resolver = QueryResolverCache()
 
-            print(f"❌ Unexpected Status Code: {response.status_code}")
-            return None
-        
-        except requests.exceptions.RequestException as err:
-            print(f"❌ Request Error: {err}")
-            time.sleep(delay)
-            delay *= 2  # Exponential backoff
-
-    print("❌ Max retries reached. Skipping request.")
-    return None
+def request_headers():
+    """Return browser-like request headers with a randomly rotated User-Agent."""
+    return {
+        "User-Agent": random.choice(USER_AGENTS),
+        "Accept-Language": "en-US,en;q=0.9",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,/;q=0.8",
+        "Accept-Encoding": "gzip, deflate, br",
+        "Connection": "keep-alive",
+        "Referer": "https://www.google.com/",
+        "Upgrade-Insecure-Requests": "1",
+    }
 
+def fetch_url_with_retries(url, max_retries=5, use_cache=True):
+    """Fetch a URL with retries, rotating headers to bypass 503 errors.
+    
+    Pages are served from the page cache while fresh, and successful fetches
+    are written back to it unless use_cache is False. Requests go through
+    the shared fetch scheduler, which rate-limits each host and retries
+    throttled requests with jittered backoff. While Amazon's circuit is
+    open, the last cached copy of the page is served however old it is, or
+    None is returned at once.
+    """
+    start = time.perf_counter()
+    response, outcome = _fetch_url(url, max_retries, use_cache)
+    AMAZON_FETCH_SECONDS.observe(time.perf_counter() - start, page_type=classify_url(url), outcome=outcome)
+    return response
+
+def _fetch_url(url, max_retries, use_cache):
+    """Do the work of fetch_url_with_retries, returning (response, outcome)."""
+    if use_cache:
+        cached = page_cache.get(url)
+        if cached:
+            print(f"📦 Page cache hit: {url}")
+            return cached, "cache_hit"
+    
+    if fetch_scheduler.rejects(url):
+        return stale_page(url, use_cache)
+    
+    response, outcome = fetch_scheduler.fetch(url, max_retries)
+    if outcome == "circuit_open":
+        return stale_page(url, use_cache)
+    if outcome == "ok" and use_cache:
+        page_cache.put(url, response.text)
+    return response, outcome
+
+def stale_page(url, use_cache=True):
+    """Return (cached page, "stale") while Amazon's circuit is open, or (None, "circuit_open")."""
+    cached = page_cache.get_stale(url) if use_cache else None
+    if cached:
+        print(f"📦 Serving stale cached page while Amazon is throttling: {url}")
+        return cached, "stale"
+    print(f"⛔ Amazon is throttling requests, not fetching {url}")
+    return None, "circuit_open"
+
+def _attempt_fetch(url):
+    """Make one request to Amazon for the fetch scheduler, returning (response, outcome)."""
+    try:
+        with AMAZON_FETCHES_IN_FLIGHT.track_inprogress():
+            response = session.get(url, headers=request_headers(), timeout=10)
+    except requests.exceptions.RequestException as err:
+        AMAZON_RETRIES.inc(reason="network_error")
+        print(f"❌ Request Error: {err}")
+        return None, "retry"
+    AMAZON_RESPONSES.inc(status=str(response.status_code))
+    
+    if response.status_code == 503:
+        AMAZON_RETRIES.inc(reason="503")
+        print(f"⚠ 503 Error Detected for {url}")
+        return None, "retry"
+
+    if response.status_code == 200:
+        return response, "ok"
+
+    print(f"❌ Unexpected Status Code: {response.status_code}")
+    return None, "http_error"
+
+# Rate-limits, retries and circuit-breaks every threaded Amazon fetch; its
+# workers cap concurrent requests, and backoff waits do not hold them
+fetch_scheduler = FetchScheduler(_attempt_fetch)
+
+@STAGE_SECONDS.time(stage="search")
 def search_amazon(product_name):
-    """Search Amazon for the product and return the first result URL."""
-    search_url = f"https://www.amazon.in/s?k={quote_plus(product_name)}"
+    """Search Amazon for the product and return the first result URL.
+    
+    Queries resolved recently (ignoring case, punctuation and spacing) are
+    answered from the query resolver cache without a search request.
+    """
+    asin = query_resolver.get(product_name)
+    if asin:
+        product_url = f"{AMAZON_BASE_URL}/dp/{asin}"
+        print(f"✅ Resolved '{product_name}' from cache: {product_url}")
+        return product_url
+    return search_uncached(product_name)
+
+def search_uncached(product_name):
+    """Search Amazon for the product without consulting the query resolver cache, then cache the result."""
+    search_url = f"{AMAZON_BASE_URL}/s?k={quote_plus(product_name)}"
     print(f"🔍 Searching for '{product_name}' on Amazon...")
     response = fetch_url_with_retries(search_url)
     
@@ -124,101 +139,62 @@ def search_amazon(product_name):
 
     match = re.search(r'/dp/([A-Z0-9]+)/', response.text)
     if match:
-        product_url = f"https://www.amazon.in/dp/{match.group(1)}"
+        query_resolver.put(product_name, match.group(1))
+        product_url = f"{AMAZON_BASE_URL}/dp/{match.group(1)}"
         print(f"✅ Found product URL: {product_url}")
         return product_url
     else:
         print("❌ No products found.")
         return None
 
+def warm_up_queries(queries):
+    """Preload the query resolver cache with common search queries.
+    
+    Returns a dict mapping each query to its ASIN, or None if it was not found.
+    """
+    return query_resolver.warm_up(queries, search_uncached)
+
 def analyze_sentiment(review):
     """Analyze the sentiment of a single review."""
-    sia = SentimentIntensityAnalyzer()
-    scores = sia.polarity_scores(review)
-    
-    # Adjust thresholds for better neutral detection
-    if scores['compound'] >= 0.05:
-        return 'POSITIVE'
-    elif scores['compound'] <= -0.05:
-        return 'NEGATIVE'
-    else:
-        return 'NEUTRAL'
+    label, _ = score_review(review)
+    return label
 
+@STAGE_SECONDS.time(stage="summary")
 def generate_gemini_summary(reviews, summary_type="overall", max_tokens=200):
-    """Generate a summary of reviews using Gemini API."""
+    """Generate a summary of reviews using Gemini API.
+    
+    All reviews are summarized; large sets are split into token-budgeted chunks
+    and reduced by the summarizer's map-reduce pipeline.
+    """
     if not reviews or len(reviews) == 0:
         return f"No {summary_type} reviews available to summarize."
     
-    # Combine reviews into a single text, limiting to avoid token limits
-    combined_text = " ".join(reviews[:20])  # Limit to 20 reviews to avoid token limits
-    
-    # Different prompts based on summary type
-    if summary_type == "overall":
-        prompt = f"""
-        Summarize the following product reviews in a comprehensive way, highlighting key points mentioned by customers. 
-        Focus on both positive and negative aspects. Keep the summary concise (3-4 sentences).
-        DO NOT use markdown formatting like ** for bold or * for italic in your response.
-        
-        Reviews: {combined_text}
-        """
-    elif summary_type == "positive":
-        prompt = f"""
-        Summarize the positive aspects from these product reviews. Focus on what customers liked most.
-        Keep the summary concise (2-3 sentences).
-        DO NOT use markdown formatting like ** for bold or * for italic in your response.
-        
-        Reviews: {combined_text}
-        """
-    elif summary_type == "negative":
-        prompt = f"""
-        Summarize the negative aspects from these product reviews. Focus on common complaints and issues.
-        Keep the summary concise (2-3 sentences).
-        DO NOT use markdown formatting like ** for bold or * for italic in your response.
-        
-        Reviews: {combined_text}
-        """
-    else:  # neutral
-        prompt = f"""
-        Summarize the neutral aspects from these product reviews. Focus on factual observations, balanced opinions, 
-        and specific details mentioned without strong sentiment. Avoid making it sound like a product description.
-        Keep the summary concise (2-3 sentences) and focus on what customers actually said.
-        DO NOT use markdown formatting like ** for bold or * for italic in your response.
-        
-        Reviews: {combined_text}
-        """
-    
     try:
-        response = requests.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}",
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{
-                    "parts": [{"text": prompt}]
-                }],
-                "generationConfig": {
-                    "maxOutputTokens": max_tokens,
-                    "temperature": 0.2,
-                    "topP": 0.8,
-                }
-            }
-        )
-        
-        response_data = response.json()
-        
-        if "candidates" in response_data and len(response_data["candidates"]) > 0:
-            summary = response_data["candidates"][0]["content"]["parts"][0]["text"]
-            return summary.strip()
-        else:
-            print(f"Error generating {summary_type} summary:", response_data)
-            return f"Could not generate {summary_type} summary."
-            
+        return summarize_reviews(reviews, summary_type, max_tokens)
     except Exception as e:
-        print(f"Error calling Gemini API for {summary_type} summary:", str(e))
-        # Fallback to simple summary
-        if len(combined_text) > 200:
-            return combined_text[:200] + "..."
-        return combined_text
-
+        return summary_fallback(reviews, summary_type, e)
+
+def summary_fallback(reviews, summary_type, error):
+    """Return the summary used when summarizing reviews raised `error`."""
+    if isinstance(error, SummaryError):
+        print(f"Error generating {summary_type} summary:", str(error))
+        return f"Could not generate {summary_type} summary."
+    
+    print(f"Error calling Gemini API for {summary_type} summary:", str(error))
+    # Fallback to simple summary
+    combined_text = " ".join(reviews[:20])
+    if len(combined_text) > 200:
+        return combined_text[:200] + "..."
+    return combined_text
+
+# Generation settings for product descriptions
+DESCRIPTION_GENERATION_CONFIG = {
+    "maxOutputTokens": 500,
+    "temperature": 0.2,
+    "topP": 0.8,
+}
+
+@STAGE_SECONDS.time(stage="description")
 def generate_product_description(raw_description_data):
     """Generate a comprehensive product description using Gemini API."""
     if not raw_description_data:
@@ -231,7 +207,15 @@ def generate_product_description(raw_description_data):
     if len(combined_text) < 100:
         return combined_text
     
-    prompt = f"""
+    try:
+        response_data = generate_content(build_description_prompt(combined_text), DESCRIPTION_GENERATION_CONFIG)
+        return description_from_response(response_data)
+    except Exception as e:
+        return description_fallback(combined_text, e)
+
+def build_description_prompt(combined_text):
+    """Build the prompt that turns raw description data into a product description."""
+    return f"""
     Based on the following product information, create a comprehensive and well-structured product description.
     Highlight key features, specifications, and benefits. Format the response with appropriate sections.
     DO NOT use markdown formatting like ** for bold or * for italic in your response.
@@ -239,80 +223,124 @@ def generate_product_description(raw_description_data):
     
     Product Information: {combined_text}
     """
+
+def description_from_response(response_data):
+    """Return the description in a Gemini response, or a placeholder if it has none."""
+    description = extract_text(response_data)
+    if description is not None:
+        return description.strip()
+    print("Error generating product description:", response_data)
+    return "Could not generate product description."
+
+def description_fallback(combined_text, error):
+    """Return the description used when calling Gemini raised `error`."""
+    print(f"Error calling Gemini API for product description:", str(error))
+    # Fallback to original text
+    if len(combined_text) > 300:
+        return combined_text[:300] + "..."
+    return combined_text
+
+# Summaries used when there are no reviews of a given sentiment to summarize
+DEFAULT_SUMMARIES = {
+    "overall": "No reviews available.",
+    "positive": "No positive reviews.",
+    "negative": "No negative reviews.",
+    "neutral": "No neutral reviews."
+}
+
+@STAGE_SECONDS.time(stage="enrichment")
+def run_enrichment_tasks(tasks, on_result=None):
+    """Run independent Gemini enrichment calls concurrently.
     
-    try:
-        response = requests.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}",
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{
-                    "parts": [{"text": prompt}]
-                }],
-                "generationConfig": {
-                    "maxOutputTokens": 500,
-                    "temperature": 0.2,
-                    "topP": 0.8,
-                }
-            }
-        )
+    Args:
+        tasks: Mapping of result name to a (function, args, fallback) tuple
+        on_result: Optional callback invoked with (name, result) as each call finishes
+        
+    Returns a dict mapping each name to its call's result, or to its fallback
+    if the call raised, so one failed call never loses the others.
+    """
+    results = {}
+    if not tasks:
+        return results
+    
+    max_workers = max(1, min(GEMINI_MAX_CONCURRENCY, len(tasks)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(func, *args): name for name, (func, args, _) in tasks.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"Error in enrichment task '{name}':", str(e))
+                results[name] = tasks[name][2]
+            if on_result:
+                on_result(name, results[name])
+    return results
+
+@STAGE_SECONDS.time(stage="sentiment")
+def score_reviews_sentiment(reviews, known=None):
+    """Classify every review and compute sentiment statistics, without summaries.
+    
+    Every review is counted, but only a bounded sample of them, at most
+    REVIEW_SAMPLE_PER_LABEL per label, is kept in "review_sentiments" for the
+    summaries and later refreshes, so memory stays flat however many reviews
+    a crawl yields.
+    
+    Args:
+        reviews: List of reviews, or any iterable such as a review crawler
+            generator, in which case each review is scored as it arrives
+        known: Optional mapping of review fingerprints to labels from an earlier
+            analysis; only reviews missing from it are scored
+    """
+    if reviews is None:
+        reviews = []
+    
+    sentiment_counts = Counter()
+    sample = ReviewSample(REVIEW_SAMPLE_PER_LABEL)
+    
+    def tally(review, label):
+        sentiment_counts[label] += 1
+        sample.add(review, label)
+    
+    if known:
+        # Incremental refresh: reuse the labels of reviews scored before
+        reused = 0
         
-        response_data = response.json()
+        def unscored():
+            nonlocal reused
+            for review in reviews:
+                if review == "No reviews available.":
+                    continue
+                label = known.get(fingerprint(review))
+                if label is None:
+                    yield review
+                else:
+                    reused += 1
+                    tally(review, label)
         
-        if "candidates" in response_data and len(response_data["candidates"]) > 0:
-            description = response_data["candidates"][0]["content"]["parts"][0]["text"]
-            return description.strip()
-        else:
-            print("Error generating product description:", response_data)
-            return "Could not generate product description."
-            
-    except Exception as e:
-        print(f"Error calling Gemini API for product description:", str(e))
-        # Fallback to original text
-        if len(combined_text) > 300:
-            return combined_text[:300] + "..."
-        return combined_text
-
-def analyze_reviews_sentiment(reviews):
-    """Analyze sentiment for all reviews and return detailed analysis."""
-    if not reviews or reviews == ["No reviews available."]:
+        for review, label, _ in score_stream(unscored()):
+            tally(review, label)
+        total = sum(sentiment_counts.values())
+        print(f"♻ Scored {total - reused} new of {total} reviews")
+    elif isinstance(reviews, list):
+        # Analyze all reviews in one batch with the shared analyzer
+        if reviews == ["No reviews available."]:
+            reviews = []
+        for review, (label, _) in zip(reviews, score_reviews(reviews)):
+            tally(review, label)
+    else:
+        for review, label, _ in score_stream(reviews):
+            tally(review, label)
+    
+    total_reviews = sum(sentiment_counts.values())
+    if not total_reviews:
         return {
             "sentiment_counts": {"POSITIVE": 0, "NEGATIVE": 0, "NEUTRAL": 0},
             "sentiment_percentages": {"POSITIVE": 0, "NEGATIVE": 0, "NEUTRAL": 0},
             "review_sentiments": [],
-            "overall_sentiment": "No reviews available for analysis.",
-            "summaries": {
-                "overall": "No reviews available.",
-                "positive": "No positive reviews.",
-                "negative": "No negative reviews.",
-                "neutral": "No neutral reviews."
-            }
+            "overall_sentiment": "No reviews available for analysis."
         }
     
-    # Analyze each review
-    review_sentiments = [(review, analyze_sentiment(review)) for review in reviews]
-    
-    # Group reviews by sentiment
-    positive_reviews = [review for review, sentiment in review_sentiments if sentiment == 'POSITIVE']
-    negative_reviews = [review for review, sentiment in review_sentiments if sentiment == 'NEGATIVE']
-    neutral_reviews = [review for review, sentiment in review_sentiments if sentiment == 'NEUTRAL']
-    
-    # Generate summaries using Gemini API
-    print("Generating review summaries with Gemini API...")
-    
-    # If there are no neutral reviews, don't try to generate a summary for them
-    neutral_summary = "No neutral reviews." if not neutral_reviews else generate_gemini_summary(neutral_reviews, "neutral")
-    
-    summaries = {
-        "overall": generate_gemini_summary(reviews, "overall"),
-        "positive": generate_gemini_summary(positive_reviews, "positive") if positive_reviews else "No positive reviews.",
-        "negative": generate_gemini_summary(negative_reviews, "negative") if negative_reviews else "No negative reviews.",
-        "neutral": neutral_summary
-    }
-    
-    # Count sentiments
-    sentiment_counts = Counter(sentiment for _, sentiment in review_sentiments)
-    total_reviews = len(review_sentiments)
-    
     # Calculate percentages
     sentiment_percentages = {
         sentiment: round((count / total_reviews) * 100, 1)
@@ -330,58 +358,109 @@ def analyze_reviews_sentiment(reviews):
     return {
         "sentiment_counts": dict(sentiment_counts),
         "sentiment_percentages": sentiment_percentages,
-        "review_sentiments": review_sentiments,
-        "overall_sentiment": overall,
-        "summaries": summaries
+        "review_sentiments": sample.items(),
+        "overall_sentiment": overall
+    }
+
+def review_summary_tasks(sentiment_analysis, summarize=None):
+    """Build the enrichment tasks that summarize scored reviews with Gemini.
+    
+    summarize is called as summarize(reviews, summary_type), and defaults to
+    generate_gemini_summary.
+    """
+    review_sentiments = sentiment_analysis["review_sentiments"]
+    if not review_sentiments:
+        return {}
+    
+    # Group reviews by sentiment
+    grouped = group_reviews(review_sentiments)
+    
+    # Only summarize sentiments that actually have reviews
+    return {
+        summary_type: (summarize or generate_gemini_summary, (group, summary_type), f"Could not generate {summary_type} summary.")
+        for summary_type, group in grouped.items() if group
     }
 
+def enrichment_tasks(sentiment_analysis, all_description_data, previous=None, summarize=None, describe=None):
+    """Build the summary and description tasks for a scrape, leaving out those a refresh can reuse.
+    
+    summarize and describe default to generate_gemini_summary and
+    generate_product_description; async callers pass their async versions.
+    
+    Returns (tasks, reused): the tasks to run, and a dict of results kept
+    from the previously stored product.
+    """
+    tasks = review_summary_tasks(sentiment_analysis, summarize)
+    tasks["description"] = (describe or generate_product_description, (all_description_data,), "Could not generate product description.")
+    reused = reusable_enrichment(previous, sentiment_analysis, all_description_data)
+    for name in reused:
+        tasks.pop(name, None)
+        ENRICHMENT_REUSED.inc(task=name)
+    if reused:
+        print(f"♻ Reusing {', '.join(sorted(reused))} from the stored product")
+    return tasks, reused
+
+def collect_summaries(results):
+    """Merge enrichment results into a summaries dict, filling in the defaults."""
+    return {summary_type: results.get(summary_type, default) for summary_type, default in DEFAULT_SUMMARIES.items()}
+
+@STAGE_SECONDS.time(stage="review_analysis")
+def analyze_reviews_sentiment(reviews):
+    """Analyze sentiment for all reviews and return detailed analysis."""
+    sentiment_analysis = score_reviews_sentiment(reviews)
+    
+    # Generate summaries using Gemini API
+    print("Generating review summaries with Gemini API...")
+    results = run_enrichment_tasks(review_summary_tasks(sentiment_analysis))
+    sentiment_analysis["summaries"] = collect_summaries(results)
+    
+    return sentiment_analysis
+
 def extract_product_id_from_url(url):
     """Extract the Amazon product ID (ASIN) from a URL."""
-    # Look for /dp/XXXXXXXXXX/ pattern
-    dp_match = re.search(r'/dp/([A-Z0-9]+)/', url)
+    # Look for /dp/XXXXXXXXXX/ pattern (the trailing slash is optional)
+    dp_match = re.search(r'/dp/([A-Z0-9]+)(?:[/?#]|$)', url)
     if dp_match:
         return dp_match.group(1)
     
     # Look for /gp/product/XXXXXXXXXX/ pattern
-    gp_match = re.search(r'/gp/product/([A-Z0-9]+)/', url)
+    gp_match = re.search(r'/gp/product/([A-Z0-9]+)(?:[/?#]|$)', url)
     if gp_match:
         return gp_match.group(1)
     
     return None
 
-def scrape_amazon_product(query):
-    """Search for the product on Amazon and scrape details.
+def direct_product_url(query):
+    """Return the product page URL for an ASIN or Amazon URL, or None for a product name."""
+    query = query.strip()
+    
+    # Bare ASINs (B0XXXXXXXX, or ISBN-10 for books) map straight to a product page
+    if re.fullmatch(r'B0[0-9A-Z]{8}|\d{9}[\dX]', query):
+        return f"{AMAZON_BASE_URL}/dp/{query}"
     
-    Args:
-        query: Can be either a product name to search for, or a direct Amazon product URL
-    """
     # Check if the input is a URL
-    if query.startswith('http') and 'amazon' in query:
+    if query.startswith('http') and ('amazon' in query or query.startswith(AMAZON_BASE_URL)):
         print(f"🔍 Direct URL detected: {query}")
         product_id = extract_product_id_from_url(query)
         if product_id:
-            product_url = f"https://www.amazon.in/dp/{product_id}"
-        else:
-            # If we can't extract the ID, try using the URL directly
-            product_url = query
-    else:
-        # Treat as a product name search
-        product_url = search_amazon(query)
-    
-    if not product_url:
-        return None
-
-    print(f"🔄 Fetching product details from {product_url} ...")
-    response = fetch_url_with_retries(product_url)
-    
-    if not response:
-        return None
+            return f"{AMAZON_BASE_URL}/dp/{product_id}"
+        # If we can't extract the ID, try using the URL directly
+        return query
+    return None
 
-    data = e.extract(response.text) or {}
+def resolve_product_url(query):
+    """Resolve a product name, ASIN or Amazon URL to a canonical product page URL."""
+    # Treat anything that is not an ASIN or URL as a product name search
+    return direct_product_url(query) or search_amazon(query.strip())
 
-    # Get reviews and analyze sentiment
-    reviews = [review.strip() for review in (data.get("reviews") or []) if review.strip()] or ["No reviews available."]
-    sentiment_analysis = analyze_reviews_sentiment(reviews)
+def build_product_details(data):
+    """Turn fields extracted from a product page into the product record.
+    
+    Returns (product_details, page_reviews, all_description_data); the
+    description and sentiment analysis are left as None to be filled in.
+    """
+    # Get the reviews embedded in the product page
+    page_reviews = [review.strip() for review in (data.get("reviews") or []) if review.strip()]
 
     # Collect all product description data
     description_items = data.get("description", []) or []
@@ -391,10 +470,6 @@ def scrape_amazon_product(query):
     # Combine all description data
     all_description_data = description_items + tech_details + product_desc
     all_description_data = [item.strip() for item in all_description_data if item and item.strip()]
-    
-    # Generate comprehensive product description
-    print("Generating comprehensive product description with Gemini API...")
-    detailed_description = generate_product_description(all_description_data)
 
     # Graceful handling of missing data
     product_details = {
@@ -405,17 +480,45 @@ def scrape_amazon_product(query):
         "Availability": data.get("availability", "N/A").strip() if data.get("availability") else "N/A",
         "Image URL": data.get("image", "N/A").strip() if data.get("image") else "N/A",
         "Raw Description Data": all_description_data,
-        "Detailed Description": detailed_description,
-        "Reviews": reviews,
-        "Sentiment Analysis": sentiment_analysis
+        "Detailed Description": None,
+        "Reviews": page_reviews or ["No reviews available."],
+        "Sentiment Analysis": None
     }
-    return product_details
+    return product_details, page_reviews, all_description_data
+
+def scrape_amazon_product(query, progress=None, previous=None, use_cache=True, fetch=None):
+    """Search for the product on Amazon and scrape details.
+    
+    A blocking entry point to the one scrape pipeline, in async_scraper: it
+    runs on the shared upstream event loop while the calling thread waits.
+    
+    Args:
+        query: Can be either a product name to search for, or a direct Amazon product URL
+        progress: Optional callback invoked as progress(stage, data) when each stage of
+            the pipeline finishes, with data holding the product fields produced so far
+        previous: Optional earlier scrape of the same product. Only reviews it did not
+            score are scored, and its summaries and description are kept unless their
+            inputs changed beyond the refresh thresholds
+        use_cache: Whether product and review pages may be served from the page cache
+        fetch: Optional function, plain or async, used to fetch a URL instead of
+            the shared fetch scheduler
+    """
+    # Imported here, as async_scraper builds on this module
+    from async_scraper import scrape_amazon_product_async
+    return run(scrape_amazon_product_async(query, progress, previous, use_cache, fetch))
 
 def compare_products(product1_info, product2_info):
     """Compare two products using Gemini API."""
     if not product1_info or not product2_info:
         return "Cannot compare products. Missing product information."
     
+    # The same pair compared in either order shares one cached result
+    cache_key = comparison_cache.make_key("pair", [product1_info, product2_info])
+    cached = comparison_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    product1_info, product2_info = canonical_order([product1_info, product2_info])
+    
     # Create a comparison prompt for Gemini
     prompt = f"""
     Compare the following two products in detail:
@@ -443,26 +546,17 @@ def compare_products(product1_info, product2_info):
     """
     
     try:
-        response = requests.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}",
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{
-                    "parts": [{"text": prompt}]
-                }],
-                "generationConfig": {
-                    "maxOutputTokens": 800,
-                    "temperature": 0.2,
-                    "topP": 0.8,
-                }
-            }
-        )
-        
-        response_data = response.json()
+        response_data = generate_content(prompt, {
+            "maxOutputTokens": 800,
+            "temperature": 0.2,
+            "topP": 0.8,
+        })
         
-        if "candidates" in response_data and len(response_data["candidates"]) > 0:
-            comparison = response_data["candidates"][0]["content"]["parts"][0]["text"]
-            return comparison.strip()
+        comparison = extract_text(response_data)
+        if comparison is not None:
+            comparison = comparison.strip()
+            comparison_cache.put(cache_key, comparison, [product1_info, product2_info])
+            return comparison
         else:
             print("Error generating product comparison:", response_data)
             return "Could not generate product comparison."
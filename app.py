@@ -1,43 +1,339 @@
-from flask import Flask, render_template, request, jsonify
-from amazon_review_scraper import scrape_amazon_product, GEMINI_API_KEY, compare_products
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g
+from amazon_review_scraper import (
+    scrape_amazon_product, resolve_product_url, extract_product_id_from_url, compare_products,
+    warm_up_queries, page_cache, query_resolver, fetch_scheduler
+)
+from gemini_client import generate_content_async, stream_content, extract_text, gemini_cache
+from async_scraper import scrape_amazon_product_async, resolve_product_url_async
+from product_store import ProductStore, product_id_for
+from prompt_planner import build_comparison_prompt, build_comparison_question_prompt
+from comparison_cache import comparison_cache, canonical_order
+from similarity_index import SimilarityIndex
+from jobs import JobManager
+from metrics import registry, HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_FLIGHT
+from query_resolver import normalize_query
+from singleflight import SingleFlight
+from http_responses import (
+    parse_fields, select_fields, product_etag, etag_matches, choose_encoding, encoded_etag, compress_response
+)
+import copy
 import json
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import BATCH_MAX_WORKERS, BATCH_MAX_ITEMS, RECOMMEND_MIN_NEIGHBOURS, RECOMMEND_MIN_SIMILARITY
 
 app = Flask(__name__)
-# API key is imported from amazon_review_scraper.py
+# Gemini calls go through the shared client in gemini_client.py
 
-# Store for product data to enable comparison
-product_cache = {}
+# Persistent store for product data, keyed by ASIN, to enable comparison
+product_store = ProductStore()
+
+# Similarity index over every stored product, used to recommend without Gemini
+similarity_index = SimilarityIndex()
+similarity_index.rebuild(product_store.iter_products())
+
+def lookup_product(product_url):
+    """Return (asin, product_id, fresh stored product or None) for a product URL."""
+    asin = extract_product_id_from_url(product_url)
+    product_id = product_id_for(asin, product_url)
+    return asin, product_id, product_store.get_fresh(product_id)
+
+def previous_product(product_id, product_info):
+    """Return the stored product a re-scrape can reuse analysis from, even if it has expired."""
+    return product_info or product_store.get(product_id)
+
+def store_product(product_id, product_info, asin):
+    """Store a newly scraped product and refresh everything derived from it."""
+    # Add product_id to the response and store the product for comparison
+    product_info['product_id'] = product_id
+    evicted = product_store.put(product_id, product_info, asin=asin)
+    similarity_index.add(product_id, product_info)
+    for evicted_id in evicted:
+        similarity_index.remove(evicted_id)
+    
+    # Comparisons that included the old version of this product are stale
+    comparison_cache.invalidate(product_id)
+
+# Concurrent scrapes of the same query or product share one pipeline run; each caller
+# gets its own copy of the product, since callers go on to modify it
+scrape_flights = SingleFlight("scrape", share=copy.deepcopy)
+
+def scrape_and_store(query, progress=None, refresh=False):
+    """Return the product for a name, ASIN or URL, scraping and storing it unless fresh.
+    
+    Returns None if the product could not be found. progress is passed on to
+    scrape_amazon_product to report each pipeline stage. With refresh, a fresh
+    stored product is re-scraped anyway, bypassing the page cache. A product
+    stored before is refreshed incrementally, re-analysing only what changed.
+    
+    Concurrent calls for the same normalized query, or for queries resolving
+    to the same product, wait on a single search and scrape. Each caller gets
+    its own copy of the product. Only the caller that runs the scrape gets
+    progress events; callers that join it get none until the result.
+    """
+    product_url = scrape_flights.do(("resolve", normalize_query(query)), resolve_product_url, query)
+    if not product_url:
+        return None
+    
+    # Serve recently analysed products straight from the store
+    asin, product_id, product_info = lookup_product(product_url)
+    if product_info and not refresh:
+        return product_info
+    
+    return scrape_flights.do(("scrape", product_id), scrape_product, product_url, asin, product_id, product_info, progress, refresh)
+
+def scrape_product(product_url, asin, product_id, product_info, progress, refresh):
+    """Scrape a resolved product, reusing analysis from its stored copy, and store it."""
+    # This will now use Gemini API for enhanced review summaries
+    previous = previous_product(product_id, product_info)
+    product_info = scrape_amazon_product(product_url, progress=progress, previous=previous, use_cache=not refresh)
+    if product_info:
+        store_product(product_id, product_info, asin)
+    return product_info
+
+async def scrape_and_store_async(query, refresh=False):
+    """Async scrape_and_store(), awaiting Amazon and Gemini on the upstream event loop."""
+    product_url = await scrape_flights.do_async(("resolve", normalize_query(query)), resolve_product_url_async, query)
+    if not product_url:
+        return None
+    
+    asin, product_id, product_info = lookup_product(product_url)
+    if product_info and not refresh:
+        return product_info
+    
+    # Shares in-flight scrapes with scrape_and_store() callers too
+    return await scrape_flights.do_async(("scrape", product_id), scrape_product_async, product_url, asin, product_id, product_info, refresh)
+
+async def scrape_product_async(product_url, asin, product_id, product_info, refresh):
+    """Async scrape_product()."""
+    previous = previous_product(product_id, product_info)
+    product_info = await scrape_amazon_product_async(product_url, previous=previous, use_cache=not refresh)
+    if product_info:
+        store_product(product_id, product_info, asin)
+    return product_info
+
+# Background scrape jobs that report progress as each pipeline stage finishes
+job_manager = JobManager(scrape_and_store)
+
+# Cache hit ratios and queue depth are read from their owners when /metrics is scraped
+registry.register_stats("page", page_cache.stats)
+registry.register_stats("query", query_resolver.stats)
+registry.register_stats("gemini", gemini_cache.stats)
+registry.register_stats("comparison", comparison_cache.stats)
+registry.register_gauge_callback("scrape_jobs_pending", "Background scrape jobs that have not finished", job_manager.queue_depth)
+registry.register_gauge_callback("amazon_fetch_queue_depth", "Amazon fetches queued, backing off or running in the fetch scheduler", fetch_scheduler.queue_depth)
+registry.register_gauge_callback("scrapes_in_flight", "Distinct searches and scrapes currently running", scrape_flights.in_flight)
+registry.register_gauge_callback("similarity_index_products", "Products in the recommendation index", lambda: len(similarity_index))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+
+@app.after_request
+def record_request_metrics(response):
+    # Label by URL rule rather than path so IDs in URLs do not create new series
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - g.request_start, route=route, method=request.method, status=str(response.status_code)
+    )
+    return response
+
+@app.after_request
+def compress(response):
+    return compress_response(response, request.headers.get('Accept-Encoding', ''))
+
+def product_response(product):
+    """Return a stored product as JSON, trimmed to the requested fields, with a strong ETag.
+
+    Requests whose If-None-Match matches the ETag get 304 Not Modified.
+    """
+    fields = parse_fields(request.args.get('fields'))
+    etag = product_etag(product, fields)
+    response = jsonify(select_fields(product, fields))
+    # Match against the ETag of the representation the compress hook would send
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''), len(response.get_data()))
+    if etag_matches(request.headers.get('If-None-Match'), encoded_etag(etag, encoding)):
+        response = Response(status=304)
+        response.vary.add('Accept-Encoding')
+        etag = encoded_etag(etag, encoding)
+    response.headers['ETag'] = f'"{etag}"'
+    # Let browsers keep the product but revalidate it on every use
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.teardown_request
+def finish_request(error=None):
+    if 'request_start' in g:
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+
+def wants_stream():
+    """Whether the client asked for a server-sent event stream instead of JSON."""
+    return bool(request.json.get('stream')) or 'text/event-stream' in request.headers.get('Accept', '')
+
+def stream_answer(prompt, generation_config, api_key=None, extra=None):
+    """Relay a Gemini answer to the browser as server-sent events.
+    
+    Each chunk is sent as a data event carrying {"text": ...}; the stream ends
+    with a "done" event carrying any extra response fields, or an "error" event.
+    
+    The generator needs nothing from the request, so it is not wrapped in
+    stream_with_context: async views run in a copied context, and restoring
+    the request context from there fails.
+    """
+    kwargs = {'api_key': api_key} if api_key else {}
+    
+    def generate():
+        try:
+            for chunk in stream_content(prompt, generation_config, **kwargs):
+                yield f"data: {json.dumps({'text': chunk})}\n\n"
+            yield f"event: done\ndata: {json.dumps(extra or {})}\n\n"
+        except Exception as e:
+            print(f"Error streaming Gemini answer: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/metrics')
+def metrics():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/scrape', methods=['POST'])
-def scrape():
+async def scrape():
     query = request.json.get('product_name')
     if not query:
         return jsonify({'error': 'Product name or URL is required'}), 400
+    # Re-scrape a fresh product too, re-analysing only what changed
+    refresh = bool(request.json.get('refresh'))
     
     try:
-        # This will now use Gemini API for enhanced review summaries
-        product_info = scrape_amazon_product(query)
+        product_info = await scrape_and_store_async(query, refresh=refresh)
         if product_info:
-            # Store product in cache for comparison
-            product_id = f"product_{len(product_cache) + 1}"
-            product_cache[product_id] = product_info
-            
-            # Add product_id to the response
-            product_info['product_id'] = product_id
-            
-            return jsonify(product_info)
+            # Scrapes are never revalidated; clients re-read the product from /products/<id>
+            return jsonify(select_fields(product_info, parse_fields(request.json.get('fields'))))
         else:
             return jsonify({'error': 'Could not find product information'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/products/<product_id>', methods=['GET'])
+def get_product(product_id):
+    """Return a stored product, revalidated with If-None-Match against its ETag."""
+    product_info = product_store.get(product_id)
+    if not product_info:
+        return jsonify({'error': 'Product not found'}), 404
+    return product_response(product_info)
+
+@app.route('/scrape_batch', methods=['POST'])
+def scrape_batch():
+    queries = request.json.get('products', [])
+    fields = parse_fields(request.json.get('fields'))
+    
+    if not isinstance(queries, list) or not queries:
+        return jsonify({'error': 'A list of product names, URLs or ASINs is required'}), 400
+    
+    if len(queries) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'At most {BATCH_MAX_ITEMS} products can be scraped in one batch'}), 400
+    
+    def generate():
+        executor = ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(queries)))
+        futures = {executor.submit(scrape_and_store, str(query)): (index, query) for index, query in enumerate(queries)}
+        succeeded = 0
+        try:
+            # Emit one NDJSON line per product as soon as its pipeline finishes
+            for future in as_completed(futures):
+                index, query = futures[future]
+                line = {'index': index, 'query': query}
+                try:
+                    product_info = future.result()
+                except Exception as e:
+                    line.update({'status': 'error', 'error': str(e)})
+                else:
+                    if product_info:
+                        succeeded += 1
+                        line.update({'status': 'ok', 'product': select_fields(product_info, fields)})
+                    else:
+                        line.update({'status': 'error', 'error': 'Could not find product information'})
+                yield json.dumps(line) + "\n"
+            yield json.dumps({'done': True, 'succeeded': succeeded, 'failed': len(queries) - succeeded}) + "\n"
+        finally:
+            # Stop queued work if the client goes away mid-batch
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/warm_up_queries', methods=['POST'])
+def warm_up():
+    queries = request.json.get('queries', [])
+    
+    if not isinstance(queries, list) or not queries:
+        return jsonify({'error': 'A list of search queries is required'}), 400
+    
+    try:
+        return jsonify({'resolved': warm_up_queries([str(query) for query in queries])})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/scrape_jobs', methods=['POST'])
+def create_scrape_job():
+    query = request.json.get('product_name')
+    if not query:
+        return jsonify({'error': 'Product name or URL is required'}), 400
+    
+    job = job_manager.submit(query)
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f'/scrape_jobs/{job.id}',
+        'events_url': f'/scrape_jobs/{job.id}/events'
+    }), 202
+
+@app.route('/scrape_jobs/<job_id>', methods=['GET'])
+def get_scrape_job(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    # Clients polling for progress pass the number of events they have already seen
+    since = request.args.get('since', 0, type=int)
+    return jsonify(job.to_dict(since=since))
+
+@app.route('/scrape_jobs/<job_id>/events', methods=['GET'])
+def stream_scrape_job(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def generate():
+        seq = request.args.get('since', 0, type=int)
+        while True:
+            events = job.wait_for_events(seq, timeout=15)
+            if not events:
+                # Keep idle connections open through proxies
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                yield f"id: {event['seq']}\nevent: {event['stage']}\ndata: {json.dumps(event['data'])}\n\n"
+                seq = event['seq'] + 1
+                if event['stage'] in ('completed', 'failed'):
+                    return
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/ask_gemini', methods=['POST'])
-def ask_gemini():
+async def ask_gemini():
     user_question = request.json.get('question')
     product_context = request.json.get('product_context')
     
@@ -59,22 +355,21 @@ def ask_gemini():
         Avoid using markdown formatting like ** for bold or * for italic in your response.
         """
         
-        # Call Gemini API
-        response = requests.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}",
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{
-                    "parts": [{"text": prompt}]
-                }]
-            }
-        )
+        generation_config = {
+            "temperature": 0.2,
+            "topP": 0.8,
+        }
         
-        response_data = response.json()
+        # Stream the answer as it is generated when the client supports it
+        if wants_stream():
+            return stream_answer(prompt, generation_config)
+        
+        # Call Gemini API
+        response_data = await generate_content_async(prompt, generation_config)
         
         # Extract the text response from Gemini
-        if "candidates" in response_data and len(response_data["candidates"]) > 0:
-            answer = response_data["candidates"][0]["content"]["parts"][0]["text"]
+        answer = extract_text(response_data)
+        if answer is not None:
             return jsonify({"answer": answer})
         else:
             return jsonify({"error": "No response from Gemini API"}), 500
@@ -83,99 +378,42 @@ def ask_gemini():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/compare_multiple_products', methods=['POST'])
-def compare_multiple_products():
+async def compare_multiple_products():
     product_ids = request.json.get('product_ids', [])
     
     if not product_ids or len(product_ids) < 2:
         return jsonify({'error': 'At least two product IDs are required'}), 400
     
-    # Check if all products exist in cache
-    missing_products = [pid for pid in product_ids if pid not in product_cache]
+    # Check if all products exist in the store
+    products, missing_products = product_store.get_many(product_ids)
     if missing_products:
         return jsonify({'error': f'Products not found in cache: {", ".join(missing_products)}'}), 404
     
     try:
-        # Get all products from cache
-        products = [product_cache[pid] for pid in product_ids]
         product_names = [p['Product Name'] for p in products]
         
-        # Create a comparison prompt for Gemini
-        products_info = []
-        for i, product in enumerate(products):
-            # Shorten description length when comparing many products
-            description_length = 300 if len(products) <= 5 else 150
-            
-            product_info = f"""
-            PRODUCT {i+1}: {product['Product Name']}
-            Price: {product['Price']}
-            Rating: {product['Rating']}
-            Description: {product['Detailed Description'][:description_length]}...
-            Overall Review Summary: {product['Sentiment Analysis']['summaries']['overall']}
-            """
-            products_info.append(product_info)
-        
-        products_text = "\n\n".join(products_info)
-        
-        # Adjust prompt based on number of products
-        if len(products) <= 5:
-            comparison_instruction = """
-            Provide a comprehensive comparison including:
-            1. Price comparison across all products
-            2. Feature comparison highlighting strengths of each product
-            3. Quality and performance comparison based on reviews
-            4. Pros and cons of each product
-            5. Overall recommendation
-            """
-        else:
-            comparison_instruction = """
-            Provide a concise comparison focusing on:
-            1. Price comparison with a short table format
-            2. Key features comparison highlighting main differences
-            3. Main pros and cons for each product
-            4. Overall recommendation
-            """
-        
-        prompt = f"""
-        Compare the following {len(products)} products:
-        
-        {products_text}
-        
-        {comparison_instruction}
-        
-        Format the response in a clear, structured way with sections.
-        DO NOT use markdown formatting like ** for bold or * for italic in your response.
-        Use clear section headings and structured content instead.
-        """
-        
-        # Calculate token count and adjust max_output_tokens
-        # Roughly estimate 4 tokens per word
-        estimated_input_tokens = len(prompt.split()) * 1.5
-        max_output_tokens = 2000 if len(products) <= 5 else 1000
+        # The same set of products compared in any order shares one cached result
+        cache_key = comparison_cache.make_key("multi", products)
+        comparison = comparison_cache.get(cache_key)
+        if comparison is not None:
+            return jsonify({
+                'comparison': comparison,
+                'product_names': product_names
+            })
         
-        # Ensure we don't exceed Gemini's max token limits
-        if estimated_input_tokens + max_output_tokens > 30000:
-            max_output_tokens = min(max_output_tokens, 30000 - estimated_input_tokens)
+        # Build the comparison prompt from the products' compact digests, in a canonical order
+        prompt, max_output_tokens = build_comparison_prompt(canonical_order(products))
         
         # Call Gemini API
-        response = requests.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}",
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{
-                    "parts": [{"text": prompt}]
-                }],
-                "generationConfig": {
-                    "maxOutputTokens": int(max_output_tokens),
-                    "temperature": 0.2,
-                    "topP": 0.8,
-                }
-            }
-        )
-        
-        response_data = response.json()
-        
-        if "candidates" in response_data and len(response_data["candidates"]) > 0:
-            comparison = response_data["candidates"][0]["content"]["parts"][0]["text"]
+        response_data = await generate_content_async(prompt, {
+            "maxOutputTokens": int(max_output_tokens),
+            "temperature": 0.2,
+            "topP": 0.8,
+        })
+        
+        comparison = extract_text(response_data)
+        if comparison is not None:
+            comparison_cache.put(cache_key, comparison, products)
             return jsonify({
                 'comparison': comparison,
                 'product_names': product_names
@@ -189,7 +427,7 @@ def compare_multiple_products():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/ask_comparison', methods=['POST'])
-def ask_comparison():
+async def ask_comparison():
     user_question = request.json.get('question')
     product_ids = request.json.get('product_ids', [])
     
@@ -199,73 +437,33 @@ def ask_comparison():
     if not product_ids or len(product_ids) < 2:
         return jsonify({'error': 'At least two product IDs are required'}), 400
     
-    # Check if all products exist in cache
-    missing_products = [pid for pid in product_ids if pid not in product_cache]
+    # Check if all products exist in the store
+    products, missing_products = product_store.get_many(product_ids)
     if missing_products:
         return jsonify({'error': f'Products not found in cache: {", ".join(missing_products)}'}), 404
     
     try:
-        # Get all products from cache
-        products = [product_cache[pid] for pid in product_ids]
         product_names = [p['Product Name'] for p in products]
         
-        # Create context for all products
-        products_info = []
-        for i, product in enumerate(products):
-            # Adjust description length based on number of products
-            description_length = 200 if len(products) <= 5 else 100
-            
-            product_info = f"""
-            PRODUCT {i+1}: {product['Product Name']}
-            Price: {product['Price']}
-            Rating: {product['Rating']}
-            Description: {product['Detailed Description'][:description_length]}...
-            Overall Review Summary: {product['Sentiment Analysis']['summaries']['overall']}
-            """
-            products_info.append(product_info)
-        
-        context = "\n\n".join(products_info)
-        
-        # Prepare the prompt
-        prompt = f"""
-        {context}
-        
-        User Question: {user_question}
-        
-        Please answer the user's question comparing these {len(products)} products based on the information provided.
-        Be concise but thorough, focusing directly on answering the question asked.
-        DO NOT use markdown formatting like ** for bold or * for italic in your response.
-        """
+        # Build the question prompt from the products' compact digests
+        prompt, max_output_tokens = build_comparison_question_prompt(products, user_question)
         
-        # Estimate token count for dynamic allocation
-        estimated_input_tokens = len(prompt.split()) * 1.5
-        max_output_tokens = 800 if len(products) <= 5 else 500
+        generation_config = {
+            "maxOutputTokens": int(max_output_tokens),
+            "temperature": 0.2,
+            "topP": 0.8,
+        }
         
-        # Ensure we don't exceed Gemini's max token limits
-        if estimated_input_tokens + max_output_tokens > 30000:
-            max_output_tokens = min(max_output_tokens, 30000 - estimated_input_tokens)
+        # Stream the answer as it is generated when the client supports it
+        if wants_stream():
+            return stream_answer(prompt, generation_config, extra={"product_names": product_names})
         
         # Call Gemini API
-        response = requests.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}",
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{
-                    "parts": [{"text": prompt}]
-                }],
-                "generationConfig": {
-                    "maxOutputTokens": int(max_output_tokens),
-                    "temperature": 0.2,
-                    "topP": 0.8,
-                }
-            }
-        )
-        
-        response_data = response.json()
+        response_data = await generate_content_async(prompt, generation_config)
         
         # Extract the text response from Gemini
-        if "candidates" in response_data and len(response_data["candidates"]) > 0:
-            answer = response_data["candidates"][0]["content"]["parts"][0]["text"]
+        answer = extract_text(response_data)
+        if answer is not None:
             return jsonify({
                 "answer": answer,
                 "product_names": product_names
@@ -280,16 +478,45 @@ def ask_comparison():
 def animations():
     return render_template('animations.html')
 
+def local_recommendations(product_id, product, limit=8):
+    """Recommend already analysed products similar to a product, most similar first."""
+    neighbours = similarity_index.most_similar(product_id, product, k=limit, min_score=RECOMMEND_MIN_SIMILARITY)
+    # Only read, so recommendations neither write to the store nor reorder its LRU eviction
+    found, missing = product_store.get_many([neighbour_id for neighbour_id, _ in neighbours], touch=False)
+    if missing:
+        # Gone from the store (e.g. evicted by another process); drop them and rank again
+        for neighbour_id in missing:
+            similarity_index.remove(neighbour_id)
+        return local_recommendations(product_id, product, limit)
+    recommendations = []
+    for (neighbour_id, score), neighbour in zip(neighbours, found):
+        sentiment = neighbour.get('Sentiment Analysis') or {}
+        positive = (sentiment.get('sentiment_percentages') or {}).get('POSITIVE')
+        reason = f"Similar to {product['Product Name'][:60]}, rated {neighbour.get('Rating', 'N/A')}"
+        if positive is not None:
+            reason += f" with {positive}% positive reviews"
+        recommendations.append({
+            "name": neighbour.get('Product Name', 'N/A'),
+            "reason": reason + ".",
+            "price_range": neighbour.get('Price', 'N/A'),
+            "product_id": neighbour_id,
+            "similarity": round(score, 3),
+        })
+    return recommendations
+
 @app.route('/recommend_products', methods=['POST'])
-def recommend_products():
+async def recommend_products():
     product_id = request.json.get('product_id')
     
-    if not product_id or product_id not in product_cache:
+    product = product_store.get(product_id) if product_id else None
+    if not product:
         return jsonify({'error': 'Valid product ID is required'}), 400
     
     try:
-        # Get the product from cache
-        product = product_cache[product_id]
+        # Recommend from products already analysed when enough similar ones are stored
+        recommendations = local_recommendations(product_id, product)
+        if len(recommendations) >= RECOMMEND_MIN_NEIGHBOURS:
+            return jsonify({"recommendations": recommendations, "source": "index"})
         
         # Create a prompt for Gemini to recommend similar products
         prompt = f"""
@@ -315,26 +542,17 @@ def recommend_products():
         Do not include any text before or after the JSON array.
         """
         
-        # Call Gemini API
-        response = requests.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}",
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{
-                    "parts": [{"text": prompt}]
-                }],
-                "generationConfig": {
-                    "temperature": 0.2,
-                    "topP": 0.8,
-                }
-            }
-        )
+        generation_config = {
+            "temperature": 0.2,
+            "topP": 0.8,
+        }
         
-        response_data = response.json()
+        # Call Gemini API
+        response_data = await generate_content_async(prompt, generation_config)
         
         # Extract the text response from Gemini
-        if "candidates" in response_data and len(response_data["candidates"]) > 0:
-            recommendations_json = response_data["candidates"][0]["content"]["parts"][0]["text"]
+        recommendations_json = extract_text(response_data)
+        if recommendations_json is not None:
             
             # Clean up the JSON string (remove markdown code blocks if present)
             recommendations_json = recommendations_json.replace("```json", "").replace("```", "").strip()
@@ -354,7 +572,7 @@ def recommend_products():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/chatbot', methods=['POST'])
-def chatbot():
+async def chatbot():
     user_message = request.json.get('message')
     
     if not user_message:
@@ -374,28 +592,23 @@ def chatbot():
         Avoid using markdown formatting like ** for bold or * for italic in your response.
         """
         
-        # Call Gemini API
-        response = requests.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={gemini_api_key}",
-            headers={"Content-Type": "application/json"},
-            json={
-                "contents": [{
-                    "parts": [{"text": prompt}]
-                }],
-                "generationConfig": {
-                    "temperature": 0.7,
-                    "topP": 0.8,
-                    "maxOutputTokens": 800
-                }
-            }
-        )
+        generation_config = {
+            "temperature": 0.7,
+            "topP": 0.8,
+            "maxOutputTokens": 800
+        }
         
-        response_data = response.json()
+        # Stream the answer as it is generated when the client supports it
+        if wants_stream():
+            return stream_answer(prompt, generation_config, api_key=gemini_api_key)
+        
+        # Call Gemini API
+        response_data = await generate_content_async(prompt, generation_config, api_key=gemini_api_key)
         print("Gemini API response:", response_data)  # Debug print
         
         # Extract the text response from Gemini
-        if "candidates" in response_data and len(response_data["candidates"]) > 0:
-            answer = response_data["candidates"][0]["content"]["parts"][0]["text"]
+        answer = extract_text(response_data)
+        if answer is not None:
             return jsonify({"answer": answer})
         else:
             print("Error response from Gemini API:", response_data)  # Debug print
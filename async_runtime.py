@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+_loop = None
+_lock = threading.Lock()
+
+def get_loop():
+    """Return the process-wide event loop for upstream I/O, starting it on first use.
+
+    The loop runs forever in a daemon thread. Every async Gemini call and
+    the waits on async Amazon fetches run on it, so they share one
+    connection pool and one set of concurrency limits per upstream.
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="upstream-io", daemon=True).start()
+            _loop = loop
+        return _loop
+
+def submit(coro):
+    """Schedule a coroutine on the upstream loop, returning a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+def run(coro, timeout=None):
+    """Run a coroutine on the upstream loop from synchronous code and return its result."""
+    return submit(coro).result(timeout)
+
+def iterate(aiterable):
+    """Iterate an async iterable on the upstream loop from synchronous code.
+
+    Each item is awaited when the consumer asks for it, so a consumer in a
+    worker thread handles one item while the iterable works on the next.
+    """
+    iterator = aiterable.__aiter__()
+    try:
+        while True:
+            try:
+                yield run(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        if hasattr(iterator, "aclose"):
+            run(iterator.aclose())
+
+async def in_runtime(coro):
+    """Await a coroutine on the upstream loop from any event loop.
+
+    Flask runs each async view on an event loop of its own; awaiting through
+    this hands the I/O to the shared loop instead.
+    """
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
@@ -0,0 +1,216 @@
+import asyncio
+import re
+import time
+from functools import partial
+from urllib.parse import quote_plus
+from async_runtime import in_runtime, iterate
+from page_cache import classify_url
+from extraction import extract_product_data
+from review_crawler import iter_reviews_async, unique_reviews
+from summarizer import summarize_reviews_async
+from prompt_planner import build_digest
+from refresh import known_labels
+from gemini_client import generate_content_async
+from metrics import AMAZON_FETCH_SECONDS, STAGE_SECONDS
+from amazon_review_scraper import (
+    page_cache, query_resolver, fetch_scheduler, stale_page, direct_product_url,
+    extract_product_id_from_url, build_product_details, score_reviews_sentiment, enrichment_tasks,
+    collect_summaries, summary_fallback, build_description_prompt, description_from_response,
+    description_fallback, DESCRIPTION_GENERATION_CONFIG
+)
+from config import AMAZON_BASE_URL, AMAZON_FETCH_TIMEOUT, REVIEW_CRAWL_ENABLED
+
+async def _fetch_url(url, max_retries, use_cache):
+    """Async counterpart of amazon_review_scraper._fetch_url, returning (page, outcome).
+
+    The request itself is queued on the shared fetch scheduler, so async and
+    threaded fetches share one worker pool, rate limit and circuit breaker
+    per host.
+    """
+    if use_cache:
+        cached = await asyncio.to_thread(page_cache.get, url)
+        if cached:
+            print(f"📦 Page cache hit: {url}")
+            return cached, "cache_hit"
+
+    if fetch_scheduler.rejects(url):
+        return await asyncio.to_thread(stale_page, url, use_cache)
+
+    # Shielded, so a caller giving up does not cancel the scheduler's future
+    try:
+        response, outcome = await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(fetch_scheduler.submit(url, max_retries))), AMAZON_FETCH_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        print(f"❌ Timed out waiting for {url}")
+        return None, "timed_out"
+
+    if outcome == "circuit_open":
+        return await asyncio.to_thread(stale_page, url, use_cache)
+    if outcome == "ok" and use_cache:
+        await asyncio.to_thread(page_cache.put, url, response.text)
+    return response, outcome
+
+async def fetch_url_async(url, max_retries=5, use_cache=True):
+    """Async fetch_url_with_retries(), run on the shared upstream event loop.
+
+    Waiting on the fetch scheduler, its backoff and rate limit is an await,
+    so it holds neither a scheduler worker nor the event loop.
+    """
+    async def fetch():
+        start = time.perf_counter()
+        page, outcome = await _fetch_url(url, max_retries, use_cache)
+        AMAZON_FETCH_SECONDS.observe(time.perf_counter() - start, page_type=classify_url(url), outcome=outcome)
+        return page
+    return await in_runtime(fetch())
+
+def as_async_fetch(fetch):
+    """Return an async version of a fetch function; plain functions run in a worker thread."""
+    if asyncio.iscoroutinefunction(fetch):
+        return fetch
+
+    async def fetch_in_thread(url):
+        return await asyncio.to_thread(fetch, url)
+    return fetch_in_thread
+
+async def search_amazon_async(product_name, fetch=fetch_url_async):
+    """Async search_amazon(), answering from the query resolver cache when it can."""
+    asin = query_resolver.get(product_name)
+    if asin:
+        product_url = f"{AMAZON_BASE_URL}/dp/{asin}"
+        print(f"✅ Resolved '{product_name}' from cache: {product_url}")
+        return product_url
+
+    print(f"🔍 Searching for '{product_name}' on Amazon...")
+    response = await fetch(f"{AMAZON_BASE_URL}/s?k={quote_plus(product_name)}")
+    if not response:
+        return None
+
+    match = re.search(r'/dp/([A-Z0-9]+)/', response.text)
+    if not match:
+        print("❌ No products found.")
+        return None
+    query_resolver.put(product_name, match.group(1))
+    product_url = f"{AMAZON_BASE_URL}/dp/{match.group(1)}"
+    print(f"✅ Found product URL: {product_url}")
+    return product_url
+
+async def resolve_product_url_async(query, fetch=fetch_url_async):
+    """Async resolve_product_url()."""
+    return direct_product_url(query) or await search_amazon_async(query.strip(), fetch)
+
+async def generate_gemini_summary_async(reviews, summary_type="overall", max_tokens=200):
+    """Async generate_gemini_summary(), with the same fallbacks."""
+    if not reviews:
+        return f"No {summary_type} reviews available to summarize."
+    try:
+        return await summarize_reviews_async(reviews, summary_type, max_tokens)
+    except Exception as e:
+        return summary_fallback(reviews, summary_type, e)
+
+async def generate_product_description_async(raw_description_data):
+    """Async generate_product_description(), with the same fallbacks."""
+    if not raw_description_data:
+        return "No product description available."
+
+    combined_text = " ".join(raw_description_data)
+    if len(combined_text) < 100:
+        return combined_text
+
+    try:
+        response_data = await generate_content_async(build_description_prompt(combined_text), DESCRIPTION_GENERATION_CONFIG)
+        return description_from_response(response_data)
+    except Exception as e:
+        return description_fallback(combined_text, e)
+
+async def run_enrichment_tasks_async(tasks, on_result=None):
+    """Async run_enrichment_tasks(): tasks map names to (coroutine function, args, fallback)."""
+    async def run(name, func, args, fallback):
+        try:
+            result = await func(*args)
+        except Exception as e:
+            print(f"Error in enrichment task '{name}':", str(e))
+            result = fallback
+        if on_result:
+            on_result(name, result)
+        return name, result
+
+    return dict(await asyncio.gather(*(run(name, *task) for name, task in tasks.items())))
+
+def _no_progress(stage, data=None):
+    """Default progress callback for scrape_amazon_product_async."""
+
+@STAGE_SECONDS.time(stage="extraction")
+def _extract(page_html):
+    return extract_product_data(page_html) or {}
+
+async def _scrape(query, fetch, progress, previous):
+    """The scrape pipeline behind scrape_amazon_product and scrape_amazon_product_async."""
+    product_url = await resolve_product_url_async(query, fetch)
+    if not product_url:
+        return None
+    progress("searched", {"product_url": product_url})
+
+    print(f"🔄 Fetching product details from {product_url} ...")
+    response = await fetch(product_url)
+    if not response:
+        return None
+    progress("fetched", {"product_url": product_url})
+
+    # Parsing and sentiment scoring are CPU-bound, so they run off the event loop
+    data = await asyncio.to_thread(_extract, response.text)
+    product_details, page_reviews, all_description_data = build_product_details(data)
+    progress("parsed", {key: value for key, value in product_details.items() if value is not None})
+
+    # Reviews are scored in a worker thread as the crawl on the event loop yields them
+    asin = extract_product_id_from_url(product_url)
+    review_source = page_reviews
+    if REVIEW_CRAWL_ENABLED and asin:
+        print(f"📚 Crawling review pages for {asin} ...")
+        review_source = unique_reviews(page_reviews, iterate(iter_reviews_async(asin, fetch)))
+    known = known_labels(previous and previous.get("Sentiment Analysis"))
+    sentiment_analysis = await asyncio.to_thread(score_reviews_sentiment, review_source, known)
+    reviews = [review for review, _ in sentiment_analysis["review_sentiments"]] or ["No reviews available."]
+    product_details["Reviews"] = reviews
+    progress("sentiment_done", {"Reviews": reviews, "Sentiment Analysis": dict(sentiment_analysis)})
+
+    def report_enrichment(name, result):
+        if name == "description":
+            progress("description_done", {"Detailed Description": result})
+        else:
+            progress(f"summary_{name}_done", {"summary_type": name, "summary": result})
+
+    # Every summary and the description still to generate are awaited together on the event loop
+    print("Generating review summaries and product description with Gemini API...")
+    tasks, reused = enrichment_tasks(
+        sentiment_analysis, all_description_data, previous,
+        summarize=generate_gemini_summary_async, describe=generate_product_description_async
+    )
+    for name, result in reused.items():
+        report_enrichment(name, result)
+    results = await run_enrichment_tasks_async(tasks, on_result=report_enrichment)
+    results.update(reused)
+    product_details["Detailed Description"] = results.pop("description")
+    sentiment_analysis["summaries"] = collect_summaries(results)
+    product_details["Sentiment Analysis"] = sentiment_analysis
+
+    # Precompute the compact digest used by comparison prompts
+    product_details["Digest"] = build_digest(product_details)
+    return product_details
+
+async def scrape_amazon_product_async(query, progress=None, previous=None, use_cache=True, fetch=None):
+    """Async scrape_amazon_product(), producing the same product record.
+
+    The pipeline runs on the shared upstream event loop, so scrapes waiting
+    on Amazon or Gemini share it instead of each holding a pool worker. The
+    Flask worker thread serving the request still waits for the result.
+
+    fetch, plain or async, replaces fetch_url_async for every page the
+    scrape fetches; use_cache then does not apply.
+    """
+    fetch = as_async_fetch(fetch) if fetch else partial(fetch_url_async, use_cache=use_cache)
+
+    async def scrape():
+        with STAGE_SECONDS.time(stage="scrape"):
+            return await _scrape(query, fetch, progress or _no_progress, previous)
+    return await in_runtime(scrape())
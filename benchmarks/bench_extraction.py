@@ -0,0 +1,56 @@
+"""Compare the lxml extraction engine against selectorlib on saved product pages.
+
+Usage:
+    python benchmarks/bench_extraction.py [--pages DIR] [--repeat N]
+
+DIR holds saved Amazon product pages (*.html); synthetic pages built from
+product_data.json are used when it has none.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selectorlib import Extractor # type: ignore
+from extraction import PRODUCT_SELECTORS_YAML, PRODUCT_CONTAINER_IDS, ProductExtractor
+from fixtures import FIXTURES_DIR, load_pages
+
+def time_extractor(extract, pages, repeat):
+    """Return the mean seconds per page over repeat passes."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            extract(page)
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default=FIXTURES_DIR, help="directory of saved product pages")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the pages")
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages)
+    baseline = Extractor.from_yaml_string(PRODUCT_SELECTORS_YAML)
+    engine = ProductExtractor.from_yaml_string(PRODUCT_SELECTORS_YAML, PRODUCT_CONTAINER_IDS)
+
+    # Both engines must agree before their speed means anything
+    for index, page in enumerate(pages):
+        expected = baseline.extract(page) or {}
+        actual = engine.extract(page)
+        for field, value in expected.items():
+            if (value or None) != (actual.get(field) or None):
+                print(f"⚠ Page {index}: field '{field}' differs: {value!r} != {actual.get(field)!r}")
+
+    average_kb = sum(len(page) for page in pages) / len(pages) / 1024
+    baseline_time = time_extractor(baseline.extract, pages, args.repeat)
+    engine_time = time_extractor(engine.extract, pages, args.repeat)
+
+    print(f"Pages: {len(pages)} (average {average_kb:.0f} KB), repeat: {args.repeat}")
+    print(f"selectorlib Extractor: {baseline_time * 1000:8.2f} ms/page")
+    print(f"ProductExtractor:      {engine_time * 1000:8.2f} ms/page")
+    print(f"Speedup:               {baseline_time / engine_time:8.2f}x")
+
+if __name__ == "__main__":
+    main()
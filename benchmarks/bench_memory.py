@@ -0,0 +1,102 @@
+"""Compare the memory footprint of product dicts and compact ProductRecords.
+
+Usage:
+    python benchmarks/bench_memory.py [--products N] [--reviews N]
+
+Products are built from product_data.json with scaled review sets, scored
+sentiment, summaries, a description and a digest, like scrape results.
+Footprints are measured with tracemalloc for two kinds of product dict:
+dicts as the scraper builds them, where "Reviews" and the sentiment analysis
+share review strings, and dicts decoded from JSON (the product store, job
+results), where every review is held twice.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amazon_review_scraper import score_reviews_sentiment
+from prompt_planner import build_digest
+from product_record import ProductRecord
+from fixtures import load_product_record, scaled_products
+
+def build_products(count, reviews_per_product):
+    """Return scrape-shaped product dicts, encoded as JSON."""
+    encoded = []
+    for product in scaled_products(load_product_record(), count, reviews_per_product):
+        sentiment_analysis = score_reviews_sentiment(product["Reviews"])
+        sentiment_analysis["summaries"] = {
+            summary_type: f"Customers mostly found the {summary_type} points of this product noteworthy. " * 3
+            for summary_type in ("overall", "positive", "negative", "neutral")
+        }
+        product["Reviews"] = [review for review, _ in sentiment_analysis["review_sentiments"]]
+        product["Sentiment Analysis"] = sentiment_analysis
+        product["Detailed Description"] = " ".join(product.get("Raw Description Data") or [product["Product Name"]]) * 5
+        product["Digest"] = build_digest(product)
+        product["content_version"] = "0" * 16
+        encoded.append(json.dumps(product))
+    return encoded
+
+def scraped_shape(encoded):
+    """Decode a product and share review strings between its fields, as the scraper does."""
+    product = json.loads(encoded)
+    pairs = [tuple(pair) for pair in product["Sentiment Analysis"]["review_sentiments"]]
+    product["Sentiment Analysis"]["review_sentiments"] = pairs
+    product["Reviews"] = [review for review, _ in pairs]
+    return product
+
+def footprint(build, items):
+    """Return the bytes per item still allocated after building and keeping every item."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(item) for item in items]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / len(items)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200, help="products to build")
+    parser.add_argument("--reviews", type=int, default=100, help="reviews per product")
+    args = parser.parse_args()
+
+    encoded = build_products(args.products, args.reviews)
+
+    # Every form must serialize back to the same JSON before its size means anything
+    for item in encoded[:5]:
+        assert json.dumps(ProductRecord.from_dict(json.loads(item)).to_dict()) == item
+        assert json.dumps(ProductRecord.from_compact(ProductRecord.from_dict(json.loads(item)).to_compact()).to_dict()) == item
+
+    results = [
+        ("dict, decoded from JSON", footprint(json.loads, encoded)),
+        ("dict, as scraped", footprint(scraped_shape, encoded)),
+        ("ProductRecord", footprint(lambda item: ProductRecord.from_dict(json.loads(item)), encoded)),
+    ]
+
+    full_bytes = sum(len(item) for item in encoded) / len(encoded)
+    compact_bytes = sum(len(json.dumps(ProductRecord.from_dict(json.loads(item)).to_compact())) for item in encoded) / len(encoded)
+
+    records = [ProductRecord.from_dict(json.loads(item)) for item in encoded]
+    start = time.perf_counter()
+    for record in records:
+        record.to_dict()
+    to_dict_ms = (time.perf_counter() - start) * 1000 / len(records)
+
+    print(f"Products: {args.products}, reviews per product: {args.reviews}")
+    baseline = results[0][1]
+    for label, size in results:
+        print(f"{label:26} {size / 1024:9.1f} KB/product  ({size / baseline:5.2f}x)")
+    print(f"{'JSON, product dict':26} {full_bytes / 1024:9.1f} KB/product")
+    print(f"{'JSON, compact record':26} {compact_bytes / 1024:9.1f} KB/product  ({compact_bytes / full_bytes:5.2f}x)")
+    print(f"{'ProductRecord.to_dict()':26} {to_dict_ms:9.3f} ms/product")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import glob
+import html
+import json
+import os
+import random
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PRODUCT_DATA_PATH = os.path.join(ROOT_DIR, "product_data.json")
+
+def load_product_record(path=PRODUCT_DATA_PATH):
+    """Load a recorded product record such as product_data.json."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def synthetic_product_page(product, padding_kb=1024, seed=0):
+    """Build an Amazon-like product page around a recorded product record.
+
+    The fields the scraper extracts sit in the same elements as on a real
+    page, surrounded by roughly padding_kb of inline scripts, styles and
+    navigation markup so the page has a realistic size and shape.
+    """
+    rng = random.Random(seed)
+    escape = html.escape
+
+    bullets = "".join(
+        f'<li><span class="a-list-item">{escape(item)}</span></li>'
+        for item in product.get("Raw Description Data", [])[:8]
+    )
+    reviews = "".join(
+        f'<div class="a-row review-data"><div class="a-expander-content review-text-content">'
+        f'<span>{escape(review)}</span></div></div>'
+        for review in product.get("Reviews", [])
+    )
+    body = f"""
+    <div id="dp-container">
+      <div id="centerCol">
+        <h1 id="title"><span id="productTitle" class="a-size-large">  {escape(product.get("Product Name", ""))}  </span></h1>
+        <div id="averageCustomerReviews"><span class="a-icon-alt">{escape(product.get("Rating", ""))}</span>
+          <span id="acrCustomerReviewText">{escape(product.get("Number of Reviews", ""))}</span></div>
+        <div id="corePrice"><span class="a-price"><span class="a-offscreen">{escape(product.get("Price", ""))}</span>
+          <span aria-hidden="true">{escape(product.get("Price", ""))}</span></span></div>
+        <div id="availability"><span class="a-size-medium a-color-success">  {escape(product.get("Availability", ""))}  </span></div>
+        <div id="feature-bullets"><ul class="a-unordered-list">{bullets}</ul></div>
+      </div>
+      <div id="imgTagWrapperId"><img id="landingImage" src="{escape(product.get("Image URL", ""))}"></div>
+      <div id="productDescription"><p>{escape(product.get("Detailed Description", "") or "")}</p></div>
+      <div id="cm-cr-dp-review-list">{reviews}</div>
+    </div>
+    """
+
+    # Filler that dominates real pages: analytics scripts, CSS and navigation links
+    filler = []
+    size = 0
+    while size < padding_kb * 1024:
+        kind = rng.random()
+        if kind < 0.5:
+            blob = json.dumps({f"k{i}": rng.random() for i in range(200)})
+            chunk = f'<script type="text/javascript">P.when("A").execute(function(){{var d={blob};}});</script>'
+        elif kind < 0.7:
+            chunk = "<style>" + "".join(f".c{rng.randint(0, 99999)}{{margin:{rng.randint(0, 20)}px}}" for _ in range(100)) + "</style>"
+        else:
+            links = "".join(f'<li><a href="/dp/B0{rng.randint(10000000, 99999999)}">Item {i}</a></li>' for i in range(50))
+            chunk = f'<div class="nav-sprite"><ul>{links}</ul></div>'
+        filler.append(chunk)
+        size += len(chunk)
+
+    half = len(filler) // 2
+    return (
+        "<!doctype html><html><head><title>Amazon.in</title>"
+        + "".join(filler[:half])
+        + "</head><body>"
+        + body
+        + "".join(filler[half:])
+        + "</body></html>"
+    )
+
+def load_pages(directory=FIXTURES_DIR, count=3):
+    """Return saved .html product pages from directory, or synthetic ones if there are none."""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    if pages:
+        return pages
+
+    product = load_product_record()
+    return [synthetic_product_page(product, seed=seed) for seed in range(count)]
+
+def scaled_reviews(product, count, seed=0):
+    """Return `count` reviews built from a product record's recorded reviews.
+
+    Recorded reviews are cycled with a few words shuffled in from the others,
+    so every review is distinct (deduplication cannot shortcut the work) while
+    keeping realistic length and vocabulary.
+    """
+    rng = random.Random(seed)
+    base = [review for review in product.get("Reviews", []) if review and review != "No reviews available."]
+    if not base:
+        base = ["Good product, works as described."]
+    words = " ".join(base).split()
+    return [
+        f"{base[i % len(base)]} {' '.join(rng.choice(words) for _ in range(rng.randint(3, 12)))}"
+        for i in range(count)
+    ]
+
+def scaled_products(product, count, reviews_per_product=20, seed=0):
+    """Return `count` distinct product records derived from one recorded product."""
+    products = []
+    for i in range(count):
+        record = dict(product)
+        record["Product Name"] = f"{product.get('Product Name', 'Product')} (variant {i + 1})"
+        record["product_id"] = f"product_BENCH{i:06d}"
+        record["Reviews"] = scaled_reviews(product, reviews_per_product, seed=seed + i)
+        products.append(record)
+    return products
@@ -0,0 +1,201 @@
+"""Load test the Flask app against local stand-ins for Amazon and Gemini.
+
+Usage:
+    python benchmarks/loadtest.py [--scenario scrape|ask_comparison|all]
+                                  [--concurrency 1,4,16] [--requests 100]
+                                  [--amazon-latency 0.3] [--amazon-503-rate 0.05]
+                                  [--gemini-latency 0.8] [--gemini-error-rate 0.02]
+                                  [--output FILE]
+
+Stub servers from stub_servers.py are started in this process, and the app
+is started in a subprocess with AMAZON_BASE_URL and GEMINI_BASE_URL pointing
+at them. It runs from a scratch directory, so its product store and caches
+start empty. Each scenario is driven at every concurrency level in turn, and
+the harness reports throughput and p50/p95/p99 latency.
+
+Requests cycle through --unique-products distinct products, so a small value
+measures the warm path served from the product store and caches, and a
+large one measures cold scrapes.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from fixtures import ROOT_DIR
+from stub_servers import AmazonStubHandler, GeminiStubHandler, StubSettings, start_stub
+
+SCENARIOS = ("scrape", "ask_comparison")
+
+# Seconds to wait for the app to import its dependencies and start listening
+APP_STARTUP_TIMEOUT = 120
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_app(amazon_url, gemini_url, port):
+    """Start the app in a scratch directory, pointed at the stub servers."""
+    env = dict(os.environ)
+    env["AMAZON_BASE_URL"] = amazon_url
+    env["GEMINI_BASE_URL"] = f"{gemini_url}/v1beta/models"
+    env["PYTHONPATH"] = ROOT_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    command = [sys.executable, "-c", f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    process = subprocess.Popen(command, cwd=tempfile.mkdtemp(prefix="loadtest-"), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    app_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + APP_STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited during startup with code {process.returncode}")
+        try:
+            requests.get(f"{app_url}/metrics", timeout=1)
+            return process, app_url
+        except requests.exceptions.RequestException:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"App did not start within {APP_STARTUP_TIMEOUT}s")
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class Driver:
+    """Sends scenario requests to the app, one requests.Session per worker thread."""
+
+    def __init__(self, app_url, unique_products, timeout):
+        self.app_url = app_url
+        self.unique_products = unique_products
+        self.timeout = timeout
+        self.product_ids = []
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _post(self, path, body):
+        return self._session().post(f"{self.app_url}{path}", json=body, timeout=self.timeout)
+
+    def scrape(self, i):
+        return self._post("/scrape", {"product_name": f"loadtest product {i % self.unique_products}"})
+
+    def ask_comparison(self, i):
+        question = f"Which of these is better for use case {i % self.unique_products}?"
+        return self._post("/ask_comparison", {"question": question, "product_ids": self.product_ids})
+
+    def prepare_comparison(self, count=3):
+        """Scrape the products every ask_comparison request compares."""
+        for i in range(count):
+            response = self._post("/scrape", {"product_name": f"loadtest comparison product {i}"})
+            response.raise_for_status()
+            self.product_ids.append(response.json()["product_id"])
+
+    def run(self, scenario, concurrency, total):
+        """Send `total` requests with `concurrency` in flight, returning a result summary."""
+        send = getattr(self, scenario)
+
+        def timed(i):
+            start = time.perf_counter()
+            try:
+                status = send(i).status_code
+            except requests.exceptions.RequestException:
+                status = None
+            return time.perf_counter() - start, status
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(timed, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _ in outcomes)
+        statuses = {}
+        for _, status in outcomes:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            "scenario": scenario,
+            "concurrency": concurrency,
+            "requests": total,
+            "errors": sum(count for status, count in statuses.items() if status != "200"),
+            "statuses": statuses,
+            "throughput_rps": total / elapsed if elapsed else None,
+            "p50_s": percentile(latencies, 0.50),
+            "p95_s": percentile(latencies, 0.95),
+            "p99_s": percentile(latencies, 0.99),
+            "max_s": latencies[-1] if latencies else None,
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario and concurrency level")
+    parser.add_argument("--unique-products", type=int, default=50, help="distinct products or questions requested")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds before a request counts as failed")
+    parser.add_argument("--amazon-latency", type=float, default=0.3)
+    parser.add_argument("--amazon-503-rate", type=float, default=0.05)
+    parser.add_argument("--amazon-page-kb", type=int, default=1024, help="size of stub product pages")
+    parser.add_argument("--review-pages", type=int, default=3, help="product-reviews pages per stub product")
+    parser.add_argument("--gemini-latency", type=float, default=0.8)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.02)
+    parser.add_argument("--gemini-words", type=int, default=120, help="words in each stub Gemini answer")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    amazon_server, amazon_url = start_stub(AmazonStubHandler, StubSettings(
+        latency=args.amazon_latency, error_rate=args.amazon_503_rate,
+        payload_kb=args.amazon_page_kb, review_pages=args.review_pages
+    ))
+    gemini_server, gemini_url = start_stub(GeminiStubHandler, StubSettings(
+        latency=args.gemini_latency, error_rate=args.gemini_error_rate, response_words=args.gemini_words
+    ))
+    print(f"Amazon stub at {amazon_url}, Gemini stub at {gemini_url}")
+
+    process, app_url = start_app(amazon_url, gemini_url, free_port())
+    print(f"App running at {app_url}\n")
+
+    results = []
+    try:
+        driver = Driver(app_url, args.unique_products, args.timeout)
+        scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+        if "ask_comparison" in scenarios:
+            driver.prepare_comparison()
+
+        print(f"{'scenario':16} {'conc':>5} {'reqs':>6} {'errors':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for scenario in scenarios:
+            for concurrency in (int(level) for level in args.concurrency.split(",") if level):
+                result = driver.run(scenario, concurrency, args.requests)
+                results.append(result)
+                print(
+                    f"{scenario:16} {concurrency:5d} {result['requests']:6d} {result['errors']:6d} "
+                    f"{result['throughput_rps']:8.2f} {result['p50_s'] * 1000:9.1f} "
+                    f"{result['p95_s'] * 1000:9.1f} {result['p99_s'] * 1000:9.1f}"
+                )
+    finally:
+        process.terminate()
+        process.wait()
+        amazon_server.shutdown()
+        gemini_server.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Time the offline stages of the scrape pipeline and write the results as JSON.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--pages DIR] [--sizes 10,1000,100000]
+                                        [--output FILE] [--baseline FILE]
+
+Stages are timed against saved product pages (or synthetic ones built from
+product_data.json) and review sets scaled from its recorded reviews, so no
+request is sent to Amazon or Gemini. Each benchmark repeats until it has run
+for --min-time seconds, and the fastest and median runs are recorded along
+with the git commit, so result files from two commits can be compared with
+--baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction import extract_page
+from amazon_review_scraper import analyze_sentiment, score_reviews_sentiment, review_summary_tasks
+from summarizer import pack_reviews
+from prompt_planner import build_digest, build_comparison_prompt, build_comparison_question_prompt
+from config import SUMMARY_CHUNK_TOKENS
+from fixtures import FIXTURES_DIR, ROOT_DIR, load_pages, load_product_record, scaled_reviews, scaled_products
+
+# Runs slower than this are not repeated, so the 100k review sets finish in reasonable time
+SLOW_RUN_SECONDS = 5.0
+
+# Ratio to a baseline result above which a benchmark is reported as a regression
+REGRESSION_THRESHOLD = 1.10
+
+def measure(func, min_time, max_repeat=1000):
+    """Call func repeatedly for at least min_time seconds, returning the run times."""
+    times = []
+    started = time.perf_counter()
+    while len(times) < max_repeat:
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+        if times[0] > SLOW_RUN_SECONDS or time.perf_counter() - started >= min_time:
+            break
+    return times
+
+def git_commit():
+    """Return the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_benchmarks(pages, product, sizes):
+    """Return (name, params, setup) for every benchmark to run.
+
+    setup() builds the benchmark's fixtures and returns (func, extra_params),
+    so only the benchmarks selected with --only pay for their fixtures.
+    Fixtures used by several benchmarks, such as a scored review set, are
+    built once and shared.
+    """
+    built = {}
+
+    def shared(key, build):
+        if key not in built:
+            built[key] = build()
+        return built[key]
+
+    def reviews_for(size):
+        return shared(("reviews", size), lambda: scaled_reviews(product, size))
+
+    def analysis_for(size):
+        return shared(("analysis", size), lambda: score_reviews_sentiment(reviews_for(size)))
+
+    def encoded_record(size):
+        # Serializing a scraped product, as /scrape responses and the product store do
+        def build():
+            record = dict(product, Reviews=reviews_for(size), **{"Sentiment Analysis": analysis_for(size)})
+            return record, json.dumps(record)
+        return shared(("record", size), build)
+
+    def products_for(count):
+        def build():
+            products = scaled_products(product, count)
+            for record in products:
+                record["Sentiment Analysis"] = score_reviews_sentiment(record["Reviews"])
+            return products
+        return shared(("products", count), build)
+
+    benchmarks = []
+
+    for index, page in enumerate(pages):
+        benchmarks.append((
+            "extract_page", {"page": index, "kb": len(page) // 1024},
+            lambda page=page: (lambda: extract_page(page), {})
+        ))
+
+    for size in sizes:
+        benchmarks.append((
+            "analyze_sentiment", {"reviews": size},
+            lambda size=size: (lambda reviews=reviews_for(size): [analyze_sentiment(review) for review in reviews], {})
+        ))
+        benchmarks.append((
+            "score_reviews_sentiment", {"reviews": size},
+            lambda size=size: (lambda reviews=reviews_for(size): score_reviews_sentiment(reviews), {})
+        ))
+
+        # The offline half of analyze_reviews_sentiment: grouping and packing reviews into summary prompts
+        benchmarks.append((
+            "summary_packing", {"reviews": size},
+            lambda size=size: (lambda analysis=analysis_for(size): [
+                pack_reviews(args[0], SUMMARY_CHUNK_TOKENS) for _, args, _ in review_summary_tasks(analysis).values()
+            ], {})
+        ))
+
+        benchmarks.append((
+            "json_dumps", {"reviews": size},
+            lambda size=size: (lambda record=encoded_record(size)[0]: json.dumps(record), {"kb": len(encoded_record(size)[1]) // 1024})
+        ))
+        benchmarks.append((
+            "json_loads", {"reviews": size},
+            lambda size=size: (lambda encoded=encoded_record(size)[1]: json.loads(encoded), {"kb": len(encoded_record(size)[1]) // 1024})
+        ))
+
+    for count in (2, 5, 10):
+        benchmarks.append((
+            "build_digest", {"products": count},
+            lambda count=count: (lambda products=products_for(count): [build_digest(p) for p in products], {})
+        ))
+        benchmarks.append((
+            "build_comparison_prompt", {"products": count},
+            lambda count=count: (lambda products=products_for(count): build_comparison_prompt(products), {})
+        ))
+        benchmarks.append((
+            "build_comparison_question_prompt", {"products": count},
+            lambda count=count: (
+                lambda products=products_for(count): build_comparison_question_prompt(products, "Which one has the best battery life?"),
+                {}
+            )
+        ))
+
+    return benchmarks
+
+def compare_to_baseline(results, baseline_path):
+    """Print each benchmark's median time relative to a baseline result file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in json.load(f)["results"]}
+
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        previous = baseline.get((result["name"], json.dumps(result["params"], sort_keys=True)))
+        if not previous or not previous["median_s"]:
+            continue
+        ratio = result["median_s"] / previous["median_s"]
+        flag = "  ⚠ regression" if ratio > REGRESSION_THRESHOLD else ""
+        print(f"{result['name']:34} {json.dumps(result['params']):32} {ratio:6.2f}x{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default=FIXTURES_DIR, help="directory of saved product pages")
+    parser.add_argument("--sizes", default="10,1000,100000", help="comma-separated review set sizes")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to repeat each benchmark for")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this text")
+    parser.add_argument("--output", default=os.path.join(ROOT_DIR, "benchmarks", "results.json"), help="result file to write")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    benchmarks = build_benchmarks(load_pages(args.pages), load_product_record(), sizes)
+
+    results = []
+    for name, params, setup in benchmarks:
+        if args.only and args.only not in name:
+            continue
+        func, extra_params = setup()
+        params = dict(params, **extra_params)
+        times = measure(func, args.min_time)
+        result = {
+            "name": name,
+            "params": params,
+            "runs": len(times),
+            "min_s": min(times),
+            "median_s": statistics.median(times),
+        }
+        results.append(result)
+        print(f"{name:34} {json.dumps(params):32} {result['median_s'] * 1000:10.2f} ms (min {result['min_s'] * 1000:.2f}, {len(times)} runs)")
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        compare_to_baseline(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Local stand-ins for Amazon and the Gemini API, used by the load test.
+
+The Amazon stub serves search results, /dp/ product pages and
+product-reviews pages in the same markup the scraper extracts from; the
+Gemini stub answers generateContent and streamGenerateContent. Both add
+configurable latency and error rates, so the app can be load tested without
+sending a single request to either service.
+"""
+import hashlib
+import html
+import json
+import random
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from fixtures import load_product_record, scaled_reviews, synthetic_product_page
+
+# Reviews served on each product-reviews page, as on Amazon
+REVIEWS_PER_PAGE = 10
+
+class StubSettings:
+    """Behaviour of a stub server.
+
+    Args:
+        latency: Mean seconds added to every response
+        jitter: Fraction of the latency the actual delay varies by, either way
+        error_rate: Probability of answering with an error status instead
+        payload_kb: Approximate size of Amazon product pages, in KB
+        review_pages: Product-reviews pages served per product before an empty one
+        response_words: Words in each Gemini answer
+        stream_chunks: Server-sent events a streamed Gemini answer is split into
+    """
+
+    def __init__(self, latency=0.1, jitter=0.5, error_rate=0.0, payload_kb=1024, review_pages=3,
+                 response_words=120, stream_chunks=5):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.payload_kb = payload_kb
+        self.review_pages = review_pages
+        self.response_words = response_words
+        self.stream_chunks = stream_chunks
+
+    def delay(self):
+        spread = self.latency * self.jitter
+        time.sleep(max(0.0, random.uniform(self.latency - spread, self.latency + spread)))
+
+    def should_fail(self):
+        return random.random() < self.error_rate
+
+def stub_asin(query):
+    """Return the ASIN the Amazon stub resolves a search query to."""
+    return "B0" + hashlib.sha1(query.strip().lower().encode("utf-8")).hexdigest()[:8].upper()
+
+@lru_cache(maxsize=256)
+def _product_page(asin, payload_kb):
+    product = dict(load_product_record())
+    product["Product Name"] = f"{product.get('Product Name', 'Product')} ({asin})"
+    seed = int(hashlib.sha1(asin.encode("utf-8")).hexdigest()[:8], 16)
+    return synthetic_product_page(product, padding_kb=payload_kb, seed=seed).encode("utf-8")
+
+@lru_cache(maxsize=1024)
+def _reviews_page(asin, page_number, review_pages):
+    reviews = []
+    if page_number <= review_pages:
+        seed = int(hashlib.sha1(f"{asin}:{page_number}".encode("utf-8")).hexdigest()[:8], 16)
+        reviews = scaled_reviews(load_product_record(), REVIEWS_PER_PAGE, seed=seed)
+    body = "".join(f'<div class="review"><span data-hook="review-body"><span>{html.escape(review)}</span></span></div>' for review in reviews)
+    return f"<!doctype html><html><body><div id=\"cm_cr-review_list\">{body}</div></body></html>".encode("utf-8")
+
+def _answer_text(settings, seed):
+    rng = random.Random(seed)
+    words = " ".join(load_product_record().get("Reviews", [])).split() or ["lorem", "ipsum"]
+    return " ".join(rng.choice(words) for _ in range(settings.response_words))
+
+class _StubHandler(BaseHTTPRequestHandler):
+    settings = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class AmazonStubHandler(_StubHandler):
+    def do_GET(self):
+        self.settings.delay()
+        if self.settings.should_fail():
+            self._send(503, b"<html><body>Service Unavailable</body></html>")
+            return
+
+        parts = urlsplit(self.path)
+        segments = [segment for segment in parts.path.split("/") if segment]
+        query = parse_qs(parts.query)
+
+        if segments == ["s"]:
+            asin = stub_asin(query.get("k", [""])[0])
+            body = f'<html><body><div data-asin="{asin}"><a href="/dp/{asin}/ref=sr_1_1">Result</a></div></body></html>'
+            self._send(200, body.encode("utf-8"))
+        elif len(segments) >= 2 and segments[0] == "dp":
+            self._send(200, _product_page(segments[1], self.settings.payload_kb))
+        elif len(segments) >= 2 and segments[0] == "product-reviews":
+            page_number = int(query.get("pageNumber", ["1"])[0])
+            self._send(200, _reviews_page(segments[1], page_number, self.settings.review_pages))
+        else:
+            self._send(404, b"<html><body>Not Found</body></html>")
+
+class GeminiStubHandler(_StubHandler):
+    def do_POST(self):
+        payload = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.settings.delay()
+        if self.settings.should_fail():
+            status = random.choice((429, 503))
+            self._send(status, json.dumps({"error": {"code": status}}).encode("utf-8"), "application/json")
+            return
+
+        text = _answer_text(self.settings, hashlib.sha1(payload).hexdigest())
+        path = urlsplit(self.path).path
+        if path.endswith(":generateContent"):
+            body = {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+            self._send(200, json.dumps(body).encode("utf-8"), "application/json")
+        elif path.endswith(":streamGenerateContent"):
+            self._stream(text)
+        else:
+            self._send(404, b'{"error": {"code": 404}}', "application/json")
+
+    def _stream(self, text):
+        """Send the answer as server-sent events, like streamGenerateContent?alt=sse."""
+        words = text.split(" ")
+        size = max(1, len(words) // max(1, self.settings.stream_chunks))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for start in range(0, len(words), size):
+            chunk = " ".join(words[start:start + size]) + " "
+            event = {"candidates": [{"content": {"parts": [{"text": chunk}]}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.settings.latency / max(1, self.settings.stream_chunks))
+
+def start_stub(handler_class, settings, host="127.0.0.1", port=0):
+    """Start a stub server in a daemon thread, returning (server, base_url)."""
+    handler = type(handler_class.__name__, (handler_class,), {"settings": settings})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
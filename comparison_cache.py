@@ -0,0 +1,109 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from config import COMPARISON_CACHE_TTL, COMPARISON_CACHE_MAX_ENTRIES
+
+# Fields that describe where a product is stored rather than what it is
+VERSION_EXCLUDED_FIELDS = ("product_id", "content_version")
+
+def content_version(product):
+    """Hash a product's content, so any change from a re-scrape yields a new version."""
+    content = {key: value for key, value in product.items() if key not in VERSION_EXCLUDED_FIELDS}
+    material = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()[:16]
+
+def product_identity(product):
+    """Return a stable identity for a product: its product ID, or a hash of its name."""
+    if product.get("product_id"):
+        return product["product_id"]
+    return "name_" + hashlib.sha1(str(product.get("Product Name", "")).encode("utf-8")).hexdigest()[:10]
+
+def canonical_order(products):
+    """Sort products by identity so the same set always produces the same prompt."""
+    return sorted(products, key=product_identity)
+
+class ComparisonCache:
+    """In-memory LRU of comparison results keyed by an unordered set of products.
+
+    Keys combine each member's identity with its content version, so a
+    re-scraped product never matches an old entry; invalidate() also drops
+    those entries eagerly to free memory.
+    """
+
+    def __init__(self, ttl=COMPARISON_CACHE_TTL, max_entries=COMPARISON_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._keys_by_product = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, kind, products, extra=None):
+        """Build an order-insensitive key for a comparison of `products`.
+
+        Args:
+            kind: Which comparison produced the result, e.g. "multi" or "pair"
+            products: Product dicts being compared, in any order
+            extra: Anything else that changes the result, such as a question
+        """
+        members = sorted((product_identity(p), p.get("content_version") or content_version(p)) for p in products)
+        material = json.dumps({"kind": kind, "members": members, "extra": extra}, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return a cached comparison result, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[1] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, result, products):
+        """Cache a comparison result for the given member products."""
+        with self._lock:
+            identities = [product_identity(p) for p in products]
+            self._entries[key] = (result, time.time(), identities)
+            self._entries.move_to_end(key)
+            for identity in identities:
+                self._keys_by_product.setdefault(identity, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, product_id):
+        """Drop every cached comparison that includes a product."""
+        with self._lock:
+            for key in list(self._keys_by_product.get(product_id, ())):
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for identity in entry[2]:
+            keys = self._keys_by_product.get(identity)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_product[identity]
+
+    def stats(self):
+        """Return hit/miss counters and the number of cached comparisons."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+# Shared by /compare_multiple_products and compare_products
+comparison_cache = ComparisonCache()
@@ -1,2 +1,131 @@
 # Configuration file for API keys and other sensitive information
-GEMINI_API_KEY = "YOUR_GEMINI_API_KEY"  # Replace with your actual API key 
\ No newline at end of file
+import os
+
+# Gemini API key, read from the environment so it never lives in the source
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
+
+# Maximum number of Gemini calls issued in parallel while enriching a product
+GEMINI_MAX_CONCURRENCY = 5
+
+# Worker processes used to score very large review sets (0 disables the process pool)
+SENTIMENT_PROCESSES = 0
+# Minimum number of reviews before the sentiment process pool is used
+SENTIMENT_PROCESS_THRESHOLD = 5000
+
+# SQLite database holding scraped products, keyed by ASIN
+PRODUCT_STORE_PATH = "cache/products.db"
+# Seconds before a stored product is considered stale and re-scraped by /scrape
+PRODUCT_STORE_TTL = 6 * 60 * 60
+# Maximum number of products kept before the least recently used are evicted
+PRODUCT_STORE_MAX_PRODUCTS = 1000
+# Seconds before reading a product records a new access time; reads in between do not write
+PRODUCT_STORE_TOUCH_INTERVAL = 5 * 60
+
+# Directory holding the compressed on-disk cache of fetched Amazon pages
+PAGE_CACHE_DIR = "cache/pages"
+# Seconds a cached page stays fresh, per URL class
+PAGE_CACHE_TTLS = {
+    "search": 15 * 60,
+    "product": 2 * 60 * 60,
+    "reviews": 6 * 60 * 60,
+    "default": 30 * 60,
+}
+# Maximum size of the page cache on disk before old pages are evicted
+PAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# SQLite database backing the persistent tier of the Gemini response cache
+GEMINI_CACHE_PATH = "cache/gemini.db"
+# Seconds a cached Gemini response stays valid
+GEMINI_CACHE_TTL = 7 * 24 * 60 * 60
+# Responses kept in the in-memory LRU tier
+GEMINI_CACHE_MEMORY_ENTRIES = 512
+# Responses kept in the persistent tier before the oldest are evicted
+GEMINI_CACHE_MAX_ENTRIES = 20000
+# Requests sampled above this temperature bypass the cache
+GEMINI_CACHE_MAX_TEMPERATURE = 0.3
+
+# Seconds to wait for a connection to Gemini, and for its response
+GEMINI_CONNECT_TIMEOUT = 5
+GEMINI_READ_TIMEOUT = 60
+# Retries for Gemini calls that hit 429/5xx responses or network errors
+GEMINI_MAX_RETRIES = 3
+# Base and cap, in seconds, of the jittered exponential backoff between retries
+GEMINI_BACKOFF_BASE = 0.5
+GEMINI_BACKOFF_MAX = 8
+# Keep-alive connections held open to Gemini
+GEMINI_POOL_SIZE = 20
+
+# Process-wide caps on concurrent Amazon page fetches and Gemini requests
+AMAZON_MAX_CONCURRENT_FETCHES = 4
+GEMINI_MAX_CONCURRENT_CALLS = 10
+# Requests per second allowed to each Amazon host, and the burst allowed above that rate
+AMAZON_RATE_PER_SECOND = 2.0
+AMAZON_RATE_BURST = 4
+# Backoff before retrying a throttled Amazon fetch: the base doubles per attempt, up to the cap, with jitter
+AMAZON_BACKOFF_BASE = 2
+AMAZON_BACKOFF_MAX = 30
+# Consecutive failed Amazon attempts that open a host's circuit, and seconds before a probe is let through
+AMAZON_CIRCUIT_FAILURE_THRESHOLD = 5
+AMAZON_CIRCUIT_RESET_TIMEOUT = 60
+# Seconds a caller waits for a scheduled Amazon fetch, including queueing and every retry
+AMAZON_FETCH_TIMEOUT = 120
+# Products scraped in parallel by /scrape_batch, and the largest batch accepted
+BATCH_MAX_WORKERS = 8
+BATCH_MAX_ITEMS = 200
+
+# Worker threads running background scrape jobs, and finished jobs kept for polling
+JOB_MAX_WORKERS = 4
+JOB_MAX_RETAINED = 500
+
+# Worker processes used to extract fields from product pages (0 extracts in-process)
+EXTRACTION_PROCESSES = 0
+
+# Crawl the product-reviews pages for more reviews than the product page shows. Off by
+# default: each page is one more rate-limited Amazon request per scrape (about half a
+# second at AMAZON_RATE_PER_SECOND) and counts towards the circuit breaker's failures
+REVIEW_CRAWL_ENABLED = False
+# Most review pages and reviews crawled per product, and pages fetched in parallel
+REVIEW_CRAWL_MAX_PAGES = 3
+REVIEW_CRAWL_MAX_REVIEWS = 100
+REVIEW_CRAWL_PARALLEL_PAGES = 3
+# Scored reviews kept per sentiment label for summaries and refreshes; every review is still counted
+REVIEW_SAMPLE_PER_LABEL = 250
+
+# Estimated input tokens of reviews packed into one summarization call
+SUMMARY_CHUNK_TOKENS = 6000
+
+# Seconds a resolved search query keeps mapping to the same ASIN, and queries remembered
+QUERY_CACHE_TTL = 24 * 60 * 60
+QUERY_CACHE_MAX_ENTRIES = 10000
+
+# Gemini's combined input and output token limit used when sizing prompts
+GEMINI_CONTEXT_TOKENS = 30000
+# Input token budgets for the product context in comparison and comparison-question prompts
+COMPARISON_CONTEXT_TOKENS = 6000
+COMPARISON_QUESTION_CONTEXT_TOKENS = 4000
+
+# Seconds a cached comparison result stays valid, and comparisons kept in memory
+COMPARISON_CACHE_TTL = 24 * 60 * 60
+COMPARISON_CACHE_MAX_ENTRIES = 1000
+
+# Hashed feature buckets per product vector, and reviews per product included in it
+SIMILARITY_DIMENSIONS = 4096
+SIMILARITY_REVIEWS_PER_PRODUCT = 50
+# Similar stored products needed to answer /recommend_products without Gemini, and the minimum cosine score counted
+RECOMMEND_MIN_NEIGHBOURS = 3
+RECOMMEND_MIN_SIMILARITY = 0.15
+
+# Base URLs for Amazon and the Gemini API, overridable from the environment so a
+# load test can point the app at local stand-in servers
+AMAZON_BASE_URL = os.environ.get("AMAZON_BASE_URL", "https://www.amazon.in").rstrip("/")
+GEMINI_BASE_URL = os.environ.get("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/models").rstrip("/")
+
+# Responses smaller than this are sent uncompressed, and the gzip level and brotli quality used otherwise
+RESPONSE_COMPRESSION_MIN_BYTES = 1024
+RESPONSE_GZIP_LEVEL = 6
+RESPONSE_BROTLI_QUALITY = 5
+
+# Share of a summary's reviews, or of the raw description items, that may be added or
+# removed before an incremental refresh regenerates it instead of keeping the stored one
+REFRESH_SUMMARY_CHANGE_THRESHOLD = 0.2
+REFRESH_DESCRIPTION_CHANGE_THRESHOLD = 0.1
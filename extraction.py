@@ -0,0 +1,195 @@
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import yaml
+from lxml import etree, html as lxml_html
+from cssselect import HTMLTranslator
+from config import EXTRACTION_PROCESSES
+
+# CSS selectors for Amazon product details, in selectorlib's YAML format
+PRODUCT_SELECTORS_YAML = """
+product_name:
+    css: 'span#productTitle'
+    type: Text
+
+price:
+    css: 'span.a-price span.a-offscreen'
+    type: Text
+
+rating:
+    css: 'span.a-icon-alt'
+    type: Text
+
+num_reviews:
+    css: 'span#acrCustomerReviewText'
+    type: Text
+
+availability:
+    css: 'div#availability span'
+    type: Text
+
+image:
+    css: 'img#landingImage'
+    type: Attribute
+    attribute: src
+
+description:
+    css: 'div#feature-bullets .a-list-item'
+    multiple: true
+    type: Text
+
+technical_details:
+    css: '#productDetails_techSpec_section_1 tr, #productDetails_detailBullets_sections1 tr'
+    multiple: true
+    type: Text
+
+product_description:
+    css: '#productDescription p'
+    multiple: true
+    type: Text
+
+reviews:
+    css: 'div.review-text-content span'
+    multiple: true
+    type: Text
+"""
+
+# CSS selectors for the review bodies on a product-reviews page
+REVIEW_SELECTORS_YAML = """
+reviews:
+    css: 'span[data-hook="review-body"]'
+    multiple: true
+    type: Text
+"""
+
+# Elements that enclose every extracted field on a product page. Only these
+# subtrees are parsed; the scripts, styles and navigation around them are not
+PRODUCT_CONTAINER_IDS = (
+    "dp-container", "ppd", "centerCol", "imageBlock", "feature-bullets", "prodDetails",
+    "productDetails_feature_div", "productDescription", "reviewsMedley", "cm-cr-dp-review-list",
+)
+
+# Element that encloses the reviews on a product-reviews page
+REVIEW_CONTAINER_IDS = ("cm_cr-review_list",)
+
+# Name of the tag opened at a position in the page
+TAG_NAME_PATTERN = re.compile(r'<([a-zA-Z][a-zA-Z0-9]*)')
+
+# Pages are handed to lxml as UTF-8 bytes so encoding declarations are allowed
+HTML_PARSER = lxml_html.HTMLParser(encoding="utf-8")
+
+class ProductExtractor:
+    """Targeted replacement for selectorlib's Extractor.
+
+    Selectors are compiled to XPath once. Given container ids, only the
+    subtrees of those elements are sliced out of the page and parsed, so the
+    rest of the page never reaches lxml; a page with none of the containers
+    is parsed whole. Text fields join the element's stripped text nodes with
+    spaces, as selectorlib does, so the output matches Extractor.extract().
+    """
+
+    def __init__(self, selectors, containers=()):
+        translator = HTMLTranslator()
+        self.fields = []
+        for name, config in selectors.items():
+            xpath = etree.XPath(translator.css_to_xpath(config["css"]))
+            self.fields.append((name, config, xpath))
+        # One pass over the page finds every container; the "id=" prefix keeps the scan fast
+        self.containers = re.compile(
+            r'id=["\'](?:{})["\']'.format("|".join(re.escape(container) for container in containers))
+        ) if containers else None
+
+    @classmethod
+    def from_yaml_string(cls, yaml_string, containers=()):
+        return cls(yaml.safe_load(yaml_string), containers)
+
+    def _element_end(self, page_html, tag, start):
+        """Return the end of the element opened at start, by counting nested tags of the same name."""
+        depth = 0
+        for match in re.compile(rf'<(/?){tag}\b[^>]*>', re.I).finditer(page_html, start):
+            if match.group(1):
+                depth -= 1
+                if depth == 0:
+                    return match.end()
+            elif not match.group(0).endswith("/>"):
+                depth += 1
+        return len(page_html)
+
+    def _slice(self, page_html):
+        """Return the container subtrees in page order; containers nested in one already taken are skipped."""
+        fragments = []
+        taken_until = 0
+        for match in self.containers.finditer(page_html) if self.containers else ():
+            # Skip nested containers, and attributes such as data-id= that only end in "id="
+            if match.start() < taken_until or not page_html[match.start() - 1].isspace():
+                continue
+            begin = page_html.rfind("<", taken_until, match.start())
+            tag = TAG_NAME_PATTERN.match(page_html, begin) if begin != -1 else None
+            if tag is None:
+                continue
+            taken_until = self._element_end(page_html, tag.group(1), begin)
+            fragments.append(page_html[begin:taken_until])
+        return fragments
+
+    def _parse(self, page_html):
+        fragments = self._slice(page_html)
+        if fragments:
+            page_html = "<html><body>" + "".join(fragments) + "</body></html>"
+        if not page_html.strip():
+            return None
+        return lxml_html.fromstring(page_html.encode("utf-8"), parser=HTML_PARSER)
+
+    def _value(self, element, config):
+        if config.get("type", "Text") == "Attribute":
+            return element.get(config["attribute"])
+        texts = [text.strip() for text in element.xpath(".//text()") if text.strip()]
+        return " ".join(texts)
+
+    def extract(self, page_html):
+        """Extract every configured field from a page's HTML."""
+        root = self._parse(page_html)
+        data = {}
+        for name, config, xpath in self.fields:
+            elements = xpath(root) if root is not None else []
+            if config.get("multiple"):
+                data[name] = [self._value(element, config) for element in elements]
+            else:
+                data[name] = self._value(elements[0], config) if elements else None
+        return data
+
+product_extractor = ProductExtractor.from_yaml_string(PRODUCT_SELECTORS_YAML, PRODUCT_CONTAINER_IDS)
+review_extractor = ProductExtractor.from_yaml_string(REVIEW_SELECTORS_YAML, REVIEW_CONTAINER_IDS)
+
+def extract_page(page_html):
+    """Extract product fields from a page with the shared extractor."""
+    return product_extractor.extract(page_html)
+
+# Worker processes let extraction run outside the GIL under concurrent load
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        with _process_pool_lock:
+            if _process_pool is None:
+                _process_pool = ProcessPoolExecutor(max_workers=EXTRACTION_PROCESSES)
+    return _process_pool
+
+def extract_product_data(page_html):
+    """Extract product fields from a page, in a worker process if EXTRACTION_PROCESSES is set."""
+    if EXTRACTION_PROCESSES > 0:
+        return _get_process_pool().submit(extract_page, page_html).result()
+    return extract_page(page_html)
+
+def extract_many(pages, processes=None):
+    """Extract product fields from several pages, optionally across a process pool."""
+    processes = EXTRACTION_PROCESSES if processes is None else processes
+    if processes > 0 and len(pages) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            return list(executor.map(extract_page, pages))
+    return [extract_page(page) for page in pages]
+
+def extract_review_page(page_html):
+    """Extract the review texts from a product-reviews page."""
+    return review_extractor.extract(page_html)["reviews"]
@@ -0,0 +1,270 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from urllib.parse import urlsplit
+from metrics import AMAZON_CIRCUIT_STATE
+from config import (
+    AMAZON_MAX_CONCURRENT_FETCHES, AMAZON_RATE_PER_SECOND, AMAZON_RATE_BURST, AMAZON_BACKOFF_BASE,
+    AMAZON_BACKOFF_MAX, AMAZON_CIRCUIT_FAILURE_THRESHOLD, AMAZON_CIRCUIT_RESET_TIMEOUT, AMAZON_FETCH_TIMEOUT
+)
+
+# Circuit breaker states, and the value each is exported as
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+def backoff_delay(attempt):
+    """Exponential backoff with equal jitter: between half and all of base * 2 ** attempt, capped."""
+    delay = min(AMAZON_BACKOFF_MAX, AMAZON_BACKOFF_BASE * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+class TokenBucket:
+    """Token-bucket rate limit that hands out reservations instead of sleeping.
+
+    reserve() takes a token and returns how long the caller must wait before
+    using it, so callers can wait however suits them: a delay queue, a
+    thread sleep, or asyncio.sleep.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token, returning the seconds until it may be used (0 if now)."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            # A negative balance is a queue of reservations, each 1/rate apart
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+class CircuitBreaker:
+    """Stops requests to a host that keeps throttling or failing.
+
+    After failure_threshold consecutive failed attempts the circuit opens and
+    requests are refused. Once reset_timeout has passed it is half-open: a
+    single probe request is let through, and its outcome closes the circuit
+    or opens it again.
+    """
+
+    def __init__(self, host, failure_threshold=AMAZON_CIRCUIT_FAILURE_THRESHOLD, reset_timeout=AMAZON_CIRCUIT_RESET_TIMEOUT):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = None
+        self._probe_started = None
+        self._lock = threading.Lock()
+        AMAZON_CIRCUIT_STATE.set(CIRCUIT_STATES["closed"], host=host)
+
+    def _state(self):
+        if self._opened_at is None:
+            state = "closed"
+        elif time.monotonic() - self._opened_at < self.reset_timeout:
+            state = "open"
+        else:
+            state = "half_open"
+        AMAZON_CIRCUIT_STATE.set(CIRCUIT_STATES[state], host=self.host)
+        return state
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _probing(self):
+        # A probe that never reported back is given up on after reset_timeout
+        return self._probe_started is not None and time.monotonic() - self._probe_started < self.reset_timeout
+
+    def rejects(self):
+        """Whether a request would be refused now; unlike try_acquire(), claims nothing."""
+        with self._lock:
+            state = self._state()
+            return state == "open" or (state == "half_open" and self._probing())
+
+    def try_acquire(self):
+        """Return whether a request may be sent now, claiming the probe when half-open."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing():
+                self._probe_started = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"✅ Circuit for {self.host} closed")
+            self.failures = 0
+            self._opened_at = None
+            self._probe_started = None
+            self._state()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probe_started is not None or (self._opened_at is None and self.failures >= self.failure_threshold):
+                print(f"⛔ Circuit for {self.host} opened after {self.failures} failed attempts")
+                self._opened_at = time.monotonic()
+            self._probe_started = None
+            self._state()
+
+class _Job:
+    def __init__(self, url, host, attempt, max_retries):
+        self.url = url
+        self.host = host
+        self.attempt = attempt
+        self.max_retries = max_retries
+        self.attempts = 0
+        self.token_ready = False
+        self.future = Future()
+
+class FetchScheduler:
+    """Shared scheduler for page fetches, with per-host politeness.
+
+    Fetches are queued and run by a fixed pool of workers, each making one
+    request at a time. Every request waits for a token from its host's bucket,
+    and retries wait out a jittered backoff in a delay queue, so a throttled
+    fetch never holds a worker while it waits. Each host has a circuit
+    breaker; while it is open, queued and new fetches finish at once with
+    the "circuit_open" outcome.
+
+    The attempt function is called as attempt(url) and returns
+    (response, outcome), where outcome is "ok", "http_error", or "retry"
+    for throttling and network errors that count against the breaker.
+    """
+
+    def __init__(self, attempt, workers=AMAZON_MAX_CONCURRENT_FETCHES, rate=AMAZON_RATE_PER_SECOND, burst=AMAZON_RATE_BURST):
+        self.attempt = attempt
+        self.rate = rate
+        self.burst = burst
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch")
+        self._hosts = {}
+        self._delayed = []
+        self._sequence = itertools.count()
+        self._running = 0
+        self._condition = threading.Condition()
+        self._dispatcher = None
+
+    def host(self, url):
+        """Return (bucket, breaker) for a URL's host, shared with async fetchers."""
+        host = urlsplit(url).netloc.lower()
+        with self._condition:
+            if host not in self._hosts:
+                self._hosts[host] = (TokenBucket(self.rate, self.burst), CircuitBreaker(host))
+            return self._hosts[host]
+
+    def rejects(self, url):
+        """Whether the circuit for a URL's host is refusing requests."""
+        return self.host(url)[1].rejects()
+
+    def submit(self, url, max_retries=5):
+        """Queue a fetch, returning a Future of (response, outcome).
+
+        The outcome is the attempt's, or "gave_up" after max_retries retried
+        attempts, or "circuit_open".
+        """
+        job = _Job(url, urlsplit(url).netloc.lower(), self.attempt, max_retries)
+        self.host(url)
+        self._schedule(job, 0)
+        return job.future
+
+    def fetch(self, url, max_retries=5, timeout=AMAZON_FETCH_TIMEOUT):
+        """Fetch a URL through the scheduler, waiting for (response, outcome).
+
+        Gives up with (None, "timed_out") after timeout seconds, leaving the
+        queued fetch to finish on its own.
+        """
+        try:
+            return self.submit(url, max_retries).result(timeout)
+        except FutureTimeoutError:
+            print(f"❌ Timed out waiting for {url}")
+            return None, "timed_out"
+
+    def queue_depth(self):
+        """Return the fetches waiting for a token, a backoff or a worker, plus those running."""
+        with self._condition:
+            return len(self._delayed) + self._running
+
+    def _schedule(self, job, delay):
+        with self._condition:
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._sequence), job))
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name="fetch-scheduler", daemon=True)
+                self._dispatcher.start()
+            self._condition.notify()
+
+    def _dispatch(self):
+        """Hand each job to a worker once its delay has passed and its host has a token."""
+        while True:
+            with self._condition:
+                while not self._delayed or self._delayed[0][0] > time.monotonic():
+                    timeout = self._delayed[0][0] - time.monotonic() if self._delayed else None
+                    self._condition.wait(timeout)
+                _, _, job = heapq.heappop(self._delayed)
+
+            # One job failing to start, e.g. after the executor shut down at exit, must not stop the loop
+            try:
+                self._start(job)
+            except Exception as err:
+                print(f"❌ Could not start fetch of {job.url}: {err}")
+                if not job.future.done():
+                    job.future.set_result((None, "gave_up"))
+
+    def _start(self, job):
+        bucket, breaker = self._hosts[job.host]
+        if not job.token_ready:
+            job.token_ready = True
+            wait = bucket.reserve()
+            if wait > 0:
+                self._schedule(job, wait)
+                return
+
+        if not breaker.try_acquire():
+            job.future.set_result((None, "circuit_open"))
+            return
+
+        with self._condition:
+            self._running += 1
+        try:
+            self._executor.submit(self._run, job, breaker)
+        except BaseException:
+            with self._condition:
+                self._running -= 1
+            raise
+
+    def _run(self, job, breaker):
+        try:
+            job.attempts += 1
+            try:
+                response, outcome = job.attempt(job.url)
+            except Exception as err:
+                print(f"❌ Fetch error for {job.url}: {err}")
+                response, outcome = None, "retry"
+
+            if outcome != "retry":
+                breaker.record_success()
+                job.future.set_result((response, outcome))
+                return
+
+            breaker.record_failure()
+            if job.attempts >= job.max_retries:
+                print("❌ Max retries reached. Skipping request.")
+                job.future.set_result((None, "gave_up"))
+                return
+
+            delay = backoff_delay(job.attempts - 1)
+            print(f"⚠ Retrying {job.url} (attempt {job.attempts + 1}/{job.max_retries}) in {delay:.1f}s...")
+            job.token_ready = False
+            self._schedule(job, delay)
+        finally:
+            with self._condition:
+                self._running -= 1
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config import (
+    GEMINI_CACHE_PATH, GEMINI_CACHE_TTL, GEMINI_CACHE_MEMORY_ENTRIES, GEMINI_CACHE_MAX_ENTRIES,
+    GEMINI_CACHE_MAX_TEMPERATURE
+)
+
+def make_key(model, prompt, generation_config):
+    """Hash the model, prompt text and generationConfig into a cache key."""
+    material = json.dumps(
+        {"model": model, "prompt": prompt, "generationConfig": generation_config},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def is_cacheable(generation_config):
+    """Only memoize requests whose sampling is (near) deterministic.
+
+    Requests without a generationConfig use Gemini's default temperature,
+    which is too high for a cached answer to stand in for a fresh one.
+    """
+    if not generation_config or "temperature" not in generation_config:
+        return False
+    return generation_config["temperature"] <= GEMINI_CACHE_MAX_TEMPERATURE
+
+class GeminiCache:
+    """Two-tier cache of Gemini responses: an in-memory LRU in front of SQLite.
+
+    Memory hits skip both the network and the database; disk hits are
+    promoted back into memory.
+    """
+
+    def __init__(self, path=GEMINI_CACHE_PATH, ttl=GEMINI_CACHE_TTL,
+                 memory_entries=GEMINI_CACHE_MEMORY_ENTRIES, max_entries=GEMINI_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created ON responses (created_at)")
+        conn.commit()
+
+    def _connection(self):
+        """Return this thread's SQLite connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key, created_at, response_data):
+        """Insert into the memory tier, dropping the least recently used entry if full."""
+        with self._lock:
+            self._memory[key] = (created_at, response_data)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return a cached response, or None if missing or older than the TTL."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        row = self._connection().execute(
+            "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[1] > self.ttl:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        response_data = json.loads(row[0])
+        self._remember(key, row[1], response_data)
+        with self._lock:
+            self.hits += 1
+        return response_data
+
+    def put(self, key, response_data):
+        """Store a response in both tiers, evicting the oldest disk entries if full."""
+        now = time.time()
+        self._remember(key, now, response_data)
+
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+            (key, json.dumps(response_data), now)
+        )
+        count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY created_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+        conn.commit()
+
+    def stats(self):
+        """Return hit/miss counters and the size of the memory tier."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
@@ -0,0 +1,287 @@
+import asyncio
+import json
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from async_runtime import in_runtime
+from gemini_cache import GeminiCache, make_key, is_cacheable
+from singleflight import SingleFlight
+from metrics import GEMINI_REQUEST_SECONDS, GEMINI_RETRIES, GEMINI_REQUESTS_IN_FLIGHT
+from config import (
+    GEMINI_CONNECT_TIMEOUT, GEMINI_READ_TIMEOUT, GEMINI_MAX_RETRIES, GEMINI_BACKOFF_BASE, GEMINI_BACKOFF_MAX,
+    GEMINI_POOL_SIZE, GEMINI_MAX_CONCURRENT_CALLS, GEMINI_BASE_URL, GEMINI_API_KEY
+)
+
+# aiohttp lets async callers share one non-blocking connection pool, but is optional
+try:
+    import aiohttp # type: ignore
+except ImportError:
+    aiohttp = None
+
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class GeminiError(Exception):
+    """Raised when Gemini cannot be reached or keeps failing after retries."""
+
+# One keep-alive connection pool shared by every Gemini call in the process
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=GEMINI_POOL_SIZE, max_retries=0))
+
+# Caps concurrent Gemini requests across all threads, streams included; backoff sleeps do not hold it
+gemini_call_slots = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENT_CALLS)
+
+# Memoized Gemini responses, shared by the scraper and every app route
+gemini_cache = GeminiCache()
+
+# Identical cacheable requests in flight at once share one Gemini call
+gemini_flights = SingleFlight("gemini")
+
+def extract_text(response_data):
+    """Return candidates[0].content.parts[0].text from a Gemini response, or None."""
+    try:
+        text = response_data["candidates"][0]["content"]["parts"][0]["text"]
+    except (KeyError, IndexError, TypeError):
+        return None
+    return text if isinstance(text, str) else None
+
+def _backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, honouring a Retry-After header when given."""
+    if retry_after:
+        try:
+            return min(float(retry_after), GEMINI_BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * (2 ** attempt)))
+
+def _acquire_slot():
+    gemini_call_slots.acquire()
+    GEMINI_REQUESTS_IN_FLIGHT.inc()
+
+def _release_slot():
+    GEMINI_REQUESTS_IN_FLIGHT.dec()
+    gemini_call_slots.release()
+
+def _post(url, payload, stream=False):
+    """POST to Gemini with timeouts, retrying 429/5xx responses and network errors.
+
+    Each attempt holds one of gemini_call_slots. With stream=True the body is
+    still to be read, so the returned response keeps its slot: the caller
+    must call _release_slot() once it has consumed or closed the response.
+    """
+    endpoint = url.rsplit(":", 1)[-1].split("?")[0]
+    last_error = None
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        start = time.perf_counter()
+        _acquire_slot()
+        try:
+            response = _session.post(
+                url,
+                headers={"Content-Type": "application/json"},
+                json=payload,
+                timeout=(GEMINI_CONNECT_TIMEOUT, GEMINI_READ_TIMEOUT),
+                stream=stream
+            )
+        except requests.exceptions.RequestException as err:
+            _release_slot()
+            GEMINI_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, status="error")
+            last_error = err
+            retry_after = None
+            reason = "network_error"
+        except BaseException:
+            _release_slot()
+            raise
+        else:
+            GEMINI_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, status=str(response.status_code))
+            if response.status_code not in RETRY_STATUS_CODES:
+                if not stream:
+                    _release_slot()
+                return response
+            last_error = f"HTTP {response.status_code}"
+            retry_after = response.headers.get("Retry-After")
+            reason = str(response.status_code)
+            response.close()
+            _release_slot()
+
+        if attempt < GEMINI_MAX_RETRIES:
+            GEMINI_RETRIES.inc(reason=reason)
+            delay = _backoff_delay(attempt, retry_after)
+            print(f"⚠ Gemini request failed ({last_error}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+    raise GeminiError(f"Gemini request failed after {GEMINI_MAX_RETRIES + 1} attempts: {last_error}")
+
+def _build_payload(prompt, generation_config):
+    """Build the request body shared by generateContent and streamGenerateContent."""
+    payload = {
+        "contents": [{
+            "parts": [{"text": prompt}]
+        }]
+    }
+    if generation_config is not None:
+        payload["generationConfig"] = generation_config
+    return payload
+
+def generate_content(prompt, generation_config=None, api_key=GEMINI_API_KEY):
+    """Call Gemini generateContent and return the parsed JSON response.
+
+    Responses to deterministic requests (see gemini_cache.is_cacheable) are
+    memoized by model, prompt and generationConfig, and concurrent identical
+    requests wait on a single call.
+    """
+    if not is_cacheable(generation_config):
+        return _request_content(prompt, generation_config, api_key)
+
+    cache_key = make_key(GEMINI_MODEL, prompt, generation_config)
+    cached = gemini_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return gemini_flights.do(cache_key, _request_content, prompt, generation_config, api_key, cache_key)
+
+def _request_content(prompt, generation_config, api_key, cache_key=None):
+    """Call generateContent, caching a real answer under cache_key when one is given."""
+    payload = _build_payload(prompt, generation_config)
+    response = _post(f"{GEMINI_BASE_URL}/{GEMINI_MODEL}:generateContent?key={api_key}", payload)
+    try:
+        response_data = response.json()
+    except ValueError:
+        raise GeminiError(f"Gemini returned a non-JSON response (HTTP {response.status_code})")
+
+    # Only cache real answers, never errors
+    if cache_key and extract_text(response_data) is not None:
+        gemini_cache.put(cache_key, response_data)
+    return response_data
+
+# aiohttp session and concurrency cap for async calls, created on the upstream loop
+_async_session = None
+_async_call_slots = None
+
+def _get_async_session():
+    global _async_session, _async_call_slots
+    if _async_session is None:
+        _async_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=GEMINI_POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(sock_connect=GEMINI_CONNECT_TIMEOUT, sock_read=GEMINI_READ_TIMEOUT)
+        )
+        _async_call_slots = asyncio.Semaphore(GEMINI_MAX_CONCURRENT_CALLS)
+    return _async_session
+
+async def _post_async(url, payload):
+    """Async counterpart of _post(), returning (status_code, parsed JSON or None).
+
+    Backoff between attempts awaits asyncio.sleep, so a retrying call never
+    holds a thread.
+    """
+    session = _get_async_session()
+    endpoint = url.rsplit(":", 1)[-1].split("?")[0]
+    last_error = None
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            async with _async_call_slots:
+                with GEMINI_REQUESTS_IN_FLIGHT.track_inprogress():
+                    async with session.post(url, json=payload) as response:
+                        status = response.status
+                        retry_after = response.headers.get("Retry-After")
+                        try:
+                            response_data = await response.json(content_type=None)
+                        except ValueError:
+                            response_data = None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            GEMINI_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, status="error")
+            last_error = err
+            retry_after = None
+            reason = "network_error"
+        else:
+            GEMINI_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, status=str(status))
+            if status not in RETRY_STATUS_CODES:
+                return status, response_data
+            last_error = f"HTTP {status}"
+            reason = str(status)
+
+        if attempt < GEMINI_MAX_RETRIES:
+            GEMINI_RETRIES.inc(reason=reason)
+            delay = _backoff_delay(attempt, retry_after)
+            print(f"⚠ Gemini request failed ({last_error}), retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+    raise GeminiError(f"Gemini request failed after {GEMINI_MAX_RETRIES + 1} attempts: {last_error}")
+
+async def _generate_content_async(prompt, generation_config, api_key):
+    if not is_cacheable(generation_config):
+        return await _request_content_async(prompt, generation_config, api_key)
+
+    # The cache reads and writes SQLite, so it runs off the shared event loop
+    cache_key = make_key(GEMINI_MODEL, prompt, generation_config)
+    cached = await asyncio.to_thread(gemini_cache.get, cache_key)
+    if cached is not None:
+        return cached
+    # Shares calls with blocking generate_content() callers too
+    return await gemini_flights.do_async(cache_key, _request_content_async, prompt, generation_config, api_key, cache_key)
+
+async def _request_content_async(prompt, generation_config, api_key, cache_key=None):
+    payload = _build_payload(prompt, generation_config)
+    status, response_data = await _post_async(f"{GEMINI_BASE_URL}/{GEMINI_MODEL}:generateContent?key={api_key}", payload)
+    if response_data is None:
+        raise GeminiError(f"Gemini returned a non-JSON response (HTTP {status})")
+
+    # Only cache real answers, never errors
+    if cache_key and extract_text(response_data) is not None:
+        await asyncio.to_thread(gemini_cache.put, cache_key, response_data)
+    return response_data
+
+async def generate_content_async(prompt, generation_config=None, api_key=GEMINI_API_KEY):
+    """Async generate_content(), run on the shared upstream event loop.
+
+    Without aiohttp installed, the blocking client runs in a worker thread.
+    """
+    if aiohttp is None:
+        return await asyncio.to_thread(generate_content, prompt, generation_config, api_key)
+    return await in_runtime(_generate_content_async(prompt, generation_config, api_key))
+
+def stream_content(prompt, generation_config=None, api_key=GEMINI_API_KEY):
+    """Call Gemini streamGenerateContent and yield the answer text chunk by chunk.
+
+    Cached answers are yielded as a single chunk, and a completed stream is
+    written back to the cache just like a generate_content() response.
+    Only the initial request is retried; a stream that breaks mid-answer
+    raises GeminiError.
+    """
+    cacheable = is_cacheable(generation_config)
+    if cacheable:
+        cache_key = make_key(GEMINI_MODEL, prompt, generation_config)
+        cached = gemini_cache.get(cache_key)
+        if cached is not None:
+            yield extract_text(cached) or ""
+            return
+
+    payload = _build_payload(prompt, generation_config)
+    response = _post(f"{GEMINI_BASE_URL}/{GEMINI_MODEL}:streamGenerateContent?alt=sse&key={api_key}", payload, stream=True)
+    chunks = []
+    # The call slot is held until the stream is read to the end or abandoned
+    try:
+        if response.status_code != 200:
+            raise GeminiError(f"Gemini stream failed with HTTP {response.status_code}")
+        for line in response.iter_lines(decode_unicode=True):
+            # Server-sent events carry one JSON response fragment per data line
+            if not line or not line.startswith("data:"):
+                continue
+            try:
+                text = extract_text(json.loads(line[5:].strip()))
+            except ValueError:
+                continue
+            if text:
+                chunks.append(text)
+                yield text
+    except requests.exceptions.RequestException as err:
+        raise GeminiError(f"Gemini stream interrupted: {err}")
+    finally:
+        response.close()
+        _release_slot()
+
+    if cacheable and chunks:
+        gemini_cache.put(cache_key, {"candidates": [{"content": {"parts": [{"text": "".join(chunks)}]}}]})
@@ -0,0 +1,138 @@
+import gzip
+import hashlib
+import json
+from comparison_cache import content_version
+from config import RESPONSE_COMPRESSION_MIN_BYTES, RESPONSE_GZIP_LEVEL, RESPONSE_BROTLI_QUALITY
+
+# brotli compresses JSON better than gzip, but is optional
+try:
+    import brotli # type: ignore
+except ImportError:
+    brotli = None
+
+# Response types worth compressing
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/html", "text/plain", "text/css", "application/javascript"}
+
+# Fields every trimmed product keeps, so clients can refer back to it
+ALWAYS_INCLUDED_FIELDS = ("product_id",)
+
+def parse_fields(value):
+    """Parse a fields selection into a list of field paths, or None for every field.
+
+    Accepts a comma-separated string or a list. Nested fields are written as
+    dotted paths, e.g. "Sentiment Analysis.summaries".
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    fields = [str(field).strip() for field in value if str(field).strip()]
+    return fields or None
+
+def select_fields(product, fields):
+    """Return a copy of product holding only the given field paths, in the product's key order."""
+    if not fields:
+        return product
+
+    # Build a tree of requested paths; True means "the whole value"
+    tree = {}
+    for path in list(fields) + list(ALWAYS_INCLUDED_FIELDS):
+        node = tree
+        parts = path.split(".")
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is True:
+                break
+            node = child
+        else:
+            node[parts[-1]] = True
+
+    def trim(value, node):
+        if node is True or not isinstance(value, dict):
+            return value
+        return {key: trim(item, node[key]) for key, item in value.items() if key in node}
+
+    return trim(product, tree)
+
+def product_etag(product, fields=None):
+    """Return a strong ETag for a product, or for the fields selected from it."""
+    version = product.get("content_version") or content_version(product)
+    if not fields:
+        return version
+    selection = hashlib.sha1(json.dumps(sorted(fields)).encode("utf-8")).hexdigest()[:8]
+    return f"{version}-{selection}"
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header matches an ETag exactly.
+
+    Pass the ETag of the representation that would be sent, from
+    encoded_etag(), so a tag for another content coding never matches.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
+
+def _accepted_encodings(accept_encoding):
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+def choose_encoding(accept_encoding, size):
+    """Return the content coding used for a compressible body of `size` bytes, or None."""
+    if size < RESPONSE_COMPRESSION_MIN_BYTES:
+        return None
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def encoded_etag(etag, encoding):
+    """Return the ETag of a representation sent with the given content coding."""
+    return f"{etag}-{encoding}" if encoding else etag
+
+def compress_response(response, accept_encoding):
+    """Compress a buffered response with brotli or gzip when the client accepts it.
+
+    Streamed responses such as server-sent events are left alone, and a
+    strong ETag gets a suffix naming the coding, since the compressed bytes
+    are a different representation.
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    encoding = choose_encoding(accept_encoding, len(data))
+    if encoding == "br":
+        data = brotli.compress(data, quality=RESPONSE_BROTLI_QUALITY)
+    elif encoding == "gzip":
+        data = gzip.compress(data, compresslevel=RESPONSE_GZIP_LEVEL)
+    else:
+        return response
+
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    etag = response.headers.get("ETag")
+    if etag and etag.startswith('"') and etag.endswith('"'):
+        response.headers["ETag"] = f'"{encoded_etag(etag[1:-1], encoding)}"'
+    return response
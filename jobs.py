@@ -0,0 +1,151 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from product_record import ProductRecord
+from config import JOB_MAX_WORKERS, JOB_MAX_RETAINED
+
+# Stages after which a job publishes no further events
+TERMINAL_STAGES = ("completed", "failed")
+
+def _as_dict(value):
+    return value.to_dict() if isinstance(value, ProductRecord) else value
+
+def _expand(event):
+    """Return an event with a compact product record in its data expanded to a dict."""
+    if isinstance(event["data"], ProductRecord):
+        return dict(event, data=event["data"].to_dict())
+    return event
+
+class ScrapeJob:
+    """A scrape pipeline running in the background, with its progress events.
+
+    Every stage publishes an event, and the product fields it produced are
+    merged into `result`, so clients can read partial results before the
+    job completes.
+    """
+
+    def __init__(self, query):
+        self.id = uuid.uuid4().hex
+        self.query = query
+        self.status = "queued"
+        self.result = {}
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._events = []
+        self._condition = threading.Condition()
+
+    def publish(self, stage, data=None):
+        """Record a progress event and merge its product fields into the partial result."""
+        with self._condition:
+            if stage.startswith("summary_"):
+                summaries = self.result.setdefault("Sentiment Analysis", {}).setdefault("summaries", {})
+                summaries[data["summary_type"]] = data["summary"]
+            elif stage == "sentiment_done":
+                self.result["Reviews"] = data["Reviews"]
+                summaries = (self.result.get("Sentiment Analysis") or {}).get("summaries")
+                self.result["Sentiment Analysis"] = dict(data["Sentiment Analysis"])
+                if summaries:
+                    self.result["Sentiment Analysis"]["summaries"] = summaries
+            elif stage in ("parsed", "description_done"):
+                self.result.update(data)
+
+            if stage == "completed":
+                # Finished jobs are retained for a while, so keep their product compact;
+                # the completed event shares the same record
+                data = ProductRecord.from_dict(data or {})
+                self.status = "completed"
+                self.result = data
+                self.finished_at = time.time()
+            elif stage == "failed":
+                self.status = "failed"
+                self.error = (data or {}).get("error")
+                self.finished_at = time.time()
+
+            self._events.append({
+                "seq": len(self._events),
+                "stage": stage,
+                "time": time.time(),
+                "data": data or {},
+            })
+            self._condition.notify_all()
+
+    def wait_for_events(self, seq, timeout=None):
+        """Block until there are events numbered seq or later, or the timeout expires."""
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._events) > seq, timeout=timeout)
+            return [_expand(event) for event in self._events[seq:]]
+
+    @property
+    def finished(self):
+        return self.status in TERMINAL_STAGES
+
+    def to_dict(self, since=0):
+        """Return the job's state, its events from `since` on, and its (partial) result."""
+        with self._condition:
+            return {
+                "job_id": self.id,
+                "query": self.query,
+                "status": self.status,
+                "error": self.error,
+                "events": [_expand(event) for event in self._events[since:]],
+                "result": _as_dict(self.result),
+            }
+
+class JobManager:
+    """Runs scrape jobs on a worker pool and keeps the most recent ones for polling.
+
+    Args:
+        pipeline: Function called as pipeline(query, progress) that returns the
+            product dict, or None if the product could not be found
+    """
+
+    def __init__(self, pipeline, max_workers=JOB_MAX_WORKERS, max_retained=JOB_MAX_RETAINED):
+        self.pipeline = pipeline
+        self.max_retained = max_retained
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, query):
+        """Queue a scrape job and return it immediately."""
+        job = ScrapeJob(query)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_depth(self):
+        """Number of retained jobs that have not finished yet."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _run(self, job):
+        job.status = "running"
+        job.publish("started", {"query": job.query})
+        try:
+            product_info = self.pipeline(job.query, job.publish)
+        except Exception as e:
+            print(f"Error in scrape job {job.id}: {str(e)}")
+            job.publish("failed", {"error": str(e)})
+            return
+
+        if product_info:
+            job.publish("completed", product_info)
+        else:
+            job.publish("failed", {"error": "Could not find product information"})
+
+    def _prune(self):
+        """Forget the oldest finished jobs once more than max_retained are kept."""
+        excess = len(self._jobs) - self.max_retained
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished][:excess]:
+            del self._jobs[job_id]
@@ -0,0 +1,287 @@
+import bisect
+import threading
+import time
+from contextlib import ContextDecorator
+
+# Latency buckets in seconds, from cached lookups up to multi-page scrapes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Fields of a stats() dict that only ever grow, exposed as counters
+STATS_COUNTER_FIELDS = ("hits", "misses", "evictions", "stale_hits")
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """Base class for labelled metrics; each label combination has its own series."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    @property
+    def family(self):
+        """The name the metric is exposed under, in its HELP and TYPE lines."""
+        return self.name
+
+    def samples(self):
+        """Yield (suffix, labels, value) for every series, the suffix following the family name."""
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """A value that only goes up, such as a number of retries."""
+
+    kind = "counter"
+
+    @property
+    def family(self):
+        # Counter samples end in _total, and the HELP and TYPE lines must name them the same way
+        return f"{self.name}_total"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            series = list(self._series.items())
+        for key, value in series:
+            yield "", key, value
+
+class Gauge(_Metric):
+    """A value that goes up and down, such as the number of requests in flight."""
+
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def track_inprogress(self, **labels):
+        """Context manager and decorator that counts the calls currently running."""
+        return _InProgress(self, labels)
+
+    def samples(self):
+        with self._lock:
+            series = list(self._series.items())
+        for key, value in series:
+            yield "", key, value
+
+class Histogram(_Metric):
+    """Counts observations, such as latencies, in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels):
+        """Context manager and decorator that observes the duration of a block."""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", key + (("le", _format_value(float(bound))),), cumulative
+            yield "_sum", key, total
+            yield "_count", key, cumulative
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # Decorated functions may run concurrently, so each call needs its own start time
+        return _Timer(self.histogram, self.labels)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self._start, **self.labels)
+        return False
+
+class _InProgress(ContextDecorator):
+    def __init__(self, gauge, labels):
+        self.gauge = gauge
+        self.labels = labels
+
+    def __enter__(self):
+        self.gauge.inc(**self.labels)
+        return self
+
+    def __exit__(self, *exc):
+        self.gauge.dec(**self.labels)
+        return False
+
+class Registry:
+    """Holds every metric and renders them in the Prometheus text format.
+
+    Besides metrics updated on the hot path, the registry polls collectors
+    when scraped: cache stats() methods and callbacks for gauges such as
+    queue depths, so those cost nothing until /metrics is requested.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._stats_sources = []
+        self._gauge_callbacks = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_stats(self, cache_name, stats):
+        """Expose a cache's stats() dict as cache_* metrics labelled with its name."""
+        with self._lock:
+            self._stats_sources.append((cache_name, stats))
+
+    def register_gauge_callback(self, name, documentation, callback):
+        """Expose the value returned by callback() as a gauge, read on every scrape."""
+        with self._lock:
+            self._gauge_callbacks.append((name, documentation, callback))
+
+    def _collect_stats(self):
+        """Group every cache's stats by field, so each field becomes one metric family."""
+        families = {}
+        for cache_name, stats in self._stats_sources:
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"Error collecting {cache_name} cache stats: {str(e)}")
+                continue
+            for field, value in values.items():
+                if isinstance(value, (int, float)):
+                    families.setdefault(field, []).append((cache_name, value))
+        return families
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics)
+            callbacks = list(self._gauge_callbacks)
+        lines = []
+
+        for metric in metrics:
+            lines.append(f"# HELP {metric.family} {metric.documentation}")
+            lines.append(f"# TYPE {metric.family} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.family}{suffix}{_format_labels(labels)} {_format_value(value)}")
+
+        for field, series in sorted(self._collect_stats().items()):
+            counter = field in STATS_COUNTER_FIELDS
+            name = f"cache_{field}_total" if counter else f"cache_{field}"
+            lines.append(f"# HELP {name} Cache {field.replace('_', ' ')}, from the cache's stats()")
+            lines.append(f"# TYPE {name} {'counter' if counter else 'gauge'}")
+            for cache_name, value in series:
+                lines.append(f"{name}{_format_labels((('cache', cache_name),))} {_format_value(value)}")
+
+        for name, documentation, callback in callbacks:
+            try:
+                value = callback()
+            except Exception as e:
+                print(f"Error collecting {name}: {str(e)}")
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+# The process-wide registry served at /metrics
+registry = Registry()
+
+# Amazon fetches
+AMAZON_FETCH_SECONDS = registry.histogram(
+    "amazon_fetch_seconds", "Time to fetch an Amazon page, including retries and backoff", ("page_type", "outcome")
+)
+AMAZON_RESPONSES = registry.counter("amazon_responses", "Amazon responses received, by HTTP status", ("status",))
+AMAZON_RETRIES = registry.counter("amazon_fetch_retries", "Amazon fetch attempts that were retried", ("reason",))
+AMAZON_FETCHES_IN_FLIGHT = registry.gauge("amazon_fetches_in_flight", "Amazon requests currently in progress")
+AMAZON_CIRCUIT_STATE = registry.gauge(
+    "amazon_circuit_state", "Circuit breaker state per Amazon host: 0 closed, 1 half-open, 2 open", ("host",)
+)
+
+# Scraping pipeline stages
+STAGE_SECONDS = registry.histogram("pipeline_stage_seconds", "Time spent in each scraping pipeline stage", ("stage",))
+ENRICHMENT_REUSED = registry.counter(
+    "enrichment_reused", "Summaries and descriptions kept from the stored product on refresh", ("task",)
+)
+
+# Identical concurrent calls served by one execution
+COALESCED_CALLS = registry.counter(
+    "coalesced_calls", "Calls that waited on an identical call already in flight instead of running", ("group",)
+)
+
+# Gemini calls
+GEMINI_REQUEST_SECONDS = registry.histogram(
+    "gemini_request_seconds", "Time for one Gemini HTTP request, per attempt", ("endpoint", "status")
+)
+GEMINI_RETRIES = registry.counter("gemini_retries", "Gemini requests that were retried", ("reason",))
+GEMINI_REQUESTS_IN_FLIGHT = registry.gauge("gemini_requests_in_flight", "Gemini requests currently in progress")
+
+# Flask routes
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_seconds", "Time to handle a request, up to the first byte of streamed responses", ("route", "method", "status")
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge("http_requests_in_flight", "Requests currently being handled")
@@ -0,0 +1,190 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from config import PAGE_CACHE_DIR, PAGE_CACHE_TTLS, PAGE_CACHE_MAX_BYTES
+
+# zstd compresses HTML better and faster than gzip, but is optional
+try:
+    import zstandard # type: ignore
+except ImportError:
+    zstandard = None
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = {"ref", "ref_", "tag", "psc", "qid", "sr", "crid", "sprefix", "th", "pd_rd_i", "pd_rd_r", "pd_rd_w", "pf_rd_p", "pf_rd_r"}
+
+def normalize_url(url):
+    """Normalize a URL so equivalent Amazon links share one cache entry."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") or "/"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in TRACKING_PARAMS)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+def classify_url(url):
+    """Return the URL class used to pick a TTL: search, product, reviews or default."""
+    path = urlsplit(url).path
+    if path == "/s" or path.startswith("/s/"):
+        return "search"
+    if "/product-reviews/" in path:
+        return "reviews"
+    if "/dp/" in path or "/gp/product/" in path:
+        return "product"
+    return "default"
+
+class CachedResponse:
+    """Minimal stand-in for a requests.Response served from the page cache."""
+
+    def __init__(self, url, text, status_code=200):
+        self.url = url
+        self.text = text
+        self.status_code = status_code
+        self.from_cache = True
+
+class PageCache:
+    """On-disk cache of fetched pages, compressed and keyed by normalized URL.
+
+    Entries expire after the TTL of their URL class. When the cache grows past
+    max_bytes, the least recently used files are deleted.
+    """
+
+    def __init__(self, directory=PAGE_CACHE_DIR, ttls=PAGE_CACHE_TTLS, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttls = ttls
+        self.max_bytes = max_bytes
+        self.extension = ".zst" if zstandard else ".gz"
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_hits = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(os.path.getsize(path) for path in self._entry_paths())
+
+    def _entry_paths(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith((".zst", ".gz")):
+                    yield os.path.join(root, name)
+
+    def _path(self, key, extension):
+        return os.path.join(self.directory, key[:2], key + extension)
+
+    def _key(self, url):
+        return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+    def _compress(self, data):
+        if zstandard:
+            return zstandard.ZstdCompressor(level=3).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def _decompress(self, data, extension):
+        if extension == ".zst":
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def get(self, url):
+        """Return a CachedResponse for a fresh cached page, or None on a miss."""
+        ttl = self.ttls.get(classify_url(url), self.ttls["default"])
+        cached = self._read(url, ttl)
+        with self._lock:
+            if cached:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return cached
+
+    def get_stale(self, url):
+        """Return a CachedResponse for a cached page however old it is, or None.
+
+        Used to keep serving pages while Amazon cannot be reached.
+        """
+        cached = self._read(url, float("inf"))
+        if cached:
+            with self._lock:
+                self.stale_hits += 1
+        return cached
+
+    def _read(self, url, ttl):
+        key = self._key(url)
+        # Entries written by either codec can be read back
+        for extension in (".zst", ".gz"):
+            if extension == ".zst" and not zstandard:
+                continue
+            path = self._path(key, extension)
+            try:
+                with open(path, "rb") as f:
+                    entry = json.loads(self._decompress(f.read(), extension))
+            except (OSError, ValueError):
+                continue
+
+            if time.time() - entry["fetched_at"] > ttl:
+                continue
+
+            # Bump the modification time so eviction sees this entry as recently used
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return CachedResponse(entry["url"], entry["text"], entry.get("status_code", 200))
+        return None
+
+    def put(self, url, text, status_code=200):
+        """Compress and store a fetched page, evicting old entries if over budget."""
+        key = self._key(url)
+        path = self._path(key, self.extension)
+        entry = {"url": url, "status_code": status_code, "fetched_at": time.time(), "text": text}
+        data = self._compress(json.dumps(entry).encode("utf-8"))
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+        # Write to a temporary file first so readers never see a partial entry
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total_bytes += len(data) - previous_size
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache is under 90% of its budget."""
+        entries = []
+        for path in self._entry_paths():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        with self._lock:
+            self._total_bytes = sum(size for _, size, _ in entries)
+            target = self.max_bytes * 0.9
+            for _, size, path in entries:
+                if self._total_bytes <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._total_bytes -= size
+                self.evictions += 1
+
+    def stats(self):
+        """Return hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "stale_hits": self.stale_hits,
+                "bytes": self._total_bytes,
+            }
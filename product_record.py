@@ -0,0 +1,206 @@
+import sys
+from collections import Counter
+from prompt_planner import build_digest
+
+# Sentiment labels and the one-byte codes they are stored as
+LABELS = ("POSITIVE", "NEGATIVE", "NEUTRAL")
+LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+
+# Placeholder the scraper stores in "Reviews" when a product has none
+NO_REVIEWS = "No reviews available."
+
+# Product fields stored as plain values, and the slot each lives in
+SCALAR_FIELDS = {
+    "Product Name": "name",
+    "Price": "price",
+    "Rating": "rating",
+    "Number of Reviews": "num_reviews",
+    "Availability": "availability",
+    "Image URL": "image_url",
+    "Detailed Description": "detailed_description",
+    "product_id": "product_id",
+    "content_version": "content_version",
+}
+
+# Keys of a "Sentiment Analysis" dict as built by score_reviews_sentiment
+SENTIMENT_KEYS = ("sentiment_counts", "sentiment_percentages", "review_sentiments", "overall_sentiment", "summaries")
+
+# Short strings that repeat across products are interned so they are stored once
+INTERN_MAX_CHARS = 200
+
+# Marks a product store row holding a compact record rather than a product dict
+COMPACT_FORMAT = 1
+
+def _intern(value):
+    if isinstance(value, str) and len(value) <= INTERN_MAX_CHARS:
+        return sys.intern(value)
+    return value
+
+def sentiment_stats(labels):
+    """Return (sentiment_counts, sentiment_percentages) exactly as score_reviews_sentiment does."""
+    if not labels:
+        empty = {"POSITIVE": 0, "NEGATIVE": 0, "NEUTRAL": 0}
+        return dict(empty), dict(empty)
+    counts = Counter(labels)
+    total = len(labels)
+    percentages = {label: round((count / total) * 100, 1) for label, count in counts.items()}
+    return dict(counts), percentages
+
+class ProductRecord:
+    """Compact in-memory form of a scraped product.
+
+    A product dict holds every review twice (in "Reviews" and as
+    (review, label) pairs in the sentiment analysis) and a digest that is
+    derived from its other fields. A record keeps each review once, the
+    labels as one byte per review, recomputes the counts, percentages and
+    digest on demand, and interns short repeated strings. to_dict() returns
+    a dict that serializes to the same JSON as the one the record was built
+    from.
+
+    Fields that do not have the shape the scraper produces are kept as they
+    are in `extra`, so any product dict round-trips.
+    """
+
+    __slots__ = (
+        "keys", "name", "price", "rating", "num_reviews", "availability", "image_url", "detailed_description",
+        "product_id", "content_version", "raw_description", "reviews", "labels", "sentiment_keys",
+        "overall_sentiment", "summaries", "extra",
+    )
+
+    def __init__(self):
+        for slot in self.__slots__:
+            setattr(self, slot, None)
+        self.extra = {}
+
+    @classmethod
+    def from_dict(cls, product):
+        """Build a record from a product dict as returned by scrape_amazon_product."""
+        record = cls()
+        record.keys = tuple(sys.intern(key) for key in product)
+        record.reviews = ()
+
+        for key, value in product.items():
+            if key in SCALAR_FIELDS:
+                setattr(record, SCALAR_FIELDS[key], _intern(value))
+            elif key == "Raw Description Data" and isinstance(value, list) and all(isinstance(item, str) for item in value):
+                record.raw_description = tuple(_intern(item) for item in value)
+            elif key not in ("Reviews", "Sentiment Analysis", "Digest"):
+                record.extra[key] = value
+
+        sentiment = product.get("Sentiment Analysis")
+        if "Sentiment Analysis" in product and not record._set_sentiment(sentiment):
+            record.extra["Sentiment Analysis"] = sentiment
+
+        if "Reviews" in product:
+            reviews = product["Reviews"]
+            if record.labels is None:
+                # Without a compact sentiment analysis the reviews are stored on their own
+                if isinstance(reviews, list) and reviews:
+                    record.reviews = tuple(reviews)
+                else:
+                    record.extra["Reviews"] = reviews
+            elif reviews != (list(record.reviews) or [NO_REVIEWS]):
+                record.extra["Reviews"] = reviews
+
+        if "Digest" in product and product["Digest"] != record._digest():
+            record.extra["Digest"] = product["Digest"]
+        return record
+
+    def _set_sentiment(self, sentiment):
+        """Store a sentiment analysis compactly, returning False if it cannot be."""
+        if not isinstance(sentiment, dict) or not set(sentiment) <= set(SENTIMENT_KEYS) or "review_sentiments" not in sentiment:
+            return False
+        try:
+            texts = tuple(text for text, _ in sentiment["review_sentiments"])
+            labels = bytes(LABEL_CODES[label] for _, label in sentiment["review_sentiments"])
+        except (KeyError, TypeError, ValueError):
+            return False
+
+        counts, percentages = sentiment_stats([LABELS[code] for code in labels])
+        if sentiment.get("sentiment_counts", counts) != counts or sentiment.get("sentiment_percentages", percentages) != percentages:
+            return False
+
+        self.reviews = texts
+        self.labels = labels
+        self.sentiment_keys = tuple(sys.intern(key) for key in sentiment)
+        self.overall_sentiment = _intern(sentiment.get("overall_sentiment"))
+        summaries = sentiment.get("summaries")
+        self.summaries = {sys.intern(k): v for k, v in summaries.items()} if isinstance(summaries, dict) else summaries
+        return True
+
+    def _sentiment(self):
+        labels = [LABELS[code] for code in self.labels]
+        counts, percentages = sentiment_stats(labels)
+        values = {
+            "sentiment_counts": counts,
+            "sentiment_percentages": percentages,
+            "review_sentiments": list(zip(self.reviews, labels)),
+            "overall_sentiment": self.overall_sentiment,
+            "summaries": dict(self.summaries) if isinstance(self.summaries, dict) else self.summaries,
+        }
+        return {key: values[key] for key in self.sentiment_keys}
+
+    def _digest(self):
+        return build_digest(self._fields(include_digest=False))
+
+    def _fields(self, include_digest=True):
+        product = {}
+        for key in self.keys:
+            if key in self.extra:
+                product[key] = self.extra[key]
+            elif key in SCALAR_FIELDS:
+                product[key] = getattr(self, SCALAR_FIELDS[key])
+            elif key == "Raw Description Data":
+                product[key] = list(self.raw_description)
+            elif key == "Reviews":
+                product[key] = list(self.reviews) or [NO_REVIEWS]
+            elif key == "Sentiment Analysis":
+                product[key] = self._sentiment() if self.labels is not None else None
+            elif key == "Digest" and include_digest:
+                # Filled in below, once every field it is built from is present
+                product[key] = None
+        if include_digest and "Digest" in product and "Digest" not in self.extra:
+            product["Digest"] = build_digest(product)
+        return product
+
+    def to_dict(self):
+        """Return the product dict, in the same shape and key order it was built from."""
+        return self._fields()
+
+    def to_compact(self):
+        """Return a JSON-serializable form that stores each review once."""
+        return {
+            "format": COMPACT_FORMAT,
+            "keys": list(self.keys),
+            "fields": {slot: getattr(self, slot) for slot in SCALAR_FIELDS.values() if getattr(self, slot) is not None},
+            "raw_description": list(self.raw_description) if self.raw_description is not None else None,
+            "reviews": list(self.reviews) if isinstance(self.reviews, tuple) else self.reviews,
+            "labels": "".join(str(code) for code in self.labels) if self.labels is not None else None,
+            "sentiment_keys": list(self.sentiment_keys) if self.sentiment_keys is not None else None,
+            "overall_sentiment": self.overall_sentiment,
+            "summaries": self.summaries,
+            "extra": self.extra,
+        }
+
+    @classmethod
+    def from_compact(cls, data):
+        """Rebuild a record from to_compact() output."""
+        record = cls()
+        record.keys = tuple(sys.intern(key) for key in data["keys"])
+        for slot, value in data["fields"].items():
+            setattr(record, slot, _intern(value))
+        if data["raw_description"] is not None:
+            record.raw_description = tuple(_intern(item) for item in data["raw_description"])
+        record.reviews = tuple(data["reviews"]) if isinstance(data["reviews"], list) else data["reviews"]
+        if data["labels"] is not None:
+            record.labels = bytes(int(code) for code in data["labels"])
+            record.sentiment_keys = tuple(sys.intern(key) for key in data["sentiment_keys"])
+        record.overall_sentiment = _intern(data["overall_sentiment"])
+        record.summaries = data["summaries"]
+        record.extra = data["extra"]
+        return record
+
+    @staticmethod
+    def is_compact(data):
+        """Whether a decoded product store row holds to_compact() output."""
+        return isinstance(data, dict) and data.get("format") == COMPACT_FORMAT and "keys" in data
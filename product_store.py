@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from comparison_cache import content_version
+from product_record import ProductRecord
+from config import PRODUCT_STORE_PATH, PRODUCT_STORE_TTL, PRODUCT_STORE_MAX_PRODUCTS, PRODUCT_STORE_TOUCH_INTERVAL
+
+def product_id_for(asin=None, url=None):
+    """Return the stable product ID for an ASIN, falling back to a hash of the URL."""
+    if asin:
+        return f"product_{asin}"
+    return f"product_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:10]}"
+
+def _decode(data):
+    """Decode a stored row, which holds a compact record or, if written earlier, a product dict."""
+    value = json.loads(data)
+    if ProductRecord.is_compact(value):
+        return ProductRecord.from_compact(value).to_dict()
+    return value
+
+class ProductStore:
+    """Persistent product store backed by SQLite in WAL mode.
+
+    Every record has its own expiry time; expired records are still served to
+    lookups by product ID but are treated as misses by get_fresh() so the
+    product is re-scraped. Once more than max_products records are stored,
+    the least recently used ones are evicted.
+
+    A read only writes a new access time when the stored one is more than
+    touch_interval seconds old, so most reads are pure reads and the LRU
+    order is kept to that resolution.
+    """
+
+    def __init__(self, path=PRODUCT_STORE_PATH, ttl=PRODUCT_STORE_TTL, max_products=PRODUCT_STORE_MAX_PRODUCTS,
+                 touch_interval=PRODUCT_STORE_TOUCH_INTERVAL):
+        self.path = path
+        self.ttl = ttl
+        self.max_products = max_products
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS products (
+                product_id TEXT PRIMARY KEY,
+                asin TEXT,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_products_accessed ON products (accessed_at)")
+        conn.commit()
+
+    def _connection(self):
+        """Return this thread's SQLite connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _touch(self, conn, accessed, now):
+        """Record an access to the products in accessed (ID to stored access time) whose stamp is due."""
+        due = [(now, product_id) for product_id, accessed_at in accessed.items() if now - accessed_at >= self.touch_interval]
+        if due:
+            conn.executemany("UPDATE products SET accessed_at = ? WHERE product_id = ?", due)
+            conn.commit()
+
+    def _load(self, product_id, fresh_only):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT data, expires_at, accessed_at FROM products WHERE product_id = ?", (product_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        if fresh_only and row[1] <= now:
+            return None
+
+        self._touch(conn, {product_id: row[2]}, now)
+        return _decode(row[0])
+
+    def get(self, product_id):
+        """Return a stored product by ID, or None if it is not stored."""
+        return self._load(product_id, fresh_only=False)
+
+    def get_fresh(self, product_id):
+        """Return a stored product by ID, or None if it is missing or has expired."""
+        return self._load(product_id, fresh_only=True)
+
+    def get_many(self, product_ids, touch=True):
+        """Load several products in one query, returning (products, missing_ids) in the order given.
+
+        With touch=False the products are only read: their access times, and
+        so their place in the LRU order, are left as they are.
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return [], []
+        conn = self._connection()
+        placeholders = ", ".join("?" * len(product_ids))
+        rows = {product_id: (data, accessed_at) for product_id, data, accessed_at in conn.execute(
+            f"SELECT product_id, data, accessed_at FROM products WHERE product_id IN ({placeholders})", product_ids
+        ).fetchall()}
+
+        if touch:
+            self._touch(conn, {product_id: accessed_at for product_id, (_, accessed_at) in rows.items()}, time.time())
+        products = [_decode(rows[product_id][0]) for product_id in product_ids if product_id in rows]
+        missing = [product_id for product_id in product_ids if product_id not in rows]
+        return products, missing
+
+    def put(self, product_id, product, asin=None, ttl=None):
+        """Store or replace a product, then evict the least recently used records.
+
+        The product's content_version is set to a hash of its content, so
+        anything derived from it can tell when it was re-scraped. It is
+        stored as a compact ProductRecord, with each review stored once.
+
+        Returns the IDs of the products evicted to make room.
+        """
+        product["content_version"] = content_version(product)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO products (product_id, asin, data, created_at, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (product_id, asin, json.dumps(ProductRecord.from_dict(product).to_compact()), now, expires_at, now)
+        )
+        evicted = self._evict(conn)
+        conn.commit()
+        return evicted
+
+    def _evict(self, conn):
+        """Delete the least recently used records beyond max_products, returning their IDs."""
+        count = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        excess = count - self.max_products
+        if excess <= 0:
+            return []
+        evicted = [row[0] for row in conn.execute(
+            "SELECT product_id FROM products ORDER BY accessed_at ASC LIMIT ?", (excess,)
+        ).fetchall()]
+        conn.executemany("DELETE FROM products WHERE product_id = ?", [(product_id,) for product_id in evicted])
+        return evicted
+
+    def iter_products(self):
+        """Yield (product_id, product) for every stored record, expired or not."""
+        rows = self._connection().execute("SELECT product_id, data FROM products").fetchall()
+        for product_id, data in rows:
+            yield product_id, _decode(data)
+
+    def __contains__(self, product_id):
+        row = self._connection().execute(
+            "SELECT 1 FROM products WHERE product_id = ?", (product_id,)
+        ).fetchone()
+        return row is not None
@@ -0,0 +1,193 @@
+import re
+from config import GEMINI_CONTEXT_TOKENS, COMPARISON_CONTEXT_TOKENS, COMPARISON_QUESTION_CONTEXT_TOKENS
+
+# Pieces the token estimate counts: words (with their leading space), runs of
+# up to three digits, and single punctuation or non-ASCII characters. This is
+# a heuristic, not Gemini's tokenizer
+TOKEN_PATTERN = re.compile(r"\s?[A-Za-z]+|\s?\d{1,3}|\s?[^\sA-Za-z\d]|\s+")
+
+# Long words are split into several sub-word tokens
+CHARS_PER_WORD_TOKEN = 6
+
+# Appended to text cut short by truncate_to_tokens()
+ELLIPSIS = "..."
+
+# Raw description items kept as key specs in a digest, and their maximum length
+DIGEST_MAX_SPECS = 8
+DIGEST_MAX_SPEC_CHARS = 160
+
+def estimate_tokens(text):
+    """Estimate how many tokens Gemini will count for a piece of text.
+
+    A regex heuristic that needs no tokenizer or API call. On English prose
+    it lands close to Gemini's rule of thumb of about four characters per
+    token, but it is an estimate: budgets built on it need some headroom.
+    """
+    if not text:
+        return 0
+    tokens = 0
+    for piece in TOKEN_PATTERN.findall(text):
+        word = piece.strip()
+        if word.isalpha() and word.isascii():
+            tokens += 1 + (len(word) - 1) // CHARS_PER_WORD_TOKEN
+        elif word or piece:
+            tokens += 1
+    return tokens
+
+def truncate_to_tokens(text, budget):
+    """Cut text to at most `budget` estimated tokens, at a word boundary."""
+    if budget <= 0:
+        return ""
+    if estimate_tokens(text) <= budget:
+        return text
+
+    # The ellipsis marking the cut counts against the budget too
+    used = estimate_tokens(ELLIPSIS)
+    end = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        used += estimate_tokens(match.group())
+        if used > budget:
+            break
+        end = match.end()
+    cut = text[:end].rstrip()
+    return cut + ELLIPSIS if cut else ""
+
+def _squash(text):
+    return " ".join(str(text).split())
+
+def build_digest(product):
+    """Build the compact digest of a product used in comparison prompts.
+
+    Digests are computed once when a product is scraped and stored with it.
+    """
+    sentiment = product.get("Sentiment Analysis") or {}
+    percentages = sentiment.get("sentiment_percentages") or {}
+    specs = [_squash(item)[:DIGEST_MAX_SPEC_CHARS] for item in (product.get("Raw Description Data") or [])[:DIGEST_MAX_SPECS]]
+    return {
+        "name": _squash(product.get("Product Name", "N/A")),
+        "price": product.get("Price", "N/A"),
+        "rating": product.get("Rating", "N/A"),
+        "num_reviews": product.get("Number of Reviews", "N/A"),
+        "availability": product.get("Availability", "N/A"),
+        "key_specs": [spec for spec in specs if spec],
+        "sentiment": (
+            f"{percentages.get('POSITIVE', 0)}% positive, {percentages.get('NEGATIVE', 0)}% negative, "
+            f"{percentages.get('NEUTRAL', 0)}% neutral ({sentiment.get('overall_sentiment', 'N/A')})"
+        ),
+        "review_summary": _squash((sentiment.get("summaries") or {}).get("overall", "")),
+        "description": _squash(product.get("Detailed Description") or ""),
+    }
+
+def get_digest(product):
+    """Return a product's stored digest, building one for products stored without it."""
+    return product.get("Digest") or build_digest(product)
+
+def render_digest(digest, index, budget):
+    """Render a digest as a prompt block of at most roughly `budget` tokens.
+
+    Fields are added in priority order (identity, price and rating first,
+    description last); the field that overflows the budget is truncated and
+    later fields are dropped.
+    """
+    lines = [
+        f"PRODUCT {index}: {digest['name']}",
+        f"Price: {digest['price']}",
+        f"Rating: {digest['rating']} ({digest['num_reviews']})",
+        f"Customer Sentiment: {digest['sentiment']}",
+    ]
+    optional = [
+        ("Overall Review Summary", digest.get("review_summary")),
+        ("Key Specs", "; ".join(digest.get("key_specs") or [])),
+        ("Description", digest.get("description")),
+    ]
+
+    used = estimate_tokens("\n".join(lines))
+    for label, value in optional:
+        if not value:
+            continue
+        remaining = budget - used - estimate_tokens(f"\n{label}: ")
+        if remaining <= 0:
+            break
+        value = truncate_to_tokens(value, remaining)
+        if not value:
+            break
+        line = f"{label}: {value}"
+        lines.append(line)
+        used += estimate_tokens("\n" + line)
+    return "\n".join(lines)
+
+def plan_product_context(products, input_budget):
+    """Pack the digests of several products into about `input_budget` tokens.
+
+    Every product starts with an equal share of the budget; tokens left over by
+    products with short digests are then handed to those that were truncated.
+    """
+    digests = [get_digest(product) for product in products]
+    share = max(1, input_budget // max(1, len(digests)))
+    blocks = [render_digest(digest, i + 1, share) for i, digest in enumerate(digests)]
+
+    # Redistribute the budget unused by small digests to the truncated ones
+    used = [estimate_tokens(block) for block in blocks]
+    truncated = [i for i, block in enumerate(blocks) if block.endswith("...") or used[i] >= share]
+    spare = input_budget - sum(used)
+    if truncated and spare > 0:
+        extra = spare // len(truncated)
+        for i in truncated:
+            blocks[i] = render_digest(digests[i], i + 1, used[i] + extra)
+
+    return "\n\n".join(blocks)
+
+def plan_output_tokens(prompt, desired_output_tokens, context_tokens=GEMINI_CONTEXT_TOKENS):
+    """Cap the output tokens so prompt and answer fit in Gemini's context limit."""
+    return int(max(1, min(desired_output_tokens, context_tokens - estimate_tokens(prompt))))
+
+def build_comparison_prompt(products):
+    """Build the /compare_multiple_products prompt, returning (prompt, max_output_tokens)."""
+    products_text = plan_product_context(products, COMPARISON_CONTEXT_TOKENS)
+    
+    # Adjust prompt based on number of products
+    if len(products) <= 5:
+        comparison_instruction = """
+        Provide a comprehensive comparison including:
+        1. Price comparison across all products
+        2. Feature comparison highlighting strengths of each product
+        3. Quality and performance comparison based on reviews
+        4. Pros and cons of each product
+        5. Overall recommendation
+        """
+    else:
+        comparison_instruction = """
+        Provide a concise comparison focusing on:
+        1. Price comparison with a short table format
+        2. Key features comparison highlighting main differences
+        3. Main pros and cons for each product
+        4. Overall recommendation
+        """
+    
+    prompt = f"""
+    Compare the following {len(products)} products:
+    
+    {products_text}
+    
+    {comparison_instruction}
+    
+    Format the response in a clear, structured way with sections.
+    DO NOT use markdown formatting like ** for bold or * for italic in your response.
+    Use clear section headings and structured content instead.
+    """
+    return prompt, plan_output_tokens(prompt, 2000 if len(products) <= 5 else 1000)
+
+def build_comparison_question_prompt(products, user_question):
+    """Build the /ask_comparison prompt, returning (prompt, max_output_tokens)."""
+    context = plan_product_context(products, COMPARISON_QUESTION_CONTEXT_TOKENS)
+    
+    prompt = f"""
+    {context}
+    
+    User Question: {user_question}
+    
+    Please answer the user's question comparing these {len(products)} products based on the information provided.
+    Be concise but thorough, focusing directly on answering the question asked.
+    DO NOT use markdown formatting like ** for bold or * for italic in your response.
+    """
+    return prompt, plan_output_tokens(prompt, 800 if len(products) <= 5 else 500)
@@ -0,0 +1,89 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import QUERY_CACHE_TTL, QUERY_CACHE_MAX_ENTRIES, AMAZON_MAX_CONCURRENT_FETCHES
+
+def normalize_query(query):
+    """Normalize a search query so trivially different spellings share one entry.
+
+    Case, punctuation and runs of whitespace are ignored, so "iPhone 16 " and
+    "iphone-16" both become "iphone 16".
+    """
+    return " ".join(re.sub(r"[^\w]+", " ", query.lower()).split())
+
+class QueryResolverCache:
+    """In-memory map from normalized search queries to ASINs, with a TTL and LRU bound."""
+
+    def __init__(self, ttl=QUERY_CACHE_TTL, max_entries=QUERY_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, query):
+        """Return the cached ASIN for a query, or None if unknown or expired."""
+        return self._lookup(query, count=True)
+
+    def peek(self, query):
+        """get() for warm-up probes, which do not count as cache hits or misses."""
+        return self._lookup(query, count=False)
+
+    def _lookup(self, query, count):
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[1] <= self.ttl:
+                self._entries.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return entry[0]
+            if entry:
+                del self._entries[key]
+            if count:
+                self.misses += 1
+            return None
+
+    def put(self, query, asin):
+        """Remember the ASIN a query resolved to."""
+        key = normalize_query(query)
+        if not key:
+            return
+        with self._lock:
+            self._entries[key] = (asin, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def warm_up(self, queries, resolve):
+        """Resolve queries that are not cached yet, concurrently.
+
+        Warm-up lookups leave the hit and miss counters alone, so the hit ratio
+        only reflects real searches.
+
+        Args:
+            queries: Search queries to preload
+            resolve: Function that resolves one query and fills the cache without
+                looking it up first, such as amazon_review_scraper.search_uncached
+
+        Returns a dict mapping each query to its ASIN, or None if it could not be resolved.
+        """
+        pending = list(dict.fromkeys(query for query in queries if self.peek(query) is None))
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(AMAZON_MAX_CONCURRENT_FETCHES, len(pending))) as executor:
+                list(executor.map(resolve, pending))
+        return {query: self.peek(query) for query in queries}
+
+    def stats(self):
+        """Return hit/miss counters and the number of cached queries."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+            }
@@ -0,0 +1,104 @@
+import hashlib
+import heapq
+import itertools
+from config import REFRESH_SUMMARY_CHANGE_THRESHOLD, REFRESH_DESCRIPTION_CHANGE_THRESHOLD
+
+# Review sentiment each summary is built from; None means every review
+SUMMARY_SENTIMENTS = {
+    "overall": None,
+    "positive": "POSITIVE",
+    "negative": "NEGATIVE",
+    "neutral": "NEUTRAL",
+}
+
+# Prefix of the placeholder stored when a Gemini generation failed, which is never reused
+FAILED_PREFIX = "Could not generate"
+
+def fingerprint(text):
+    """Return the fingerprint of a review or description item, as unique_reviews() hashes reviews."""
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+class ReviewSample:
+    """A bounded sample of scored reviews, keeping at most size reviews per label.
+
+    Each label keeps the reviews with the smallest fingerprints, so the pick
+    is spread evenly over every review seen, the same reviews always give
+    the same sample, and a refresh that adds a few reviews changes only a
+    few of the sampled ones. items() returns the reviews in arrival order.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._heaps = {}
+        self._arrivals = itertools.count()
+
+    def add(self, review, label):
+        heap = self._heaps.setdefault(label, [])
+        # Negated, so the heap's first entry is the largest fingerprint kept
+        entry = (-int.from_bytes(fingerprint(review)[:8], "big"), next(self._arrivals), review)
+        if len(heap) < self.size:
+            heapq.heappush(heap, entry)
+        elif entry[0] > heap[0][0]:
+            heapq.heapreplace(heap, entry)
+
+    def items(self):
+        """Return the sampled (review, label) pairs in the order they were added."""
+        entries = sorted((arrival, review, label) for label, heap in self._heaps.items() for _, arrival, review in heap)
+        return [(review, label) for _, review, label in entries]
+
+def known_labels(sentiment_analysis):
+    """Map the fingerprint of every sampled review in a sentiment analysis to its label."""
+    if not isinstance(sentiment_analysis, dict):
+        return {}
+    return {fingerprint(review): label for review, label in sentiment_analysis.get("review_sentiments") or []}
+
+def group_reviews(review_sentiments):
+    """Group scored reviews by the summary they feed, keeping review order."""
+    return {
+        summary_type: [review for review, label in review_sentiments if sentiment is None or label == sentiment]
+        for summary_type, sentiment in SUMMARY_SENTIMENTS.items()
+    }
+
+def change_ratio(previous_items, current_items):
+    """Return the share of items added or removed, from 0.0 (unchanged) to 1.0 (nothing in common)."""
+    previous = {fingerprint(item) for item in previous_items}
+    current = {fingerprint(item) for item in current_items}
+    union = previous | current
+    if not union:
+        return 0.0
+    return len(previous ^ current) / len(union)
+
+def _reusable(text):
+    return isinstance(text, str) and bool(text) and not text.startswith(FAILED_PREFIX)
+
+def reusable_enrichment(previous, sentiment_analysis, raw_description_data):
+    """Return the previous product's summaries and description that can be kept as they are.
+
+    A summary is kept when the reviews it summarizes changed by no more than
+    REFRESH_SUMMARY_CHANGE_THRESHOLD, and the description when the raw
+    description items changed by no more than
+    REFRESH_DESCRIPTION_CHANGE_THRESHOLD. Failed generations are always redone.
+
+    Returns a dict mapping enrichment task names ("overall", "positive", ...,
+    "description") to the result to reuse.
+    """
+    reused = {}
+    if not previous:
+        return reused
+
+    previous_sentiment = previous.get("Sentiment Analysis")
+    if isinstance(previous_sentiment, dict) and isinstance(previous_sentiment.get("summaries"), dict):
+        previous_groups = group_reviews(previous_sentiment.get("review_sentiments") or [])
+        current_groups = group_reviews(sentiment_analysis["review_sentiments"])
+        for summary_type, reviews in current_groups.items():
+            summary = previous_sentiment["summaries"].get(summary_type)
+            if (reviews and previous_groups[summary_type] and _reusable(summary)
+                    and change_ratio(previous_groups[summary_type], reviews) <= REFRESH_SUMMARY_CHANGE_THRESHOLD):
+                reused[summary_type] = summary
+
+    description = previous.get("Detailed Description")
+    previous_description_data = previous.get("Raw Description Data")
+    if (_reusable(description) and isinstance(previous_description_data, list)
+            and change_ratio(previous_description_data, raw_description_data) <= REFRESH_DESCRIPTION_CHANGE_THRESHOLD):
+        reused["description"] = description
+    return reused
@@ -0,0 +1,66 @@
+import asyncio
+import hashlib
+from collections import deque
+from extraction import extract_review_page
+from config import REVIEW_CRAWL_MAX_PAGES, REVIEW_CRAWL_MAX_REVIEWS, REVIEW_CRAWL_PARALLEL_PAGES, AMAZON_BASE_URL
+
+def review_page_url(asin, page_number):
+    """Return the URL of one page of an ASIN's product reviews."""
+    return f"{AMAZON_BASE_URL}/product-reviews/{asin}/?reviewerType=all_reviews&pageNumber={page_number}"
+
+async def fetch_review_page_async(asin, page_number, fetch):
+    """Fetch one reviews page and return its review texts (empty if it has none).
+
+    fetch is a coroutine function; parsing runs in a worker thread.
+    """
+    response = await fetch(review_page_url(asin, page_number))
+    if not response:
+        return []
+    texts = await asyncio.to_thread(extract_review_page, response.text)
+    return [review.strip() for review in texts if review.strip()]
+
+async def iter_reviews_async(asin, fetch, max_pages=REVIEW_CRAWL_MAX_PAGES, max_reviews=REVIEW_CRAWL_MAX_REVIEWS,
+                            parallel_pages=REVIEW_CRAWL_PARALLEL_PAGES):
+    """Yield an ASIN's reviews page by page, as each page arrives.
+
+    Up to parallel_pages pages are fetched ahead of the consumer, and reviews
+    are yielded in page order. Crawling stops at the first empty page, after
+    max_pages pages, or once max_reviews reviews have been yielded.
+
+    Args:
+        asin: Amazon product ID
+        fetch: Coroutine function used to fetch a URL, such as fetch_url_async
+    """
+    yielded = 0
+    next_page = 1
+    pending = deque()
+    try:
+        while pending or next_page <= max_pages:
+            # Keep a bounded window of pages in flight
+            while len(pending) < max(1, parallel_pages) and next_page <= max_pages:
+                pending.append(asyncio.ensure_future(fetch_review_page_async(asin, next_page, fetch)))
+                next_page += 1
+
+            reviews = await pending.popleft()
+            if not reviews:
+                return
+            for review in reviews:
+                yield review
+                yielded += 1
+                if yielded >= max_reviews:
+                    return
+    finally:
+        # Pages past the stopping point are not needed
+        for task in pending:
+            task.cancel()
+
+def unique_reviews(*sources):
+    """Chain review iterables lazily, skipping reviews already seen in an earlier source."""
+    seen = set()
+    for source in sources:
+        for review in source:
+            digest = hashlib.sha1(review.encode("utf-8")).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            yield review
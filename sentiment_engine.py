@@ -0,0 +1,77 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import nltk
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from config import SENTIMENT_PROCESSES, SENTIMENT_PROCESS_THRESHOLD
+
+# Download required NLTK data
+try:
+    nltk.data.find('vader_lexicon')
+except LookupError:
+    nltk.download('vader_lexicon')
+
+# Compound score thresholds used to label a review
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+# One analyzer per process, so the VADER lexicon is only loaded once
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+def get_analyzer():
+    """Return the process-wide SentimentIntensityAnalyzer, creating it on first use."""
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+def label_for_compound(compound):
+    """Map a VADER compound score to a POSITIVE/NEGATIVE/NEUTRAL label."""
+    # Adjust thresholds for better neutral detection
+    if compound >= POSITIVE_THRESHOLD:
+        return 'POSITIVE'
+    elif compound <= NEGATIVE_THRESHOLD:
+        return 'NEGATIVE'
+    else:
+        return 'NEUTRAL'
+
+def score_review(review):
+    """Score a single review and return a (label, compound) tuple."""
+    compound = get_analyzer().polarity_scores(review)['compound']
+    return label_for_compound(compound), compound
+
+def _score_chunk(reviews):
+    """Score a chunk of reviews inside a worker process."""
+    return [score_review(review) for review in reviews]
+
+def score_reviews(reviews, processes=None):
+    """Score a batch of reviews and return a list of (label, compound) tuples.
+    
+    Args:
+        reviews: List of review texts
+        processes: Worker processes to use; defaults to SENTIMENT_PROCESSES, which
+            only kicks in once the batch reaches SENTIMENT_PROCESS_THRESHOLD reviews
+    """
+    if processes is None:
+        processes = SENTIMENT_PROCESSES if len(reviews) >= SENTIMENT_PROCESS_THRESHOLD else 0
+    
+    if processes <= 1 or len(reviews) < 2:
+        return _score_chunk(reviews)
+    
+    # Split into a few chunks per worker so slow chunks do not leave workers idle
+    chunk_size = max(1, -(-len(reviews) // (processes * 4)))
+    chunks = [reviews[i:i + chunk_size] for i in range(0, len(reviews), chunk_size)]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return [scored for chunk in executor.map(_score_chunk, chunks) for scored in chunk]
+
+def score_stream(reviews):
+    """Score reviews one at a time as they arrive, yielding (review, label, compound).
+    
+    Unlike score_reviews this accepts any iterable, including a generator that
+    is still fetching reviews, and never holds more than one review itself.
+    """
+    for review in reviews:
+        label, compound = score_review(review)
+        yield review, label, compound
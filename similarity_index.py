@@ -0,0 +1,155 @@
+import re
+import threading
+import zlib
+import numpy as np
+from config import SIMILARITY_DIMENSIONS, SIMILARITY_REVIEWS_PER_PRODUCT
+
+# Words too common in product listings to say anything about similarity
+STOP_WORDS = set("""
+a an and are as at be by for from has have in is it its of on or that the this to with was were will
+you your i my me we our they them it's not but so very also just all can more one product amazon
+""".split())
+
+# Rows allocated for an empty index; capacity doubles whenever it fills up
+INITIAL_CAPACITY = 64
+
+# How much each field counts towards a product's vector
+FIELD_WEIGHTS = (
+    ("Product Name", 3.0),
+    ("Raw Description Data", 1.5),
+    ("Detailed Description", 1.0),
+    ("Reviews", 0.5),
+)
+
+def tokenize(text):
+    """Split text into lowercase word tokens, dropping stop words and single characters."""
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if len(word) > 1 and word not in STOP_WORDS]
+
+def _field_text(value):
+    if isinstance(value, list):
+        return " ".join(str(item) for item in value[:SIMILARITY_REVIEWS_PER_PRODUCT])
+    return str(value or "")
+
+class SimilarityIndex:
+    """In-process TF-IDF index over scraped products, using hashed word features.
+
+    Each product is a row of log-scaled term frequencies in a fixed number of
+    hashed buckets; IDF weights are applied at query time from bucket document
+    frequencies, and neighbours are ranked by cosine similarity.
+
+    Rows live in a preallocated matrix that grows by doubling; only the first
+    len(self) rows are in use.
+    """
+
+    def __init__(self, dimensions=SIMILARITY_DIMENSIONS):
+        self.dimensions = dimensions
+        self._ids = []
+        self._rows = {}
+        self._matrix = np.zeros((INITIAL_CAPACITY, dimensions), dtype=np.float32)
+        self._doc_freq = np.zeros(dimensions, dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def _reserve(self, rows):
+        """Grow the matrix, keeping its rows, until it can hold `rows` products."""
+        capacity = len(self._matrix)
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        matrix = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        matrix[:len(self._ids)] = self._matrix[:len(self._ids)]
+        self._matrix = matrix
+
+    def vectorize(self, product):
+        """Return the term-frequency vector of a product's name, description and reviews."""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(_field_text(product.get(field))):
+                vector[zlib.crc32(token.encode("utf-8")) % self.dimensions] += weight
+        return np.log1p(vector)
+
+    def add(self, product_id, product):
+        """Add or replace a product in the index."""
+        vector = self.vectorize(product)
+        with self._lock:
+            if product_id in self._rows:
+                row = self._rows[product_id]
+                self._doc_freq -= self._matrix[row] > 0
+                self._matrix[row] = vector
+            else:
+                self._reserve(len(self._ids) + 1)
+                self._rows[product_id] = len(self._ids)
+                self._matrix[len(self._ids)] = vector
+                self._ids.append(product_id)
+            self._doc_freq += vector > 0
+
+    def remove(self, product_id):
+        """Drop a product from the index, e.g. once the product store has evicted it."""
+        with self._lock:
+            row = self._rows.pop(product_id, None)
+            if row is None:
+                return
+            self._doc_freq -= self._matrix[row] > 0
+            # Move the last row into the freed one so the used rows stay contiguous
+            last = len(self._ids) - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._rows[self._ids[row]] = row
+            self._matrix[last] = 0
+            self._ids.pop()
+
+    def rebuild(self, products):
+        """Replace the index contents with (product_id, product) pairs."""
+        ids = []
+        vectors = []
+        for product_id, product in products:
+            ids.append(product_id)
+            vectors.append(self.vectorize(product))
+        capacity = INITIAL_CAPACITY
+        while capacity < len(vectors):
+            capacity *= 2
+        matrix = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        if vectors:
+            matrix[:len(vectors)] = vectors
+        with self._lock:
+            self._ids = ids
+            self._rows = {product_id: row for row, product_id in enumerate(ids)}
+            self._matrix = matrix
+            self._doc_freq = (matrix[:len(ids)] > 0).sum(axis=0).astype(np.float32)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def most_similar(self, product_id, product=None, k=8, min_score=0.0):
+        """Return up to k (product_id, score) pairs most similar to a product.
+
+        The product is looked up in the index by ID, or vectorized from
+        `product` if it has not been indexed. It is never its own neighbour.
+        """
+        with self._lock:
+            if not self._ids:
+                return []
+            if product_id in self._rows:
+                query = self._matrix[self._rows[product_id]]
+            elif product is not None:
+                query = self.vectorize(product)
+            else:
+                return []
+
+            idf = np.log((1 + len(self._ids)) / (1 + self._doc_freq)) + 1
+            weighted = self._matrix[:len(self._ids)] * idf
+            query = query * idf
+
+            norms = np.linalg.norm(weighted, axis=1) * (np.linalg.norm(query) or 1.0)
+            scores = weighted @ query / np.where(norms == 0, 1.0, norms)
+            ids = list(self._ids)
+
+        ranked = []
+        for row in np.argsort(-scores):
+            if ids[row] == product_id:
+                continue
+            if scores[row] < min_score or len(ranked) >= k:
+                break
+            ranked.append((ids[row], float(scores[row])))
+        return ranked
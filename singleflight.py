@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from metrics import COALESCED_CALLS
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the call; callers arriving while it is in
+    flight wait for it and receive the same result, or the same exception.
+    Nothing is remembered once the call finishes, so this complements a cache
+    rather than replacing one.
+
+    Calls are tracked with concurrent.futures.Future, so blocking callers in
+    worker threads and async callers on any event loop can share one call.
+    A mutable result should be given a share function, such as copy.deepcopy:
+    every caller, the one that ran the call included, then gets share(result)
+    instead of the one shared object.
+    """
+
+    def __init__(self, name, share=None):
+        self.name = name
+        self.share = share or (lambda result: result)
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        """Return (future, leader): the call in flight for key, and whether this caller must run it."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                COALESCED_CALLS.inc(group=self.name)
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, func, *args, **kwargs):
+        """Return func(*args, **kwargs), sharing the call with concurrent callers of the same key."""
+        future, leader = self._join(key)
+        if not leader:
+            return self.share(future.result())
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as err:
+            self._finish(key, future, error=err)
+            raise
+        self._finish(key, future, result)
+        return self.share(result)
+
+    async def do_async(self, key, func, *args, **kwargs):
+        """Async do(): await func(*args, **kwargs), sharing the call with concurrent callers of the same key."""
+        future, leader = self._join(key)
+        if not leader:
+            # Shielded, so a waiter that is cancelled does not cancel the shared call
+            return self.share(await asyncio.shield(asyncio.wrap_future(future)))
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as err:
+            self._finish(key, future, error=err)
+            raise
+        self._finish(key, future, result)
+        return self.share(result)
+
+    def in_flight(self):
+        """Return the number of distinct calls currently running."""
+        with self._lock:
+            return len(self._calls)
@@ -12,6 +12,27 @@ const MAX_SELECTED_PRODUCTS = 5; // Increase from 2 to 5 products for comparison
 // Current comparison product IDs
 let currentComparisonIds = [];
 
+// Product fields the page renders; the rest of the product is never downloaded
+const PRODUCT_VIEW_FIELDS = [
+    'Product Name', 'Price', 'Rating', 'Number of Reviews', 'Availability', 'Image URL', 'Detailed Description',
+    'Sentiment Analysis.summaries', 'Sentiment Analysis.sentiment_percentages', 'Sentiment Analysis.overall_sentiment'
+];
+
+// Scrape a product with POST, then read it back with GET so the browser can revalidate it with its ETag
+async function fetchProduct(productName) {
+    const scrapeResponse = await fetch('/scrape', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ product_name: productName, fields: ['product_id'] })
+    });
+    if (!scrapeResponse.ok) {
+        return scrapeResponse;
+    }
+    const { product_id: productId } = await scrapeResponse.json();
+    const params = new URLSearchParams({ fields: PRODUCT_VIEW_FIELDS.join(',') });
+    return fetch(`/products/${encodeURIComponent(productId)}?${params}`);
+}
+
 // Theme functionality
 function toggleTheme() {
     const html = document.documentElement;
@@ -117,13 +138,7 @@ async function scrapeProduct() {
     document.getElementById('comparisonResults').classList.add('hidden');
 
     try {
-        const response = await fetch('/scrape', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ product_name: productName })
-        });
+        const response = await fetchProduct(productName);
 
         const data = await response.json();
 
@@ -441,19 +456,22 @@ async function askComparisonQuestion() {
             },
             body: JSON.stringify({ 
                 question: question,
-                product_ids: currentComparisonIds
+                product_ids: currentComparisonIds,
+                stream: true
             })
         });
         
-        const data = await response.json();
-        
         if (!response.ok) {
+            const data = await response.json();
             throw new Error(data.error || 'Failed to get answer');
         }
         
-        // Display the answer
-        document.getElementById('comparisonQuestionText').innerHTML = formatDescription(data.answer);
-        document.getElementById('comparisonQuestionAnswer').classList.remove('hidden');
+        // Display the answer as it streams in
+        await readStreamedAnswer(response, answer => {
+            document.getElementById('comparisonQuestionLoading').classList.add('hidden');
+            document.getElementById('comparisonQuestionText').innerHTML = formatDescription(answer);
+            document.getElementById('comparisonQuestionAnswer').classList.remove('hidden');
+        });
         
     } catch (error) {
         showComparisonQuestionError(error.message);
@@ -462,6 +480,58 @@ async function askComparisonQuestion() {
     }
 }
 
+// Read an answer from a streaming endpoint, calling onText with the text so far.
+// Falls back to the plain JSON response when the server does not stream.
+async function readStreamedAnswer(response, onText) {
+    const contentType = response.headers.get('Content-Type') || '';
+    if (!contentType.includes('text/event-stream')) {
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || 'Request failed');
+        }
+        onText(data.answer);
+        return data;
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let answer = '';
+    let extra = {};
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let eventName = 'message';
+            let dataLine = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataLine += line.slice(5).trim();
+            });
+            const payload = dataLine ? JSON.parse(dataLine) : {};
+            
+            if (eventName === 'error') {
+                throw new Error(payload.error || 'Streaming failed');
+            } else if (eventName === 'done') {
+                extra = payload;
+            } else if (payload.text) {
+                answer += payload.text;
+                onText(answer);
+            }
+        }
+    }
+    
+    return { ...extra, answer: answer };
+}
+
 function backToResults() {
     document.getElementById('comparisonResults').classList.add('hidden');
     if (currentProductInfo) {
@@ -518,19 +588,22 @@ async function askGemini() {
             },
             body: JSON.stringify({ 
                 question: question,
-                product_context: productContext
+                product_context: productContext,
+                stream: true
             })
         });
         
-        const data = await response.json();
-        
         if (!response.ok) {
+            const data = await response.json();
             throw new Error(data.error || 'Failed to get answer from Gemini');
         }
         
-        // Display the answer
-        document.getElementById('geminiAnswerText').innerHTML = formatDescription(data.answer);
-        document.getElementById('geminiAnswer').classList.remove('hidden');
+        // Display the answer as it streams in
+        await readStreamedAnswer(response, answer => {
+            document.getElementById('geminiLoading').classList.add('hidden');
+            document.getElementById('geminiAnswerText').innerHTML = formatDescription(answer);
+            document.getElementById('geminiAnswer').classList.remove('hidden');
+        });
         
     } catch (error) {
         showGeminiError(error.message);
@@ -605,13 +678,7 @@ async function searchProductForComparison() {
     document.getElementById('comparisonResults').classList.add('hidden');
 
     try {
-        const response = await fetch('/scrape', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ product_name: productName })
-        });
+        const response = await fetchProduct(productName);
 
         const data = await response.json();
 
@@ -765,24 +832,33 @@ async function sendChatMessage() {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ message: message })
+            body: JSON.stringify({ message: message, stream: true })
         });
         
-        const data = await response.json();
-        
         if (!response.ok) {
+            const data = await response.json();
             throw new Error(data.error || 'Failed to get response from chatbot');
         }
         
-        // Remove loading indicator
-        document.getElementById('chatMessages').removeChild(loadingElement);
+        // Reuse the loading bubble to show the response as it streams in
+        const messagesContainer = document.getElementById('chatMessages');
+        const data = await readStreamedAnswer(response, answer => {
+            loadingElement.classList.remove('chat-loading');
+            loadingElement.textContent = answer;
+            messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        });
         
-        // Add assistant response to chat
-        addMessageToChat(data.answer, 'assistant');
+        // Record the finished response
+        chatMessages.push({
+            content: data.answer,
+            sender: 'assistant'
+        });
         
     } catch (error) {
         // Remove loading indicator
-        document.getElementById('chatMessages').removeChild(loadingElement);
+        if (loadingElement.parentNode) {
+            loadingElement.parentNode.removeChild(loadingElement);
+        }
         
         // Add error message
         addMessageToChat('Sorry, I encountered an error: ' + error.message, 'assistant');
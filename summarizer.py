@@ -0,0 +1,181 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from gemini_client import generate_content, generate_content_async, extract_text
+from prompt_planner import estimate_tokens, truncate_to_tokens
+from config import GEMINI_MAX_CONCURRENCY, SUMMARY_CHUNK_TOKENS
+
+class SummaryError(Exception):
+    """Raised when Gemini answers without a usable summary."""
+
+def build_summary_prompt(combined_text, summary_type):
+    """Build the prompt that summarizes a batch of reviews."""
+    # Different prompts based on summary type
+    if summary_type == "overall":
+        return f"""
+        Summarize the following product reviews in a comprehensive way, highlighting key points mentioned by customers.
+        Focus on both positive and negative aspects. Keep the summary concise (3-4 sentences).
+        DO NOT use markdown formatting like ** for bold or * for italic in your response.
+
+        Reviews: {combined_text}
+        """
+    elif summary_type == "positive":
+        return f"""
+        Summarize the positive aspects from these product reviews. Focus on what customers liked most.
+        Keep the summary concise (2-3 sentences).
+        DO NOT use markdown formatting like ** for bold or * for italic in your response.
+
+        Reviews: {combined_text}
+        """
+    elif summary_type == "negative":
+        return f"""
+        Summarize the negative aspects from these product reviews. Focus on common complaints and issues.
+        Keep the summary concise (2-3 sentences).
+        DO NOT use markdown formatting like ** for bold or * for italic in your response.
+
+        Reviews: {combined_text}
+        """
+    else:  # neutral
+        return f"""
+        Summarize the neutral aspects from these product reviews. Focus on factual observations, balanced opinions,
+        and specific details mentioned without strong sentiment. Avoid making it sound like a product description.
+        Keep the summary concise (2-3 sentences) and focus on what customers actually said.
+        DO NOT use markdown formatting like ** for bold or * for italic in your response.
+
+        Reviews: {combined_text}
+        """
+
+def build_reduce_prompt(partial_summaries, summary_type):
+    """Build the prompt that merges partial summaries into one."""
+    length = "3-4 sentences" if summary_type == "overall" else "2-3 sentences"
+    combined_text = "\n\n".join(f"Summary {i + 1}: {summary}" for i, summary in enumerate(partial_summaries))
+    return f"""
+    The following are {summary_type} summaries of different batches of customer reviews for the same product.
+    Merge them into a single {summary_type} summary that reflects the points made most often across all batches.
+    Keep the summary concise ({length}).
+    DO NOT use markdown formatting like ** for bold or * for italic in your response.
+
+    {combined_text}
+    """
+
+def pack_reviews(reviews, budget):
+    """Greedily pack reviews, in order, into chunks of at most `budget` estimated tokens.
+
+    A single review longer than the budget is truncated to fit on its own.
+    """
+    chunks = []
+    current = []
+    used = 0
+    for review in reviews:
+        tokens = estimate_tokens(review)
+        if tokens > budget:
+            review = truncate_to_tokens(review, budget)
+            tokens = estimate_tokens(review)
+        if current and used + tokens > budget:
+            chunks.append(current)
+            current = []
+            used = 0
+        current.append(review)
+        used += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _summary_config(max_tokens):
+    return {
+        "maxOutputTokens": max_tokens,
+        "temperature": 0.2,
+        "topP": 0.8,
+    }
+
+def _summary_text(response_data):
+    summary = extract_text(response_data)
+    if summary is None:
+        raise SummaryError(f"No summary in Gemini response: {response_data}")
+    return summary.strip()
+
+def _generate_summary(prompt, max_tokens):
+    return _summary_text(generate_content(prompt, _summary_config(max_tokens)))
+
+async def _generate_summary_async(prompt, max_tokens):
+    return _summary_text(await generate_content_async(prompt, _summary_config(max_tokens)))
+
+def _run_parallel(func, items):
+    """Apply func to every item concurrently, returning None for items that failed."""
+    def run(item):
+        try:
+            return func(item)
+        except Exception as e:
+            print("Error summarizing review chunk:", str(e))
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(GEMINI_MAX_CONCURRENCY, len(items)))) as executor:
+        return list(executor.map(run, items))
+
+def summarize_reviews(reviews, summary_type="overall", max_tokens=200, chunk_tokens=SUMMARY_CHUNK_TOKENS):
+    """Summarize any number of reviews with map-reduce over token-budgeted chunks.
+
+    Reviews that fit one prompt are summarized with a single call. Otherwise
+    each chunk is summarized in parallel, and the partial summaries are merged,
+    level by level if they do not fit a single prompt either, so latency grows
+    with the depth of the reduction rather than the number of reviews.
+    """
+    chunks = pack_reviews(reviews, chunk_tokens)
+    if len(chunks) == 1:
+        return _generate_summary(build_summary_prompt(" ".join(chunks[0]), summary_type), max_tokens)
+
+    # Map: summarize each chunk; a failed chunk only loses its own reviews
+    partials = _run_parallel(
+        lambda chunk: _generate_summary(build_summary_prompt(" ".join(chunk), summary_type), max_tokens),
+        chunks
+    )
+    partials = [partial for partial in partials if partial]
+    if not partials:
+        raise SummaryError(f"Every chunk of {summary_type} reviews failed to summarize")
+
+    # Reduce: merge partial summaries until one is left
+    while len(partials) > 1:
+        groups = pack_reviews(partials, chunk_tokens)
+        if len(groups) >= len(partials):
+            groups = [partials]
+        merged = _run_parallel(lambda group: _generate_summary(build_reduce_prompt(group, summary_type), max_tokens), groups)
+        merged = [summary for summary in merged if summary]
+        if not merged:
+            # Fall back to the first partial summary rather than failing outright
+            break
+        partials = merged
+    return partials[0]
+
+async def _gather_parallel(func, items):
+    """Async _run_parallel(): await func on every item at once, None for items that failed."""
+    results = await asyncio.gather(*(func(item) for item in items), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            print("Error summarizing review chunk:", str(result))
+    return [None if isinstance(result, Exception) else result for result in results]
+
+async def summarize_reviews_async(reviews, summary_type="overall", max_tokens=200, chunk_tokens=SUMMARY_CHUNK_TOKENS):
+    """Async summarize_reviews(), with the same map-reduce over token-budgeted chunks."""
+    chunks = pack_reviews(reviews, chunk_tokens)
+    if len(chunks) == 1:
+        return await _generate_summary_async(build_summary_prompt(" ".join(chunks[0]), summary_type), max_tokens)
+
+    partials = await _gather_parallel(
+        lambda chunk: _generate_summary_async(build_summary_prompt(" ".join(chunk), summary_type), max_tokens),
+        chunks
+    )
+    partials = [partial for partial in partials if partial]
+    if not partials:
+        raise SummaryError(f"Every chunk of {summary_type} reviews failed to summarize")
+
+    while len(partials) > 1:
+        groups = pack_reviews(partials, chunk_tokens)
+        if len(groups) >= len(partials):
+            groups = [partials]
+        merged = await _gather_parallel(
+            lambda group: _generate_summary_async(build_reduce_prompt(group, summary_type), max_tokens), groups
+        )
+        merged = [summary for summary in merged if summary]
+        if not merged:
+            break
+        partials = merged
+    return partials[0]
@@ -0,0 +1,18 @@
+import importlib
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    """The app module, with its stores and caches under a temporary directory."""
+    # The stores and caches use paths relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module("app")
+    module.app.config["TESTING"] = True
+    # The app is imported once per session, so each test gets a store of its own
+    store = importlib.import_module("product_store").ProductStore(path=str(tmp_path / "products.db"))
+    monkeypatch.setattr(module, "product_store", store)
+    return module
@@ -0,0 +1,70 @@
+import pytest
+from extraction import (
+    PRODUCT_SELECTORS_YAML, REVIEW_SELECTORS_YAML, extract_page, extract_review_page, product_extractor
+)
+
+selectorlib = pytest.importorskip("selectorlib")
+
+# Scripts, styles and navigation around the product, as on an Amazon page
+FILLER = (
+    '<script>var markup = "<div id=\\"x\\">";</script>'
+    '<style>.a-price{margin:0}</style>'
+    '<div class="nav-sprite"><ul><li><a href="/dp/B0OTHER001">Other</a></li></ul></div>'
+)
+
+PRODUCT_PAGE = f"""<!doctype html><html><head><title>Amazon.in</title>{FILLER}</head><body>{FILLER}
+<div id="dp-container">
+  <div id="ppd">
+    <span id="productTitle">  Steel Kettle  </span>
+    <span class="a-icon-alt">4.3 out of 5 stars</span>
+    <span id="acrCustomerReviewText">1,024 ratings</span>
+    <span class="a-price"><span class="a-offscreen">₹1,299</span></span>
+    <div id="availability"><span>  In stock  </span></div>
+    <div id="feature-bullets"><ul>
+      <li><span class="a-list-item">1.5 litre capacity</span></li>
+      <li><span class="a-list-item">Auto <b>shut-off</b></span></li>
+    </ul></div>
+    <div><div></div></div>
+  </div>
+  <div id="imageBlock"><img id="landingImage" src="https://m.media-amazon.com/kettle.jpg"/></div>
+  <table id="productDetails_techSpec_section_1"><tr><th>Brand</th><td>Acme</td></tr></table>
+  <div id="productDescription"><p>A sturdy electric kettle.</p><p>Boils in minutes.</p></div>
+</div>
+{FILLER}
+<div id="cm-cr-dp-review-list">
+  <div class="review-text-content"><span>Boils fast.</span></div>
+  <div class="review-text-content"><span>Lid is <i>stiff</i>.</span></div>
+</div>
+{FILLER}</body></html>"""
+
+REVIEW_PAGE = f"""<!doctype html><html><body>{FILLER}<div id="cm_cr-review_list">
+<div class="review"><span data-hook="review-body"><span>Great kettle.</span></span></div>
+<div class="review"><span data-hook="review-body"><span>Stopped working.</span></span></div>
+</div>{FILLER}</body></html>"""
+
+def expected(yaml_string, page):
+    """selectorlib's fields for a page; a missing field may come back as [] or None, so both become None."""
+    data = selectorlib.Extractor.from_yaml_string(yaml_string).extract(page) or {}
+    return {field: value or None for field, value in data.items()}
+
+def actual(data):
+    return {field: value or None for field, value in data.items()}
+
+def test_product_fields_match_selectorlib():
+    assert actual(extract_page(PRODUCT_PAGE)) == expected(PRODUCT_SELECTORS_YAML, PRODUCT_PAGE)
+
+def test_review_fields_match_selectorlib():
+    assert extract_review_page(REVIEW_PAGE) == expected(REVIEW_SELECTORS_YAML, REVIEW_PAGE)["reviews"]
+
+def test_page_without_containers_is_parsed_whole():
+    page = '<html><body><div class="main"><span id="productTitle">Steel Kettle</span></div></body></html>'
+
+    assert product_extractor._slice(page) == []
+    assert actual(extract_page(page)) == expected(PRODUCT_SELECTORS_YAML, page)
+
+def test_only_the_containers_are_parsed():
+    fragments = product_extractor._slice(PRODUCT_PAGE)
+
+    assert [fragment.split(">", 1)[0] for fragment in fragments] == ['<div id="dp-container"', '<div id="cm-cr-dp-review-list"']
+    assert fragments[0].endswith("</div>") and "productDescription" in fragments[0]
+    assert all("<script" not in fragment for fragment in fragments)
@@ -0,0 +1,101 @@
+import threading
+
+import fetch_scheduler
+from fetch_scheduler import CIRCUIT_STATES, CircuitBreaker, FetchScheduler
+from metrics import AMAZON_CIRCUIT_STATE
+
+def test_fetch_returns_attempt_result():
+    scheduler = FetchScheduler(lambda url: ("page", "ok"), workers=1, rate=100, burst=10)
+
+    assert scheduler.fetch("http://amazon.test/dp/1") == ("page", "ok")
+    assert scheduler.queue_depth() == 0
+
+def test_dispatcher_survives_a_job_that_cannot_start():
+    scheduler = FetchScheduler(lambda url: ("page", "ok"), workers=1, rate=100, burst=10)
+    assert scheduler.fetch("http://amazon.test/dp/1") == ("page", "ok")
+
+    # As at interpreter exit: the executor refuses new work
+    scheduler._executor.shutdown()
+    assert scheduler.fetch("http://amazon.test/dp/2", timeout=5) == (None, "gave_up")
+    assert scheduler._dispatcher.is_alive()
+    assert scheduler.queue_depth() == 0
+
+def test_fetch_times_out():
+    release = threading.Event()
+
+    def attempt(url):
+        release.wait()
+        return "page", "ok"
+
+    scheduler = FetchScheduler(attempt, workers=1, rate=100, burst=10)
+    try:
+        assert scheduler.fetch("http://amazon.test/dp/1", timeout=0.1) == (None, "timed_out")
+    finally:
+        release.set()
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def gauge_value(host):
+    return dict(AMAZON_CIRCUIT_STATE._series)[(("host", host),)]
+
+def test_circuit_opens_half_opens_and_closes(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fetch_scheduler.time, "monotonic", clock)
+    breaker = CircuitBreaker("breaker.test", failure_threshold=3, reset_timeout=30)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.try_acquire()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert gauge_value("breaker.test") == CIRCUIT_STATES["open"]
+    assert breaker.rejects() and not breaker.try_acquire()
+
+    # Half-open after the reset timeout: exactly one probe goes through
+    clock.now += 30
+    assert breaker.state == "half_open"
+    assert gauge_value("breaker.test") == CIRCUIT_STATES["half_open"]
+    assert not breaker.rejects()
+    assert breaker.try_acquire()
+    assert breaker.rejects() and not breaker.try_acquire()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert gauge_value("breaker.test") == CIRCUIT_STATES["closed"]
+    assert breaker.failures == 0 and breaker.try_acquire()
+
+def test_failed_probe_reopens_circuit(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fetch_scheduler.time, "monotonic", clock)
+    breaker = CircuitBreaker("probe.test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    clock.now += 30
+    assert breaker.try_acquire()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    clock.now += 29
+    assert breaker.rejects()
+    clock.now += 1
+    assert breaker.try_acquire()
+
+def test_lost_probe_is_given_up_after_reset_timeout(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fetch_scheduler.time, "monotonic", clock)
+    breaker = CircuitBreaker("lost.test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    clock.now += 30
+    assert breaker.try_acquire()
+    # The probe never reports back; another is allowed once it has had reset_timeout to do so
+    clock.now += 29
+    assert not breaker.try_acquire()
+    clock.now += 1
+    assert breaker.try_acquire()
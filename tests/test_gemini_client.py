@@ -0,0 +1,45 @@
+import json
+import threading
+import pytest
+import gemini_client
+
+class FakeStreamResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.closed = False
+
+    def iter_lines(self, decode_unicode=False):
+        for text in self.texts:
+            yield "data: " + json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def slots(monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(gemini_client, "gemini_call_slots", slots)
+    monkeypatch.setattr(gemini_client._session, "post", lambda *args, **kwargs: FakeStreamResponse(["Hello, ", "world."]))
+    return slots
+
+# Above the cache's temperature limit, so nothing is read from or written to the cache
+UNCACHED = {"temperature": 1.0}
+
+def test_stream_holds_its_call_slot_until_read(slots):
+    stream = gemini_client.stream_content("Hi", UNCACHED, api_key="test")
+
+    assert next(stream) == "Hello, "
+    assert not slots.acquire(blocking=False)
+    assert list(stream) == ["world."]
+    assert slots.acquire(blocking=False)
+
+def test_abandoned_stream_releases_its_call_slot(slots):
+    stream = gemini_client.stream_content("Hi", UNCACHED, api_key="test")
+    next(stream)
+
+    stream.close()
+
+    assert slots.acquire(blocking=False)
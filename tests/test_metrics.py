@@ -0,0 +1,34 @@
+from metrics import Registry
+def families(text):
+    """Map each metric family named in TYPE lines to its type."""
+    return dict(line.split()[2:4] for line in text.splitlines() if line.startswith("# TYPE"))
+
+def sample_names(text):
+    return {line.split("{")[0].split(" ")[0] for line in text.splitlines() if line and not line.startswith("#")}
+
+def test_counter_metadata_names_its_samples():
+    registry = Registry()
+    retries = registry.counter("fetch_retries", "Retried fetches", ("reason",))
+    retries.inc(reason="503")
+    registry.register_stats("page", lambda: {"hits": 3, "misses": 1, "hit_ratio": 0.75})
+
+    text = registry.render()
+
+    assert families(text) == {
+        "fetch_retries_total": "counter",
+        "cache_hits_total": "counter",
+        "cache_misses_total": "counter",
+        "cache_hit_ratio": "gauge",
+    }
+    assert sample_names(text) == set(families(text))
+    assert 'fetch_retries_total{reason="503"} 1' in text
+
+def test_histogram_samples_share_its_family_name():
+    registry = Registry()
+    latency = registry.histogram("stage_seconds", "Stage latency", ("stage",), buckets=(0.1, 1))
+    latency.observe(0.5, stage="search")
+
+    text = registry.render()
+
+    assert families(text) == {"stage_seconds": "histogram"}
+    assert sample_names(text) == {"stage_seconds_bucket", "stage_seconds_sum", "stage_seconds_count"}
@@ -0,0 +1,63 @@
+import pytest
+
+@pytest.fixture
+def client(app_module):
+    product = {
+        "Product Name": "Steel Kettle",
+        "Price": "₹1,299",
+        "Detailed Description": "A sturdy electric kettle. " * 100,
+        "Reviews": ["Boils fast."],
+        "product_id": "B0KETTLE01",
+    }
+    app_module.product_store.put("B0KETTLE01", product)
+    return app_module.app.test_client()
+
+def test_not_modified_keeps_the_encoded_etag(client):
+    first = client.get("/products/B0KETTLE01", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert first.headers["ETag"].endswith('-gzip"')
+
+    second = client.get(
+        "/products/B0KETTLE01", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]}
+    )
+    assert second.status_code == 304
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert "Accept-Encoding" in second.headers["Vary"]
+
+def test_not_modified_without_compression(client):
+    first = client.get("/products/B0KETTLE01", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in first.headers
+
+    second = client.get("/products/B0KETTLE01", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 304
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+def test_fields_selection_has_its_own_etag(client):
+    full = client.get("/products/B0KETTLE01")
+    trimmed = client.get("/products/B0KETTLE01?fields=Product Name,Price")
+
+    assert set(trimmed.get_json()) == {"Product Name", "Price", "product_id"}
+    assert trimmed.headers["ETag"] != full.headers["ETag"]
+
+def test_scrape_is_post_only(app_module, client, monkeypatch):
+    async def scrape_and_store_async(query, refresh=False):
+        return app_module.product_store.get("B0KETTLE01")
+    monkeypatch.setattr(app_module, "scrape_and_store_async", scrape_and_store_async)
+
+    assert client.get("/scrape?product_name=kettle").status_code == 405
+    response = client.post("/scrape", json={"product_name": "kettle", "fields": ["product_id"]})
+    assert response.status_code == 200
+    assert response.get_json() == {"product_id": "B0KETTLE01"}
+    assert "ETag" not in response.headers
+
+def test_encoded_etag_does_not_match_an_uncompressed_request(client):
+    compressed = client.get("/products/B0KETTLE01", headers={"Accept-Encoding": "br, gzip"})
+    etag = compressed.headers["ETag"]
+    assert etag.endswith('-br"') or etag.endswith('-gzip"')
+
+    response = client.get("/products/B0KETTLE01", headers={"If-None-Match": etag.replace("-gzip", "-br")})
+
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == etag.replace("-br", "").replace("-gzip", "")
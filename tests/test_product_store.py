@@ -0,0 +1,64 @@
+import pytest
+from product_store import ProductStore
+
+@pytest.fixture
+def store(tmp_path):
+    return ProductStore(path=str(tmp_path / "products.db"), ttl=60, max_products=3)
+
+def product(name):
+    return {"Product Name": name, "Reviews": [f"{name} works well."]}
+
+def accessed_at(store, product_id):
+    return store._connection().execute(
+        "SELECT accessed_at FROM products WHERE product_id = ?", (product_id,)
+    ).fetchone()[0]
+
+def test_get_many_keeps_order_and_reports_missing(store):
+    store.put("a", product("Kettle"))
+    store.put("b", product("Toaster"))
+
+    products, missing = store.get_many(["b", "missing", "a"])
+
+    assert [item["Product Name"] for item in products] == ["Toaster", "Kettle"]
+    assert missing == ["missing"]
+
+def test_get_many_without_touch_leaves_the_lru_order(store):
+    for product_id in ("a", "b", "c"):
+        store.put(product_id, product(product_id))
+    stamp = accessed_at(store, "a")
+
+    store.get_many(["a"], touch=False)
+    assert accessed_at(store, "a") == stamp
+
+    # "a" is still the least recently used, so it is the one evicted
+    assert store.put("d", product("d")) == ["a"]
+
+def test_expired_products_are_stale_but_still_served_by_id(store):
+    store.put("a", product("Kettle"), ttl=-1)
+    store.put("b", product("Toaster"))
+
+    assert store.get_fresh("a") is None
+    assert store.get("a")["Product Name"] == "Kettle"
+    assert store.get_fresh("b")["Product Name"] == "Toaster"
+
+def test_least_recently_used_products_are_evicted(tmp_path):
+    store = ProductStore(path=str(tmp_path / "products.db"), max_products=2, touch_interval=0)
+    store.put("a", product("a"))
+    store.put("b", product("b"))
+    store.get("a")
+
+    assert store.put("c", product("c")) == ["b"]
+    assert "a" in store and "b" not in store and "c" in store
+
+def test_reads_only_write_once_the_access_time_is_due(tmp_path):
+    store = ProductStore(path=str(tmp_path / "products.db"), touch_interval=60)
+    store.put("a", product("a"))
+    stamp = accessed_at(store, "a")
+
+    store.get("a")
+    store.get_many(["a"])
+    assert accessed_at(store, "a") == stamp
+
+    store.touch_interval = 0
+    store.get("a")
+    assert accessed_at(store, "a") > stamp
@@ -0,0 +1,33 @@
+import json
+import os
+import pytest
+from prompt_planner import estimate_tokens, truncate_to_tokens
+
+PRODUCT_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "product_data.json")
+
+# Texts with the token count Gemini's countTokens reports for them
+KNOWN_COUNTS = [
+    ("The quick brown fox jumps over the lazy dog.", 10),
+]
+
+@pytest.mark.parametrize("text, tokens", KNOWN_COUNTS)
+def test_estimate_is_close_to_known_counts(text, tokens):
+    assert abs(estimate_tokens(text) - tokens) <= max(1, tokens * 0.1)
+
+def test_estimate_stays_near_four_characters_per_token_on_reviews():
+    with open(PRODUCT_DATA_PATH, encoding="utf-8") as f:
+        product = json.load(f)
+    texts = [text for text in product["Reviews"] + [product.get("Detailed Description") or ""] if len(text) >= 200]
+    assert texts
+
+    for text in texts:
+        expected = len(text) / 4
+        assert abs(estimate_tokens(text) - expected) <= expected * 0.25
+
+def test_truncate_stays_within_budget():
+    text = "A sturdy electric kettle that boils water quickly. " * 20
+
+    cut = truncate_to_tokens(text, 30)
+
+    assert cut.endswith("...")
+    assert estimate_tokens(cut) <= 30
@@ -0,0 +1,21 @@
+from query_resolver import QueryResolverCache, normalize_query
+
+def test_queries_are_normalized():
+    assert normalize_query("  iPhone-16 ") == normalize_query("iphone 16") == "iphone 16"
+
+def test_warm_up_does_not_count_as_hits_or_misses():
+    cache = QueryResolverCache()
+    cache.put("kettle", "B0KETTLE01")
+    resolved = []
+
+    def resolve(query):
+        resolved.append(query)
+        cache.put(query, "B0TOASTER1")
+
+    assert cache.warm_up(["Kettle", "toaster", "toaster"], resolve) == {"Kettle": "B0KETTLE01", "toaster": "B0TOASTER1"}
+    assert resolved == ["toaster"]
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 0
+
+    cache.get("kettle")
+    cache.get("blender")
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
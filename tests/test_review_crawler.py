@@ -0,0 +1,35 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from async_runtime import iterate
+from review_crawler import iter_reviews_async
+
+def review_page(texts):
+    body = "".join(f'<span data-hook="review-body"><span>{text}</span></span>' for text in texts)
+    return SimpleNamespace(text=f'<html><body><div id="cm_cr-review_list">{body}</div></body></html>')
+
+def test_reviews_arrive_before_the_crawl_finishes():
+    later_pages = threading.Event()
+
+    async def fetch(url):
+        page_number = int(url.rsplit("=", 1)[1])
+        if page_number > 1:
+            # Later pages are held back until the first page's reviews were consumed
+            while not later_pages.is_set():
+                await asyncio.sleep(0.01)
+        return review_page([f"page {page_number} review {number}" for number in range(2)] if page_number <= 3 else [])
+
+    reviews = iterate(iter_reviews_async("B0KETTLE01", fetch, max_pages=10, parallel_pages=2))
+    assert next(reviews) == "page 1 review 0"
+    later_pages.set()
+
+    assert list(reviews) == ["page 1 review 1", "page 2 review 0", "page 2 review 1", "page 3 review 0", "page 3 review 1"]
+
+def test_crawl_stops_at_the_review_cap():
+    async def fetch(url):
+        return review_page([f"{url} review {number}" for number in range(3)])
+
+    reviews = list(iterate(iter_reviews_async("B0KETTLE01", fetch, max_pages=10, max_reviews=4, parallel_pages=3)))
+
+    assert len(reviews) == 4
+
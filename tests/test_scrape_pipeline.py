@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+import async_scraper
+import amazon_review_scraper
+
+PRODUCT_URL = "https://www.amazon.in/dp/B0KETTLE01"
+
+PRODUCT_PAGE = """<html><body><div id="dp-container">
+<span id="productTitle">Steel Kettle</span>
+<div id="feature-bullets"><span class="a-list-item">1.5 litre capacity</span></div>
+<div class="review-text-content"><span>Good kettle, boils fast.</span></div>
+</div></body></html>"""
+
+def review_page(page_number):
+    texts = [f"Good kettle, page {page_number}.", f"Bad lid, page {page_number}."] if page_number <= 2 else []
+    body = "".join(f'<span data-hook="review-body"><span>{text}</span></span>' for text in texts)
+    return f'<html><body><div id="cm_cr-review_list">{body}</div></body></html>'
+
+def fetch_page(url):
+    if "product-reviews" in url:
+        return SimpleNamespace(text=review_page(int(url.rsplit("=", 1)[1])))
+    return SimpleNamespace(text=PRODUCT_PAGE)
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    # Label by keyword instead of VADER, and answer enrichment without Gemini
+    def label(review):
+        return "POSITIVE" if "Good" in review else "NEGATIVE"
+    monkeypatch.setattr(amazon_review_scraper, "score_stream", lambda reviews: ((r, label(r), 0.0) for r in reviews))
+    monkeypatch.setattr(amazon_review_scraper, "score_reviews", lambda reviews: [(label(r), 0.0) for r in reviews])
+
+    async def summarize(reviews, summary_type):
+        return f"{summary_type}: {len(reviews)} reviews"
+
+    async def describe(raw_description_data):
+        return " ".join(raw_description_data)
+    monkeypatch.setattr(async_scraper, "generate_gemini_summary_async", summarize)
+    monkeypatch.setattr(async_scraper, "generate_product_description_async", describe)
+    monkeypatch.setattr(async_scraper, "REVIEW_CRAWL_ENABLED", True)
+
+def test_sync_and_async_fetches_run_the_same_pipeline():
+    async def fetch_page_async(url):
+        return fetch_page(url)
+
+    stages = []
+    from_sync = amazon_review_scraper.scrape_amazon_product(
+        PRODUCT_URL, progress=lambda stage, data=None: stages.append(stage), fetch=fetch_page
+    )
+    from_async = asyncio.run(async_scraper.scrape_amazon_product_async(PRODUCT_URL, fetch=fetch_page_async))
+
+    assert from_sync == from_async
+    assert from_sync["Product Name"] == "Steel Kettle"
+    assert from_sync["Sentiment Analysis"]["sentiment_counts"] == {"POSITIVE": 3, "NEGATIVE": 2}
+    assert from_sync["Sentiment Analysis"]["summaries"]["negative"] == "negative: 2 reviews"
+    assert from_sync["Detailed Description"] == "1.5 litre capacity"
+    assert stages[:4] == ["searched", "fetched", "parsed", "sentiment_done"]
@@ -0,0 +1,56 @@
+import pytest
+from refresh import ReviewSample
+
+@pytest.fixture
+def scraper(monkeypatch):
+    import amazon_review_scraper
+
+    # Label by keyword instead of VADER, so the test needs no lexicon
+    def label(review):
+        return "POSITIVE" if "good" in review else "NEGATIVE" if "bad" in review else "NEUTRAL"
+
+    monkeypatch.setattr(amazon_review_scraper, "score_stream", lambda reviews: ((r, label(r), 0.0) for r in reviews))
+    monkeypatch.setattr(amazon_review_scraper, "score_reviews", lambda reviews: [(label(r), 0.0) for r in reviews])
+    monkeypatch.setattr(amazon_review_scraper, "REVIEW_SAMPLE_PER_LABEL", 5)
+    return amazon_review_scraper
+
+def reviews(count):
+    return (f"{'good' if number % 4 else 'bad'} kettle review {number}" for number in range(count))
+
+def test_counts_every_review_but_keeps_a_bounded_sample(scraper):
+    analysis = scraper.score_reviews_sentiment(reviews(1000))
+
+    assert analysis["sentiment_counts"] == {"POSITIVE": 750, "NEGATIVE": 250}
+    assert analysis["sentiment_percentages"] == {"POSITIVE": 75.0, "NEGATIVE": 25.0}
+    assert len(analysis["review_sentiments"]) == 10
+
+def test_refresh_counts_reused_and_new_reviews(scraper):
+    previous = scraper.score_reviews_sentiment(list(reviews(8)))
+    known = {scraper.fingerprint(review): label for review, label in previous["review_sentiments"]}
+
+    analysis = scraper.score_reviews_sentiment(reviews(12), known=known)
+
+    assert analysis["sentiment_counts"] == {"POSITIVE": 9, "NEGATIVE": 3}
+
+def test_sample_is_deterministic_and_in_arrival_order():
+    texts = [f"review {number}" for number in range(100)]
+    first, second = ReviewSample(10), ReviewSample(10)
+    for text in texts:
+        first.add(text, "POSITIVE")
+    for text in reversed(texts):
+        second.add(text, "POSITIVE")
+
+    sampled = [review for review, _ in first.items()]
+    assert len(sampled) == 10
+    assert sorted(sampled) == sorted(review for review, _ in second.items())
+    assert sampled == sorted(sampled, key=texts.index)
+
+def test_sample_changes_little_when_a_few_reviews_are_added():
+    before, after = ReviewSample(20), ReviewSample(20)
+    for number in range(500):
+        before.add(f"review {number}", "NEUTRAL")
+        after.add(f"review {number}", "NEUTRAL")
+    for number in range(500, 510):
+        after.add(f"review {number}", "NEUTRAL")
+
+    assert len(set(before.items()) - set(after.items())) <= 3
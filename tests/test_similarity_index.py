@@ -0,0 +1,35 @@
+from similarity_index import SimilarityIndex, INITIAL_CAPACITY
+def product(name):
+    return {"Product Name": name, "Raw Description Data": [name], "Reviews": []}
+
+def test_grows_past_initial_capacity():
+    index = SimilarityIndex(dimensions=256)
+    for number in range(INITIAL_CAPACITY + 5):
+        index.add(f"p{number}", product(f"steel kettle model {number}"))
+
+    assert len(index) == INITIAL_CAPACITY + 5
+    neighbours = index.most_similar("p0", k=3)
+    assert len(neighbours) == 3
+    assert all(product_id != "p0" for product_id, _ in neighbours)
+
+def test_removed_products_are_never_neighbours():
+    index = SimilarityIndex(dimensions=256)
+    index.add("kettle", product("electric steel kettle"))
+    index.add("kettle2", product("electric steel kettle with filter"))
+    index.add("kettle3", product("cordless steel kettle"))
+    index.add("phone", product("android smartphone"))
+
+    index.remove("kettle2")
+    index.remove("missing")
+
+    assert len(index) == 3
+    assert [product_id for product_id, _ in index.most_similar("kettle", k=5)] == ["kettle3", "phone"]
+    # The row moved into the freed slot is still found by its ID
+    assert index.most_similar("phone", k=1)[0][0] in ("kettle", "kettle3")
+
+    # Document frequencies no longer count the removed product
+    rebuilt = SimilarityIndex(dimensions=256)
+    rebuilt.rebuild([(product_id, product(name)) for product_id, name in (
+        ("kettle", "electric steel kettle"), ("kettle3", "cordless steel kettle"), ("phone", "android smartphone"),
+    )])
+    assert rebuilt.most_similar("kettle", k=5) == index.most_similar("kettle", k=5)
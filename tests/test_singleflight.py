@@ -0,0 +1,43 @@
+import copy
+import threading
+from singleflight import SingleFlight
+
+def test_joiners_share_the_call_but_get_their_own_copy():
+    flights = SingleFlight("test", share=copy.deepcopy)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    # Note when the second caller has joined the call in flight
+    joined = threading.Event()
+    join = flights._join
+
+    def tracking_join(key):
+        future, leader = join(key)
+        if not leader:
+            joined.set()
+        return future, leader
+    flights._join = tracking_join
+
+    def scrape():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return {"Product Name": "Kettle", "Sentiment Analysis": {"summaries": {}}}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("kettle", scrape)))
+    leader.start()
+    started.wait()
+    joiner = threading.Thread(target=lambda: results.append(flights.do("kettle", scrape)))
+    joiner.start()
+    joined.wait(5)
+    release.set()
+    leader.join()
+    joiner.join()
+
+    assert len(calls) == 1
+    first, second = results
+    assert first == second
+    first["Sentiment Analysis"]["summaries"]["overall"] = "Changed by one caller."
+    assert second["Sentiment Analysis"]["summaries"] == {}
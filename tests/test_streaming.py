@@ -0,0 +1,41 @@
+import json
+import pytest
+
+@pytest.fixture
+def app_module(app_module, monkeypatch):
+    def fake_stream(prompt, generation_config=None, api_key=None):
+        yield "Hello, "
+        yield "world."
+    monkeypatch.setattr(app_module, "stream_content", fake_stream)
+    return app_module
+
+def parse_events(body):
+    """Split a server-sent event stream into (event, data) pairs."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+@pytest.mark.parametrize("route, body", [
+    ("/ask_gemini", {"question": "Is it durable?", "product_context": "A sturdy kettle.", "stream": True}),
+    ("/chatbot", {"message": "Hi there", "stream": True}),
+])
+def test_async_views_stream_answers(app_module, route, body):
+    response = app_module.app.test_client().post(route, json=body)
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    events = parse_events(response.get_data(as_text=True))
+    assert events == [("message", {"text": "Hello, "}), ("message", {"text": "world."}), ("done", {})]
+
+def test_stream_requested_by_accept_header(app_module):
+    response = app_module.app.test_client().post(
+        "/ask_gemini",
+        json={"question": "Is it durable?", "product_context": "A sturdy kettle."},
+        headers={"Accept": "text/event-stream"},
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert parse_events(response.get_data(as_text=True))[-1] == ("done", {})
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import pytest
+import summarizer
+from prompt_planner import estimate_tokens
+from summarizer import SummaryError, pack_reviews, summarize_reviews, summarize_reviews_async
+
+REVIEWS = [f"Review {number}: the kettle boils water quickly and the handle stays cool." for number in range(12)]
+
+def response(text):
+    return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+class FakeGemini:
+    """Answers summary prompts with a fixed map summary and reduce prompts with "merged"."""
+
+    def __init__(self, summary="A partial summary.", fail_map=(), fail_reduce=False):
+        self.summary = summary
+        self.fail_map = set(fail_map)
+        self.fail_reduce = fail_reduce
+        self.map_prompts = []
+        self.reduce_prompts = []
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, generation_config=None):
+        with self._lock:
+            if "Merge them" in prompt:
+                self.reduce_prompts.append(prompt)
+                if self.fail_reduce:
+                    raise RuntimeError("reduce failed")
+                return response("merged")
+            self.map_prompts.append(prompt)
+            if any(f"Review {number}:" in prompt for number in self.fail_map):
+                return {"candidates": []}
+            return response(f"{self.summary} ({len(self.map_prompts)})")
+
+@pytest.fixture
+def gemini(monkeypatch):
+    fake = FakeGemini()
+    monkeypatch.setattr(summarizer, "generate_content", fake)
+    return fake
+
+def test_pack_keeps_order_within_budget():
+    budget = estimate_tokens(REVIEWS[0]) * 3
+
+    chunks = pack_reviews(REVIEWS, budget)
+
+    assert [review for chunk in chunks for review in chunk] == REVIEWS
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 3]
+    assert all(sum(estimate_tokens(review) for review in chunk) <= budget for chunk in chunks)
+
+def test_pack_truncates_a_review_longer_than_the_budget():
+    long_review = "The lid hinge snapped after a week of daily use. " * 40
+
+    chunks = pack_reviews([REVIEWS[0], long_review, REVIEWS[1]], 50)
+
+    assert len(chunks) == 3
+    assert chunks[1][0] != long_review
+    assert estimate_tokens(chunks[1][0]) <= 50
+
+def test_reviews_that_fit_one_prompt_take_one_call(gemini):
+    assert summarize_reviews(REVIEWS[:3], chunk_tokens=1000) == "A partial summary. (1)"
+    assert len(gemini.map_prompts) == 1 and not gemini.reduce_prompts
+
+def test_chunks_are_summarized_then_merged(gemini):
+    budget = estimate_tokens(REVIEWS[0]) * 3
+
+    assert summarize_reviews(REVIEWS, chunk_tokens=budget) == "merged"
+    assert len(gemini.map_prompts) == 4
+    assert len(gemini.reduce_prompts) == 1
+    assert all(f"Summary {number}:" in gemini.reduce_prompts[0] for number in range(1, 5))
+
+def test_reduce_guard_merges_partials_that_each_fill_the_budget(monkeypatch):
+    # Every partial summary alone exceeds the budget, so packing cannot group them
+    fake = FakeGemini(summary="A partial summary that runs on and on. " * 10)
+    monkeypatch.setattr(summarizer, "generate_content", fake)
+    budget = estimate_tokens(REVIEWS[0])
+
+    assert summarize_reviews(REVIEWS[:4], chunk_tokens=budget) == "merged"
+    assert len(fake.map_prompts) == 4
+    assert len(fake.reduce_prompts) == 1
+
+def test_failed_chunks_are_skipped(monkeypatch):
+    fake = FakeGemini(fail_map={0})
+    monkeypatch.setattr(summarizer, "generate_content", fake)
+    budget = estimate_tokens(REVIEWS[0]) * 3
+
+    assert summarize_reviews(REVIEWS, chunk_tokens=budget) == "merged"
+    assert fake.reduce_prompts[0].count("Summary ") == 3
+
+def test_every_chunk_failing_raises(monkeypatch):
+    monkeypatch.setattr(summarizer, "generate_content", FakeGemini(fail_map=range(12)))
+
+    with pytest.raises(SummaryError):
+        summarize_reviews(REVIEWS, chunk_tokens=estimate_tokens(REVIEWS[0]) * 3)
+
+def test_failed_reduce_falls_back_to_first_partial(monkeypatch):
+    fake = FakeGemini(fail_reduce=True)
+    monkeypatch.setattr(summarizer, "generate_content", fake)
+
+    summary = summarize_reviews(REVIEWS, chunk_tokens=estimate_tokens(REVIEWS[0]) * 3)
+
+    assert summary.startswith("A partial summary.")
+    assert len(fake.reduce_prompts) == 1
+
+def test_async_matches_sync(monkeypatch):
+    fake = FakeGemini(summary="A partial summary that runs on and on. " * 10)
+
+    async def generate_content_async(prompt, generation_config=None):
+        return fake(prompt, generation_config)
+
+    monkeypatch.setattr(summarizer, "generate_content_async", generate_content_async)
+    budget = estimate_tokens(REVIEWS[0])
+
+    assert asyncio.run(summarize_reviews_async(REVIEWS[:4], chunk_tokens=budget)) == "merged"
+    assert len(fake.map_prompts) == 4
+    assert len(fake.reduce_prompts) == 1